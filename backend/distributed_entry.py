@@ -0,0 +1,149 @@
+"""
+Entry point for mieszkanieo crawls spread over several machines
+"""
+import sys
+import os
+import json
+import time
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from scraper import PropertyScraper, PropertySpool, DetailEnricher, Geocoder, SelectorStats, SearchIndex, PriceHistory, CdpBrowserManager, LocationMapper, PreflightProbe
+from scraper import LeaseQueue, LeaseServer, LeaseClient, CrawlWorker
+
+USAGE = """usage: python distributed_entry.py plan <site[,site...]|all> <city[,city...]|all> [pages_per_lease] [filters_json]
+       python distributed_entry.py serve [port]
+       python distributed_entry.py work [coordinator_url]
+       python distributed_entry.py merge
+       python distributed_entry.py status
+       python distributed_entry.py clear"""
+
+
+def load_configs(cfg_dir):
+    """Load all site configs by site name"""
+    configs = {}
+    for name in sorted(os.listdir(cfg_dir)):
+        if name.endswith(".json"):
+            with open(os.path.join(cfg_dir, name), "r", encoding="utf-8") as f:
+                configs[name[:-5]] = json.load(f)
+    return configs
+
+
+def get_site_cities(config, cfg_dir):
+    """All cities a site has a location mapping for (e.g. the otodom csv)"""
+    if not config.get("use_csv_location") or not config.get("csv_file"):
+        return []
+    csv_path = config["csv_file"]
+    if not os.path.exists(csv_path):
+        csv_path = os.path.join(cfg_dir, os.path.basename(config["csv_file"]))
+    mapper = LocationMapper()
+    mapper.load_location_mapping(csv_path)
+    return sorted(mapper.location_mapping)
+
+
+def main():
+    """Plan, serve, work on and merge a lease queue"""
+    if len(sys.argv) < 2:
+        print(USAGE)
+        return
+
+    command = sys.argv[1]
+    cfg_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scraper", "cfg")
+    configs = load_configs(cfg_dir)
+    token = os.environ.get("MIESZKANIEO_LEASE_TOKEN") or None
+    lease_seconds = int(os.environ.get("MIESZKANIEO_LEASE_SECONDS", "300"))
+    queue = LeaseQueue(os.environ.get("MIESZKANIEO_LEASE_DB") or None, lease_seconds=lease_seconds)
+
+    if command == "plan":
+        if len(sys.argv) < 4:
+            print(USAGE)
+            return
+        sites = sorted(configs) if sys.argv[2] == "all" else [site.strip() for site in sys.argv[2].split(",") if site.strip()]
+        if len(sys.argv) > 4:
+            queue.pages_per_lease = int(sys.argv[4])
+        filters = json.loads(sys.argv[5]) if len(sys.argv) > 5 else None
+        for site in sites:
+            if sys.argv[3] == "all":
+                cities = get_site_cities(configs[site], cfg_dir)
+                if not cities:
+                    print(f"distributed_entry: {site} has no location list, name the cities", flush=True)
+                    continue
+            else:
+                cities = [city.strip().lower() for city in sys.argv[3].split(",") if city.strip()]
+            added = queue.add_targets(site, cities, filters)
+            print(f"distributed_entry: {site}: {added} of {len(cities)} targets queued", flush=True)
+
+    elif command == "serve":
+        port = int(sys.argv[2]) if len(sys.argv) > 2 else 8790
+        # 0.0.0.0 lets workers on other machines connect
+        host = os.environ.get("MIESZKANIEO_LEASE_HOST", "127.0.0.1")
+        server = LeaseServer(queue, token)
+        if not server.serve(port, host):
+            return
+        try:
+            while True:
+                status = queue.status()
+                print(f"distributed_entry: {json.dumps(status)}", flush=True)
+                if not status["leases"]["pending"] and not status["leases"]["leased"]:
+                    print("distributed_entry: queue drained, run merge to save the listings", flush=True)
+                time.sleep(60)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
+
+    elif command == "work":
+        url = sys.argv[2] if len(sys.argv) > 2 else os.environ.get("MIESZKANIEO_COORDINATOR")
+        # without a coordinator the queue file is used directly (workers on this machine)
+        source = LeaseClient(url, token) if url else queue
+        detail_enricher = None
+        if os.environ.get("MIESZKANIEO_DETAIL_ENRICH", "1") != "0":
+            detail_enricher = DetailEnricher()
+        geocoder = None
+        if os.environ.get("MIESZKANIEO_GEOCODE", "1") != "0":
+            geocoder = Geocoder(os.environ.get("MIESZKANIEO_GAZETTEER") or None)
+        selector_stats = None
+        if os.environ.get("MIESZKANIEO_SELECTOR_STATS", "1") != "0":
+            selector_stats = SelectorStats(os.environ.get("MIESZKANIEO_SELECTOR_STATS_PATH") or None)
+        browser_manager = CdpBrowserManager(headless=True) if os.environ.get("MIESZKANIEO_BROWSER") == "cdp" else None
+        preflight = PreflightProbe() if os.environ.get("MIESZKANIEO_PREFLIGHT", "1") != "0" else None
+        scraper = PropertyScraper(headless=True, detail_enricher=detail_enricher, geocoder=geocoder, selector_stats=selector_stats, browser_manager=browser_manager, preflight=preflight)
+        worker = CrawlWorker(source, configs, scraper, lease_seconds=lease_seconds)
+        worker.run()
+        if selector_stats:
+            selector_stats.save()
+
+    elif command == "merge":
+        # same sinks as scraper_entry.py, listings are added (not replaced)
+        db_path = os.environ.get("MIESZKANIEO_DB_PATH") or None
+        spool = None
+        if os.environ.get("MIESZKANIEO_SPOOL", "1") != "0":
+            spool = PropertySpool(os.environ.get("MIESZKANIEO_SPOOL_PATH") or None)
+        outputs = []
+        if os.environ.get("MIESZKANIEO_SEARCH_INDEX", "1") != "0":
+            outputs.append(SearchIndex(db_path))
+        if os.environ.get("MIESZKANIEO_PRICE_HISTORY", "1") != "0":
+            outputs.append(PriceHistory(os.environ.get("MIESZKANIEO_PRICE_HISTORY_DIR") or None))
+        scraper = PropertyScraper(headless=True, db_path=db_path, spool=spool, outputs=outputs)
+        try:
+            scraper.replay_spool()
+            saved = queue.merge_results(scraper.save_properties_batch)
+        finally:
+            scraper.cleanup()
+        print(f"distributed_entry: merged {saved} new listings", flush=True)
+
+    elif command == "status":
+        url = os.environ.get("MIESZKANIEO_COORDINATOR")
+        source = LeaseClient(url, token) if url else queue
+        print(json.dumps(source.status(), indent=2))
+
+    elif command == "clear":
+        queue.clear()
+        print("distributed_entry: queue cleared", flush=True)
+
+    else:
+        print(USAGE)
+
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()
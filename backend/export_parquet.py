@@ -0,0 +1,27 @@
+"""
+Export the app database to partitioned parquet files
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from scraper import ParquetSink
+
+
+def main():
+    """Write all listings of the database as site/city/date partitioned parquet"""
+    if len(sys.argv) < 2:
+        print("usage: python export_parquet.py <output_dir> [db_path]")
+        return
+    
+    output_dir = sys.argv[1]
+    db_path = sys.argv[2] if len(sys.argv) > 2 else os.environ.get("MIESZKANIEO_DB_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "mieszkanieo.db")
+    if not os.path.exists(db_path):
+        print(f"export_parquet: database not found: {db_path}", flush=True)
+        return
+    
+    exported = ParquetSink(output_dir).export_sqlite(db_path)
+    print(f"export_parquet: exported {exported} listings to {output_dir}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
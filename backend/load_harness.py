@@ -0,0 +1,350 @@
+"""
+Load harness for mieszkanieo scraper
+
+Serves synthetic multi-page result sets in each portal's markup plus a
+stand-in for the properties/jobs api on localhost, then drives
+PropertyScraper.scrape_site against them and reports throughput.
+
+usage: python load_harness.py [--sites olx,otodom] [--pages 1000] [--listings 36]
+                              [--browser http|chrome] [--parse-workers 0] [--preflight]
+"""
+import sys
+import os
+import json
+import time
+import copy
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from scraper import PropertyScraper, HttpBrowserManager, PreflightProbe
+
+CFG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scraper', 'cfg')
+SITES = ['allegro', 'gethome', 'nieruchomosci', 'olx', 'otodom']
+
+
+def page_param(config):
+    """Get query parameter used for page number in page_url"""
+    return "p" if "&p={page}" in config["page_url"] else "page"
+
+
+def render_listing(config, page, index, city):
+    """Render one listing in the portal's markup, using selectors from its config"""
+    site = config["site_name"]
+    selectors = config["selectors"]
+    link = f"/{site}/oferta/{page}-{index}.html"
+    price = 1000 + page * 10 + index
+    area = 30 + index % 50
+    rooms = 1 + index % 4
+    level = index % 10
+    title = f"Mieszkanie, {city.title()}, Dzielnica {index % 7}, {area} m²"
+
+    if site == "allegro":
+        return (
+            f'<li><article><a class="{selectors["link"][0][1]}" href="{link}">{title}</a>'
+            f'<img src="https://a.allegroimg.com/s180/{page}-{index}.jpg">'
+            f'<span aria-label="{price} zł aktualna cena">{price} zł</span>'
+            f'<span class="mgmw_3z _1e32a_XFNn4">Powierzchnia</span><span class="{selectors["details"]["class"]}">{area} m²</span>'
+            f'<span class="mgmw_3z _1e32a_XFNn4">Liczba pokoi</span><span class="{selectors["details"]["class"]}">{rooms}</span>'
+            f'<span class="mgmw_3z _1e32a_XFNn4">Piętro</span><span class="{selectors["details"]["class"]}">{level}</span>'
+            f'</article></li>'
+        )
+    if site == "gethome":
+        return (
+            f'<li class="{selectors["listing_item"]["class"]}"><a class="{selectors["link"]["class"]}" href="{link}">'
+            f'<picture class="{selectors["image"]["class"]}"><source srcset="https://img.gethome.pl/{page}-{index}.jpg"></picture>'
+            f'<div class="{selectors["title"][0][1]}">{title}</div><address>{city.title()}, Dzielnica {index % 7}</address>'
+            f'<span class="{selectors["price"][0][1]}">{price} zł</span>'
+            f'<span class="ngl9ymk" data-testid="number-of-rooms-offerbox">{rooms}</span><span class="ngl9ymk">{area} m²</span>'
+            f'</a></li>'
+        )
+    if site == "nieruchomosci":
+        return (
+            f'<div class="{selectors["listing_item"]["class"]}"><span>{price} zł</span>'
+            f'<a class="{selectors["link"]["class"]}" href="{link}">{title}</a><img src="https://img.nieruchomosci-online.pl/{page}-{index}.jpg">'
+            f'<p class="province">{city.title()}, Dzielnica {index % 7}</p><span class="area">{area} m²</span>'
+            f'<p>Liczba pokoi: <strong>{rooms}</strong></p><p>Piętro: <strong>{level}</strong></p></div>'
+        )
+    if site == "olx":
+        return (
+            f'<div data-cy="{selectors["listing_item"]["data_cy"]}"><a href="{link}">'
+            f'<img src="https://ireland.apollo.olxcdn.com/{page}-{index}.jpg" srcset="https://ireland.apollo.olxcdn.com/{page}-{index};s=200x0 200w, https://ireland.apollo.olxcdn.com/{page}-{index};s=600x0 600w">'
+            f'<h4>{title}</h4></a><p class="{selectors["price"][0][1]}">{price} zł</p>'
+            f'<p class="{selectors["address"][0][1]}">{city.title()}, Dzielnica {index % 7} - Dzisiaj o 12:00</p>'
+            f'<span class="{selectors["details"]["area"][0][1]}">{area} m²</span></div>'
+        )
+    if site == "otodom":
+        dd_class = selectors["details"]["rooms"]["class"]
+        return (
+            f'<li><a href="{link}"><img data-cy="{selectors["image"]["data_cy"]}" src="https://img.otodom.pl/{page}-{index}.jpg"></a>'
+            f'<p data-cy="{selectors["title"]["data_cy"]}">{title}</p>'
+            f'<p data-sentry-component="{selectors["address"]["data_sentry_component"]}">{city.title()}, Dzielnica {index % 7}</p>'
+            f'<span data-sentry-element="{selectors["price"]["data_sentry_element"]}">{price} zł</span>'
+            f'<dl><dd class="{dd_class}">{rooms} pokoje</dd><dd class="{dd_class}">{area} m²</dd><dd class="{dd_class}">{level} piętro</dd></dl></li>'
+        )
+    raise ValueError(f"no markup for site {site}")
+
+
+def render_pagination(config, total_pages):
+    """Render pagination markup the scraper reads the page count from"""
+    site = config["site_name"]
+    pages = sorted({1, 2, total_pages})
+    if site == "allegro":
+        return "".join(f'<a data-page="{page}">{page}</a>' for page in pages)
+    if site == "gethome":
+        return f'<script>window.__INITIAL_STATE__ = {{"offerList": {{"offerList": {{"pageCount": {total_pages}}}}}}};</script>'
+    if site == "olx":
+        return "".join(f'<li data-testid="pagination-list-item"><a>{page}</a></li>' for page in pages)
+    if site == "otodom":
+        return '<ul>' + "".join(f'<li class="css-43nhzf">{page}</li>' for page in pages) + '</ul>'
+    return ""
+
+
+def render_count_state(config, total_pages, listings_per_page):
+    """Render the result count payload the preflight reads (also on empty result sets)"""
+    site = config["site_name"]
+    if site == "otodom":
+        pagination = {"totalItems": total_pages * listings_per_page, "totalPages": total_pages, "itemsPerPage": listings_per_page, "page": 1}
+        return f'<script id="__NEXT_DATA__" type="application/json">{json.dumps({"searchAds": {"pagination": pagination}}, separators=(",", ":"))}</script>'
+    if site == "olx":
+        return f'<script>window.__PRERENDERED_STATE__ = "{{\\"listing\\":{{\\"totalElements\\":{total_pages * listings_per_page}}}}}";</script>'
+    return ""
+
+
+def render_page(config, page, total_pages, listings_per_page, city):
+    """Render result page, pages past the end have an empty listings container"""
+    selectors = config["selectors"]
+    container = selectors["listings_container"]
+    count = listings_per_page if page <= total_pages else 0
+    items = "".join(render_listing(config, page, index, city) for index in range(count))
+
+    if container.get("data_testid"):
+        container_html = f'<{container["tag"]} data-testid="{container["data_testid"]}">{items}</{container["tag"]}>'
+    else:
+        container_html = f'<{container["tag"]} class="{container["class"]}">{items}</{container["tag"]}>'
+
+    # wait element of each site
+    extra = ""
+    if config["site_name"] == "gethome":
+        extra = f'<div class="{selectors["wait_element"]["value"]}"></div>'
+    elif config["site_name"] == "nieruchomosci":
+        extra = '<svg><path d="M0 0"></path></svg>'
+
+    pagination = render_pagination(config, total_pages) if count else ""
+    pagination += render_count_state(config, total_pages, listings_per_page)
+    return f'<html><body>{extra}{container_html}{pagination}</body></html>'
+
+
+class HarnessState:
+    """Request counters shared by the portal and api stand-ins"""
+
+    def __init__(self, configs, total_pages, listings_per_page):
+        self.configs = configs
+        self.total_pages = total_pages
+        self.listings_per_page = listings_per_page
+        self.lock = threading.Lock()
+        self.page_requests = 0
+        self.page_served_at = {}
+        self.api_calls = 0
+        self.batch_calls = 0
+        self.saved_ids = set()
+        self.latencies = []
+
+
+class HarnessHandler(BaseHTTPRequestHandler):
+    """Serves portal pages under /<site>/ and the api under /api/"""
+
+    state: HarnessState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        parts = parsed.path.strip("/").split("/")
+        config = self.state.configs.get(parts[0])
+        if not config or len(parts) < 3:
+            self.send_json({"error": "not found"}, 404)
+            return
+
+        query = parse_qs(parsed.query)
+        page = int(query.get(page_param(config), ["1"])[0])
+        with self.state.lock:
+            self.state.page_requests += 1
+            self.state.page_served_at.setdefault((parts[0], page), time.perf_counter())
+
+        body = render_page(config, page, self.state.total_pages, self.state.listings_per_page, parts[2]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        data = self.read_json()
+        with self.state.lock:
+            self.state.api_calls += 1
+            if self.path == "/api/properties/batch":
+                self.state.batch_calls += 1
+                now = time.perf_counter()
+                saved = 0
+                for prop in data.get("properties", []):
+                    # link is /<site>/oferta/<page>-<index>.html
+                    path_parts = urlparse(prop["link"]).path.strip("/").split("/")
+                    page = int(path_parts[-1].split("-")[0])
+                    served_at = self.state.page_served_at.get((path_parts[0], page))
+                    if served_at:
+                        self.state.latencies.append(now - served_at)
+                    if prop["id"] not in self.state.saved_ids:
+                        self.state.saved_ids.add(prop["id"])
+                        saved += 1
+                total = len(data.get("properties", []))
+                self.send_json({"saved": saved, "skipped": total - saved, "total": total})
+                return
+        self.send_json({"message": "ok"})
+
+    def do_PUT(self):
+        self.read_json()
+        with self.state.lock:
+            self.state.api_calls += 1
+        self.send_json({"message": "ok"})
+
+    def do_DELETE(self):
+        with self.state.lock:
+            self.state.api_calls += 1
+        self.send_json({"deletedCount": 0})
+
+
+def harness_config(config, base_url):
+    """Point a site config at the local portal stand-in"""
+    config = copy.deepcopy(config)
+    site = config["site_name"]
+    param = page_param(config)
+    config["base_domain"] = base_url
+    config["base_url"] = f"{base_url}/{site}/search/{{city}}?{param}=1"
+    config["page_url"] = f"{base_url}/{site}/search/{{city}}?{param}={{page}}"
+    config["use_csv_location"] = False
+    config["thumbnail_delay"] = 0
+    config["page_delay"] = 0
+    # the stand-in host serves plain http
+    config.get("url_canonicalization", {}).pop("force_https", None)
+    return config
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process and its children (None on windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # bytes on macos, kilobytes elsewhere
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
+
+
+def percentile(values, fraction):
+    """Get percentile of values"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_site(site, state, base_url, args):
+    """Scrape one site against the stand-ins and return its report"""
+    with state.lock:
+        state.page_requests = 0
+        state.api_calls = 0
+        state.batch_calls = 0
+        state.page_served_at = {}
+        state.latencies = []
+
+    config = harness_config(state.configs[site], base_url)
+    scraper = PropertyScraper(headless=True, api_url=base_url, job_id="load-harness", parse_workers=args.parse_workers)
+    if args.browser == "http":
+        scraper.browser_manager = HttpBrowserManager()
+    if args.preflight:
+        scraper.preflight = PreflightProbe()
+
+    start = time.perf_counter()
+    result = scraper.scrape_site(args.city, config, args.max_pages)
+    elapsed = time.perf_counter() - start
+
+    pages = max(state.page_requests, 1)
+    return {
+        "site": site,
+        "success": result["success"],
+        "found": result.get("total_found", 0),
+        "saved": result.get("saved", 0),
+        "duplicates_dropped": result.get("duplicates_dropped", 0),
+        "pages_fetched": state.page_requests,
+        "seconds": round(elapsed, 2),
+        "pages_per_sec": round(state.page_requests / elapsed, 2) if elapsed else 0,
+        "latency_mean_s": round(sum(state.latencies) / len(state.latencies), 3) if state.latencies else 0,
+        "latency_p95_s": round(percentile(state.latencies, 0.95), 3),
+        "api_calls_per_page": round(state.api_calls / pages, 2),
+        "batch_calls_per_page": round(state.batch_calls / pages, 2),
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def main():
+    """Run load harness from command line"""
+    parser = argparse.ArgumentParser(description="mieszkanieo scraper load harness")
+    parser.add_argument("--sites", default=",".join(SITES))
+    parser.add_argument("--pages", type=int, default=50, help="result pages per site")
+    parser.add_argument("--listings", type=int, default=36, help="listings per page")
+    parser.add_argument("--max-pages", type=int, default=None)
+    parser.add_argument("--city", default="katowice")
+    parser.add_argument("--browser", choices=["http", "chrome"], default="http")
+    parser.add_argument("--parse-workers", type=int, default=0)
+    parser.add_argument("--preflight", action="store_true", help="check result counts over plain http first")
+    parser.add_argument("--output", help="write json report to file")
+    args = parser.parse_args()
+
+    configs = {}
+    for site in args.sites.split(","):
+        with open(os.path.join(CFG_DIR, f"{site}.json"), "r", encoding="utf-8") as f:
+            configs[site] = json.load(f)
+
+    state = HarnessState(configs, args.pages, args.listings)
+    HarnessHandler.state = state
+    server = ThreadingHTTPServer(("127.0.0.1", 0), HarnessHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    print(f"load_harness: serving {len(configs)} sites, {args.pages} pages x {args.listings} listings on {base_url}", flush=True)
+
+    reports = []
+    try:
+        for site in configs:
+            reports.append(run_site(site, state, base_url, args))
+    finally:
+        server.shutdown()
+
+    print("load_harness: results")
+    for report in reports:
+        print(json.dumps(report), flush=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=2)
+
+    return 0 if all(report["success"] for report in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Entry point for mieszkanieo background recrawls
+"""
+import sys
+import os
+import json
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from scraper import PropertyScraper, PropertySpool, DetailEnricher, Geocoder, RecrawlScheduler, SelectorStats, ParquetSink, SearchIndex, PriceHistory, CdpBrowserManager, PreflightProbe
+
+
+def main():
+    """Refresh the (site, city) pairs with the most expected changes within a time budget"""
+    if len(sys.argv) < 2:
+        print("usage: python recrawl_entry.py <city[,city...]> [site[,site...]] [budget_minutes]")
+        return
+    
+    cities = [city.strip().lower() for city in sys.argv[1].split(",") if city.strip()]
+    cfg_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scraper", "cfg")
+    if len(sys.argv) > 2 and sys.argv[2] != "all":
+        sites = [site.strip() for site in sys.argv[2].split(",") if site.strip()]
+    else:
+        sites = sorted(name[:-5] for name in os.listdir(cfg_dir) if name.endswith(".json"))
+    budget = float(sys.argv[3]) * 60 if len(sys.argv) > 3 else 3600
+    
+    configs = {}
+    for site in sites:
+        with open(os.path.join(cfg_dir, f"{site}.json"), "r", encoding="utf-8") as f:
+            configs[site] = json.load(f)
+    
+    # same sinks as scraper_entry.py, listings are added (not replaced) and re-priced ones updated
+    db_path = os.environ.get("MIESZKANIEO_DB_PATH") or None
+    spool = None
+    if os.environ.get("MIESZKANIEO_SPOOL", "1") != "0":
+        spool = PropertySpool(os.environ.get("MIESZKANIEO_SPOOL_PATH") or None)
+    detail_enricher = None
+    if os.environ.get("MIESZKANIEO_DETAIL_ENRICH", "1") != "0":
+        detail_enricher = DetailEnricher()
+    geocoder = None
+    if os.environ.get("MIESZKANIEO_GEOCODE", "1") != "0":
+        geocoder = Geocoder(os.environ.get("MIESZKANIEO_GAZETTEER") or None)
+    selector_stats = None
+    if os.environ.get("MIESZKANIEO_SELECTOR_STATS", "1") != "0":
+        selector_stats = SelectorStats(os.environ.get("MIESZKANIEO_SELECTOR_STATS_PATH") or None)
+    outputs = []
+    if os.environ.get("MIESZKANIEO_SEARCH_INDEX", "1") != "0":
+        outputs.append(SearchIndex(db_path))
+    if os.environ.get("MIESZKANIEO_PRICE_HISTORY", "1") != "0":
+        outputs.append(PriceHistory(os.environ.get("MIESZKANIEO_PRICE_HISTORY_DIR") or None))
+    if os.environ.get("MIESZKANIEO_PARQUET_DIR"):
+        outputs.append(ParquetSink(os.environ["MIESZKANIEO_PARQUET_DIR"]))
+    
+    preflight = None
+    if os.environ.get("MIESZKANIEO_PREFLIGHT", "1") != "0":
+        preflight = PreflightProbe()
+    
+    def crawl(site, city):
+        browser_manager = CdpBrowserManager(headless=True) if os.environ.get("MIESZKANIEO_BROWSER") == "cdp" else None
+        scraper = PropertyScraper(headless=True, db_path=db_path, spool=spool, detail_enricher=detail_enricher, geocoder=geocoder, selector_stats=selector_stats, outputs=outputs, browser_manager=browser_manager, preflight=preflight, update_prices=True)
+        return scraper.scrape_site(city, configs[site])
+    
+    scheduler = RecrawlScheduler()
+    targets = [(site, city) for city in cities for site in sites]
+    for target in scheduler.plan(targets):
+        expected = "unknown" if target["expected"] is None else f"{target['expected']:.1f}"
+        print(f"recrawl_entry: {target['site']}/{target['city']}: expected changes {expected}, cost {target['cost']:.0f}s", flush=True)
+    
+    crawled = scheduler.run(targets, crawl, budget)
+    print(f"recrawl_entry: refreshed {len(crawled)} of {len(targets)} targets", flush=True)
+
+
+if __name__ == "__main__":
+    main()
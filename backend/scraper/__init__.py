@@ -7,11 +7,52 @@ from .browser_manager import BrowserManager
 from .location_mapper import LocationMapper
 from .data_extractor import DataExtractor
 from .api_client import APIClient
+from .search_filters import SearchFilters
+from .sqlite_sink import SQLiteSink
+from .thumbnail_cache import ThumbnailCache
+from .detail_enricher import DetailEnricher
+from .http_browser import HttpBrowserManager
+from .cdp_browser import CdpBrowserManager
+from .metrics import ScraperMetrics, metrics
+from .spool import PropertySpool
+from .geocoder import Geocoder, KDTree
+from .market_stats import MarketStats
+from .recrawl_scheduler import RecrawlScheduler
+from .selector_stats import SelectorStats
+from .listing_index import ListingIndex
+from .parquet_sink import ParquetSink
+from .search_index import SearchIndex
+from .price_history import PriceHistory
+from .preflight import PreflightProbe
+from .crawl_leases import LeaseQueue, LeaseServer, LeaseClient, CrawlWorker
 
 __all__ = [
     'PropertyScraper',
     'BrowserManager', 
     'LocationMapper',
     'DataExtractor',
-    'APIClient'
+    'APIClient',
+    'SearchFilters',
+    'SQLiteSink',
+    'ThumbnailCache',
+    'DetailEnricher',
+    'HttpBrowserManager',
+    'CdpBrowserManager',
+    'ScraperMetrics',
+    'metrics',
+    'PropertySpool',
+    'Geocoder',
+    'KDTree',
+    'MarketStats',
+    'RecrawlScheduler',
+    'SelectorStats',
+    'ListingIndex',
+    'ParquetSink',
+    'SearchIndex',
+    'PriceHistory',
+    'PreflightProbe',
+    'LeaseQueue',
+    'LeaseServer',
+    'LeaseClient',
+    'CrawlWorker'
 ]
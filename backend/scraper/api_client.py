@@ -8,8 +8,12 @@ import requests
 class APIClient:
     """Handles API communication"""
     
-    def __init__(self, api_url="http://localhost:8000"):
+    def __init__(self, api_url="http://localhost:8000", update_prices=False):
         self.api_url = api_url
+        # recrawls refresh the price of listings already stored
+        self.update_prices = update_prices
+        # set when the last batch was refused as invalid (not just failed to send)
+        self.batch_rejected = False
     
     def delete_all_properties(self):
         """Delete all properties from database"""
@@ -35,13 +39,18 @@ class APIClient:
 
     def save_properties_batch(self, properties):
         """Save multiple properties to api in a single request"""
+        return self.send_properties_batch(properties) or 0
+    
+    def send_properties_batch(self, properties):
+        """Save multiple properties to api, returns saved count or None if the api did not accept them"""
+        self.batch_rejected = False
         if not properties:
             return 0
             
         try:
             response = requests.post(
                 f"{self.api_url}/api/properties/batch",
-                json={"properties": properties},
+                json={"properties": properties, "update_prices": True} if self.update_prices else {"properties": properties},
                 headers={"Content-Type": "application/json"},
                 timeout=30  # longer timeout for batch operations
             )
@@ -50,13 +59,51 @@ class APIClient:
                 result = response.json()
                 print(f"save_properties_batch: saved {result.get('saved', 0)}, skipped {result.get('skipped', 0)}", flush=True)
                 return result.get('saved', 0)
+            elif response.status_code == 400:
+                # rejected input, sending it again will not help
+                print(f"save_properties_batch: api rejected batch: {response.text}")
+                self.batch_rejected = True
+                return 0
             else:
                 print(f"save_properties_batch: api error {response.status_code}: {response.text}")
-                return 0
+                return None
                 
         except Exception as e:
             print(f"save_properties_batch: save error: {e}")
-            return 0
+            return None
+
+    def get_known_ids(self, site):
+        """Get ids of listings of a site that are already stored"""
+        try:
+            response = requests.get(f"{self.api_url}/api/properties", params={"sites": site}, timeout=30)
+            if response.status_code != 200:
+                print(f"get_known_ids: api error {response.status_code}: {response.text}")
+                return set()
+            return {row["id"] for row in response.json()}
+        except Exception as e:
+            print(f"get_known_ids: request error: {e}")
+            return set()
+
+    def update_thumbnails(self, properties):
+        """Store cached thumbnail paths of saved properties, returns number of rows updated"""
+        entries = [{"id": prop["id"], "thumbnail": prop["thumbnail"]} for prop in properties if prop.get("thumbnail")]
+        updated = 0
+        # same limit as the batch endpoint
+        for start in range(0, len(entries), 100):
+            try:
+                response = requests.post(
+                    f"{self.api_url}/api/properties/thumbnails",
+                    json={"thumbnails": entries[start:start + 100]},
+                    headers={"Content-Type": "application/json"},
+                    timeout=30
+                )
+                if response.status_code != 200:
+                    print(f"update_thumbnails: api error {response.status_code}: {response.text}")
+                    continue
+                updated += response.json().get("updated", 0)
+            except Exception as e:
+                print(f"update_thumbnails: save error: {e}")
+        return updated
 
     def save_property(self, property_data):
         """Save property to api (fallback for single property)"""
@@ -2,20 +2,33 @@
 mieszkanieo scraper - browser management
 """
 
+import re
+import json
 import time
-from typing import Optional
+import base64
+from typing import Dict, List, Optional, Tuple
 import undetected_chromedriver as uc
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import TimeoutException, SessionNotCreatedException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from .chrome_env import report_session_failure
+from .driver_cache import driver_cache
+
 
 class BrowserManager:
     """Manages browser instances and web driver operations"""
     
-    def __init__(self, headless: bool = True):
+    def __init__(self, headless: bool = True, capture_network: bool = False):
         self.headless = headless
+        # record devtools network events so json responses can be read back
+        self.capture_network = capture_network
+        # performance logging is a launch option, what the running chrome was started with
+        self.driver_capture_network = False
+        self.capture_patterns: List[str] = []
+        # request id -> url of matching responses whose body is still loading
+        self.loading_responses: Dict[str, str] = {}
         self.driver: Optional[uc.Chrome] = None
     
     def setup_browser(self, fresh_instance: bool = False) -> None:
@@ -31,7 +44,29 @@ class BrowserManager:
                 pass
             self.driver = None
         
-        self.driver = uc.Chrome(use_subprocess=False, headless=self.headless)
+        # reuse the shared patched driver instead of patching a new copy per launch
+        try:
+            driver_path = driver_cache.get_driver_path()
+        except Exception as e:
+            print(f"setup_browser: driver cache unavailable: {e}")
+            driver_path = None
+        
+        options = uc.ChromeOptions()
+        if self.capture_network:
+            options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        
+        try:
+            self.driver = uc.Chrome(
+                options=options,
+                use_subprocess=False,
+                headless=self.headless,
+                driver_executable_path=driver_path
+            )
+        except SessionNotCreatedException:
+            # cached compatibility status is no longer true
+            report_session_failure()
+            raise
+        self.driver_capture_network = self.capture_network
         self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         self.driver.execute_cdp_cmd('Network.setUserAgentOverride', {
             "userAgent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
@@ -61,6 +96,31 @@ class BrowserManager:
             print("wait_for_page: timeout waiting for page element")
             return False
     
+    def wait_for_content_loaded(self, timeout: int = 10) -> bool:
+        """Wait for page content to be fully loaded"""
+        if not self.driver:
+            return False
+        try:
+            # wait for document ready state
+            WebDriverWait(self.driver, timeout).until(
+                lambda driver: driver.execute_script("return document.readyState") == "complete"
+            )
+            # additional wait for AJAX
+            WebDriverWait(self.driver, timeout).until(
+                lambda driver: driver.execute_script("return jQuery.active == 0") if 
+                driver.execute_script("return typeof jQuery !== 'undefined'") else True
+            )
+            return True
+        except:
+            # )fallback) just wait for document ready
+            try:
+                WebDriverWait(self.driver, timeout).until(
+                    lambda driver: driver.execute_script("return document.readyState") == "complete"
+                )
+                return True
+            except:
+                return False
+    
     def scroll_to_bottom(self, wait_time: float = 1.0) -> None:
         """Scroll to bottom of page to trigger lazy loading"""
         if not self.driver:
@@ -99,6 +159,65 @@ class BrowserManager:
             if auto_scroll and site_name.lower() == "olx":
                 self.scroll_to_bottom()
     
+    def start_response_capture(self, url_patterns: List[str]) -> None:
+        """Start collecting responses whose url matches one of the patterns"""
+        if not self.driver or not self.capture_network:
+            return
+        self.capture_patterns = url_patterns
+        self.driver.execute_cdp_cmd("Network.enable", {})
+        # drop events from previous pages
+        self.driver.get_log("performance")
+        self.loading_responses = {}
+    
+    def get_captured_responses(self) -> List[Tuple[str, object]]:
+        """Get (url, parsed json) for matching responses received since the last call"""
+        if not self.driver or not self.capture_patterns:
+            return []
+        
+        responses = []
+        for entry in self.driver.get_log("performance"):
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method = message.get("method")
+            params = message.get("params", {})
+            
+            if method == "Network.responseReceived":
+                response = params["response"]
+                if "json" not in response.get("mimeType", ""):
+                    continue
+                if any(re.search(pattern, response["url"]) for pattern in self.capture_patterns):
+                    # the body can only be read once it finished loading
+                    self.loading_responses[params["requestId"]] = response["url"]
+                continue
+            if method == "Network.loadingFailed":
+                self.loading_responses.pop(params.get("requestId"), None)
+                continue
+            if method != "Network.loadingFinished" or params.get("requestId") not in self.loading_responses:
+                continue
+            
+            url = self.loading_responses.pop(params["requestId"])
+            try:
+                body = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": params["requestId"]})
+                text = body["body"]
+                if body.get("base64Encoded"):
+                    text = base64.b64decode(text).decode("utf-8")
+                responses.append((url, json.loads(text)))
+            except Exception as e:
+                print(f"get_captured_responses: failed to read {url}: {e}")
+        return responses
+    
+    def wait_for_responses(self, timeout: float = 10.0) -> List[Tuple[str, object]]:
+        """Wait until at least one matching json response was captured"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            responses = self.get_captured_responses()
+            if responses:
+                return responses
+            time.sleep(0.2)
+        return []
+    
     def get_current_url(self) -> str:
         """Get current URL"""
         if self.driver:
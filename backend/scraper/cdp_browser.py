@@ -0,0 +1,520 @@
+"""
+mieszkanieo scraper - chrome driven over the devtools protocol (no chromedriver)
+"""
+
+import os
+import re
+import json
+import time
+import base64
+import shutil
+import asyncio
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional, Tuple
+
+import websocket
+from selenium.common.exceptions import WebDriverException
+
+from .chrome_env import find_chrome_binary
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+
+class CdpError(WebDriverException):
+    """Devtools command failed (a WebDriverException, so callers handle both drivers alike)"""
+
+
+class CdpConnection:
+    """One websocket to the browser, commands of all tabs are multiplexed over it
+
+    A reader thread resolves command futures and calls event listeners, so
+    commands can be awaited from threads or from an asyncio event loop.
+    """
+
+    def __init__(self, ws_url: str):
+        self.ws = websocket.create_connection(ws_url, timeout=None, enable_multithread=True, suppress_origin=True)
+        self.next_id = 0
+        self.pending: Dict[int, Future] = {}
+        # (session id, method) -> callbacks
+        self.listeners: Dict[Tuple[Optional[str], str], List[Callable]] = {}
+        self.lock = threading.Lock()
+        self.closed = False
+        self.reader = threading.Thread(target=self.read_messages, daemon=True)
+        self.reader.start()
+
+    def read_messages(self) -> None:
+        """Dispatch responses and events until the socket closes"""
+        while True:
+            try:
+                message = json.loads(self.ws.recv())
+            except (websocket.WebSocketException, OSError, ValueError):
+                break
+            if "id" in message:
+                with self.lock:
+                    future = self.pending.pop(message["id"], None)
+                if future is None:
+                    continue
+                if "error" in message:
+                    future.set_exception(CdpError(message["error"].get("message", "devtools error")))
+                else:
+                    future.set_result(message.get("result", {}))
+            else:
+                with self.lock:
+                    callbacks = list(self.listeners.get((message.get("sessionId"), message.get("method")), []))
+                for callback in callbacks:
+                    try:
+                        callback(message.get("params", {}))
+                    except Exception as e:
+                        print(f"CdpConnection: listener failed: {e}", flush=True)
+
+        self.closed = True
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        for future in pending.values():
+            future.set_exception(CdpError("devtools connection closed"))
+
+    def send(self, method: str, params: Optional[dict] = None, session_id: Optional[str] = None) -> Future:
+        """Send command, the future resolves to its result"""
+        future: Future = Future()
+        with self.lock:
+            if self.closed:
+                future.set_exception(CdpError("devtools connection closed"))
+                return future
+            self.next_id += 1
+            message = {"id": self.next_id, "method": method, "params": params or {}}
+            if session_id:
+                message["sessionId"] = session_id
+            self.pending[self.next_id] = future
+        try:
+            self.ws.send(json.dumps(message))
+        except (websocket.WebSocketException, OSError) as e:
+            with self.lock:
+                self.pending.pop(message["id"], None)
+            future.set_exception(CdpError(f"devtools send failed: {e}"))
+        return future
+
+    def call(self, method: str, params: Optional[dict] = None, session_id: Optional[str] = None, timeout: float = 30) -> dict:
+        """Send command and wait for its result"""
+        try:
+            return self.send(method, params, session_id).result(timeout)
+        except FutureTimeoutError:
+            raise CdpError(f"{method} timed out after {timeout}s")
+
+    def on(self, session_id: Optional[str], method: str, callback: Callable) -> None:
+        """Call callback(params) for every matching event"""
+        with self.lock:
+            self.listeners.setdefault((session_id, method), []).append(callback)
+
+    def off(self, session_id: Optional[str], method: str, callback: Callable) -> None:
+        """Remove event callback"""
+        with self.lock:
+            callbacks = self.listeners.get((session_id, method), [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def close(self) -> None:
+        """Close websocket"""
+        try:
+            self.ws.close()
+        except Exception:
+            pass
+
+
+class CdpTab:
+    """One page target attached over the shared connection"""
+
+    def __init__(self, connection: CdpConnection, target_id: str, session_id: str):
+        self.connection = connection
+        self.target_id = target_id
+        self.session_id = session_id
+
+    def call(self, method: str, params: Optional[dict] = None, timeout: float = 30) -> dict:
+        """Run command in this tab"""
+        return self.connection.call(method, params, self.session_id, timeout)
+
+    async def call_async(self, method: str, params: Optional[dict] = None, timeout: float = 30) -> dict:
+        """Run command in this tab from an event loop"""
+        future = self.connection.send(method, params, self.session_id)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            raise CdpError(f"{method} timed out after {timeout}s")
+
+    def expect_event(self, method: str) -> threading.Event:
+        """Get flag set by the next event (register before triggering it)"""
+        fired = threading.Event()
+
+        def callback(params):
+            fired.set()
+            self.connection.off(self.session_id, method, callback)
+
+        self.connection.on(self.session_id, method, callback)
+        return fired
+
+    def navigate(self, url: str, timeout: float = 30) -> None:
+        """Open url and wait for the load event"""
+        loaded = self.expect_event("Page.loadEventFired")
+        result = self.call("Page.navigate", {"url": url}, timeout)
+        if result.get("errorText"):
+            raise CdpError(f"navigation to {url} failed: {result['errorText']}")
+        if not loaded.wait(timeout):
+            raise CdpError(f"timeout loading {url}")
+
+    async def navigate_async(self, url: str, timeout: float = 30) -> None:
+        """Open url and wait for the load event, from an event loop"""
+        loaded = self.expect_event("Page.loadEventFired")
+        result = await self.call_async("Page.navigate", {"url": url}, timeout)
+        if result.get("errorText"):
+            raise CdpError(f"navigation to {url} failed: {result['errorText']}")
+        deadline = time.monotonic() + timeout
+        while not loaded.is_set():
+            if time.monotonic() > deadline:
+                raise CdpError(f"timeout loading {url}")
+            await asyncio.sleep(0.05)
+
+    def evaluate(self, expression: str, timeout: float = 30):
+        """Evaluate javascript expression and return its json value"""
+        return self.read_value(self.call("Runtime.evaluate", {"expression": expression, "returnByValue": True, "awaitPromise": True}, timeout))
+
+    async def evaluate_async(self, expression: str, timeout: float = 30):
+        """Evaluate javascript expression from an event loop"""
+        return self.read_value(await self.call_async("Runtime.evaluate", {"expression": expression, "returnByValue": True, "awaitPromise": True}, timeout))
+
+    def read_value(self, result: dict):
+        """Get value of an evaluate result, raising script exceptions"""
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            raise CdpError(details.get("exception", {}).get("description") or details.get("text", "script error"))
+        return result.get("result", {}).get("value")
+
+    def wait_for_selector(self, selector: str, timeout: float = 10, poll: float = 0.1) -> bool:
+        """Wait until css selector matches an element"""
+        expression = f"document.querySelector({json.dumps(selector)}) !== null"
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.evaluate(expression):
+                return True
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(poll)
+
+    async def wait_for_selector_async(self, selector: str, timeout: float = 10, poll: float = 0.1) -> bool:
+        """Wait until css selector matches an element, from an event loop"""
+        expression = f"document.querySelector({json.dumps(selector)}) !== null"
+        deadline = time.monotonic() + timeout
+        while True:
+            if await self.evaluate_async(expression):
+                return True
+            if time.monotonic() > deadline:
+                return False
+            await asyncio.sleep(poll)
+
+    def get_html(self) -> str:
+        """Get current document html"""
+        return self.evaluate("document.documentElement.outerHTML") or ""
+
+    async def get_html_async(self) -> str:
+        """Get current document html, from an event loop"""
+        return await self.evaluate_async("document.documentElement.outerHTML") or ""
+
+
+class CdpBrowser:
+    """Chrome process with remote debugging and one devtools connection"""
+
+    def __init__(self, headless: bool = True, chrome_path: Optional[str] = None):
+        self.headless = headless
+        self.chrome_path = chrome_path or os.environ.get("MIESZKANIEO_CHROME") or find_chrome_binary()
+        self.process: Optional[subprocess.Popen] = None
+        self.profile_dir: Optional[str] = None
+        self.connection: Optional[CdpConnection] = None
+
+    def start(self, timeout: float = 20) -> None:
+        """Launch chrome and connect to its browser endpoint"""
+        if not self.chrome_path:
+            raise CdpError("chrome executable not found")
+        self.profile_dir = tempfile.mkdtemp(prefix="mieszkanieo-cdp-")
+        args = [
+            self.chrome_path,
+            "--remote-debugging-port=0",
+            f"--user-data-dir={self.profile_dir}",
+            "--no-first-run",
+            "--no-default-browser-check",
+            "--disable-background-networking",
+            "--disable-blink-features=AutomationControlled",
+            "--force-device-scale-factor=0.25",
+            "about:blank"
+        ]
+        if self.headless:
+            args.insert(1, "--headless=new")
+        # chrome refuses to run as root with the sandbox
+        if hasattr(os, "geteuid") and os.geteuid() == 0:
+            args.insert(1, "--no-sandbox")
+        self.process = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        # chrome writes the picked port and browser endpoint once it listens
+        port_file = os.path.join(self.profile_dir, "DevToolsActivePort")
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                with open(port_file, "r", encoding="utf-8") as f:
+                    lines = f.read().split("\n")
+                if len(lines) >= 2 and lines[1]:
+                    break
+            except OSError:
+                pass
+            if self.process.poll() is not None or time.monotonic() > deadline:
+                self.stop()
+                raise CdpError("chrome did not open a devtools port")
+            time.sleep(0.05)
+
+        self.connection = CdpConnection(f"ws://127.0.0.1:{lines[0].strip()}{lines[1].strip()}")
+
+    def new_tab(self, url: str = "about:blank") -> CdpTab:
+        """Open page target and attach to it"""
+        target_id = self.connection.call("Target.createTarget", {"url": url})["targetId"]
+        session_id = self.connection.call("Target.attachToTarget", {"targetId": target_id, "flatten": True})["sessionId"]
+        tab = CdpTab(self.connection, target_id, session_id)
+        tab.call("Page.enable")
+        tab.call("Network.setUserAgentOverride", {"userAgent": USER_AGENT})
+        tab.call("Page.addScriptToEvaluateOnNewDocument", {"source": "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"})
+        return tab
+
+    def close_tab(self, tab: CdpTab) -> None:
+        """Close page target"""
+        try:
+            self.connection.call("Target.closeTarget", {"targetId": tab.target_id}, timeout=5)
+        except CdpError:
+            pass
+
+    async def fetch_pages(self, urls: List[str], wait_selector: Optional[str] = None, concurrency: int = 4, timeout: float = 30) -> Dict[str, str]:
+        """Load urls in up to concurrency tabs driven from one event loop, returns url -> html ('' on failure)"""
+        tabs = [self.new_tab() for _ in range(min(concurrency, len(urls)))]
+        queue: asyncio.Queue = asyncio.Queue()
+        for url in urls:
+            queue.put_nowait(url)
+        pages: Dict[str, str] = {}
+
+        async def work(tab):
+            while not queue.empty():
+                url = queue.get_nowait()
+                try:
+                    await tab.navigate_async(url, timeout)
+                    if wait_selector:
+                        await tab.wait_for_selector_async(wait_selector, timeout)
+                    pages[url] = await tab.get_html_async()
+                except CdpError as e:
+                    print(f"fetch_pages: {e.msg}", flush=True)
+                    pages[url] = ""
+
+        try:
+            await asyncio.gather(*(work(tab) for tab in tabs))
+        finally:
+            for tab in tabs:
+                self.close_tab(tab)
+        return pages
+
+    def stop(self) -> None:
+        """Close browser and remove its profile"""
+        if self.connection:
+            try:
+                self.connection.call("Browser.close", timeout=5)
+            except CdpError:
+                pass
+            self.connection.close()
+            self.connection = None
+        if self.process:
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+        if self.profile_dir:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            self.profile_dir = None
+
+
+class CdpBrowserManager:
+    """BrowserManager with the same surface, talking to chrome over devtools directly"""
+
+    def __init__(self, headless: bool = True, capture_network: bool = False, chrome_path: Optional[str] = None):
+        self.headless = headless
+        self.capture_network = capture_network
+        self.capture_patterns: List[str] = []
+        self.chrome_path = chrome_path
+        self.browser: Optional[CdpBrowser] = None
+        # current tab, truthy like the selenium driver while the browser runs
+        self.driver: Optional[CdpTab] = None
+        # request id -> url of matching json responses whose body is still loading
+        self.loading: Dict[str, str] = {}
+        # (request id, url) of matching json responses loaded but not read yet
+        self.captured: List[Tuple[str, str]] = []
+        self.capture_lock = threading.Lock()
+
+    @property
+    def driver_capture_network(self) -> bool:
+        """Network events are switched on per page, the running chrome never needs a restart for them"""
+        return self.capture_network
+
+    def setup_browser(self, fresh_instance: bool = False) -> None:
+        """Start chrome browser"""
+        if self.driver and not fresh_instance:
+            return
+        self.cleanup()
+        self.browser = CdpBrowser(self.headless, self.chrome_path)
+        self.browser.start()
+        self.driver = self.browser.new_tab()
+        self.driver.connection.on(self.driver.session_id, "Network.responseReceived", self.on_response)
+        self.driver.connection.on(self.driver.session_id, "Network.loadingFinished", self.on_loading_finished)
+        self.driver.connection.on(self.driver.session_id, "Network.loadingFailed", self.on_loading_failed)
+
+    def on_response(self, params: dict) -> None:
+        """Remember matching json responses, their bodies can be read once loading finished"""
+        response = params.get("response", {})
+        if "json" not in response.get("mimeType", ""):
+            return
+        if not any(re.search(pattern, response.get("url", "")) for pattern in self.capture_patterns):
+            return
+        with self.capture_lock:
+            self.loading[params["requestId"]] = response["url"]
+
+    def on_loading_finished(self, params: dict) -> None:
+        """Mark a matching response as ready to read"""
+        with self.capture_lock:
+            url = self.loading.pop(params.get("requestId"), None)
+            if url:
+                self.captured.append((params["requestId"], url))
+
+    def on_loading_failed(self, params: dict) -> None:
+        """Forget a matching response that never finished"""
+        with self.capture_lock:
+            self.loading.pop(params.get("requestId"), None)
+
+    def wait_for_page(self, selector: str, selector_type: str = "css", timeout: int = 10) -> bool:
+        """Wait for page to load"""
+        if not self.driver:
+            return False
+        if selector_type != "css" and not selector.startswith('['):
+            selector = "." + ".".join(selector.split())
+        try:
+            if self.driver.wait_for_selector(selector, timeout):
+                return True
+        except CdpError as e:
+            print(f"wait_for_page: {e.msg}")
+            return False
+        print("wait_for_page: timeout waiting for page element")
+        return False
+
+    def wait_for_content_loaded(self, timeout: int = 10) -> bool:
+        """Wait for document ready state and pending jQuery requests"""
+        if not self.driver:
+            return False
+        expression = "document.readyState === 'complete' && (typeof jQuery === 'undefined' || jQuery.active == 0)"
+        deadline = time.monotonic() + timeout
+        try:
+            while not self.driver.evaluate(expression):
+                if time.monotonic() > deadline:
+                    return False
+                time.sleep(0.1)
+            return True
+        except CdpError:
+            return False
+
+    def scroll_to_bottom(self, wait_time: float = 1.0) -> None:
+        """Scroll to bottom of page to trigger lazy loading"""
+        if not self.driver:
+            return
+        try:
+            last_height = self.driver.evaluate("document.body.scrollHeight")
+            while True:
+                self.driver.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+                # give lazy loaded content the same time selenium's wait would
+                deadline = time.monotonic() + wait_time
+                while self.driver.evaluate("document.readyState") != "complete" and time.monotonic() < deadline:
+                    time.sleep(0.05)
+                new_height = self.driver.evaluate("document.body.scrollHeight")
+                if new_height == last_height:
+                    break
+                last_height = new_height
+        except CdpError as e:
+            print(f"scroll_to_bottom_and_wait: error during scrolling: {e.msg}")
+
+    def navigate_to_url(self, url: str, auto_scroll: bool = True, site_name: str = "") -> None:
+        """Navigate to URL and optionally trigger lazy loading by scrolling"""
+        if self.driver:
+            self.driver.navigate(url)
+
+            # only auto-scroll for OLX for lazy loading
+            if auto_scroll and site_name.lower() == "olx":
+                self.scroll_to_bottom()
+
+    def start_response_capture(self, url_patterns: List[str]) -> None:
+        """Start collecting responses whose url matches one of the patterns"""
+        if not self.driver or not self.capture_network:
+            return
+        self.capture_patterns = url_patterns
+        self.driver.call("Network.enable")
+        # drop responses of previous pages
+        with self.capture_lock:
+            self.loading = {}
+            self.captured = []
+
+    def get_captured_responses(self) -> List[Tuple[str, object]]:
+        """Get (url, parsed json) for matching responses received since the last call"""
+        if not self.driver or not self.capture_patterns:
+            return []
+        with self.capture_lock:
+            captured, self.captured = self.captured, []
+
+        responses = []
+        for request_id, url in captured:
+            try:
+                body = self.driver.call("Network.getResponseBody", {"requestId": request_id})
+                text = body["body"]
+                if body.get("base64Encoded"):
+                    text = base64.b64decode(text).decode("utf-8")
+                responses.append((url, json.loads(text)))
+            except (CdpError, ValueError) as e:
+                print(f"get_captured_responses: failed to read {url}: {e}")
+        return responses
+
+    def wait_for_responses(self, timeout: float = 10.0) -> List[Tuple[str, object]]:
+        """Wait until at least one matching json response was captured"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            responses = self.get_captured_responses()
+            if responses:
+                return responses
+            time.sleep(0.1)
+        return []
+
+    def get_current_url(self) -> str:
+        """Get current URL"""
+        if self.driver:
+            return self.driver.evaluate("location.href") or ""
+        return ""
+
+    def get_page_source(self) -> str:
+        """Get page source"""
+        if self.driver:
+            return self.driver.get_html()
+        return ""
+
+    def cleanup(self) -> None:
+        """Close browser"""
+        if self.browser:
+            self.browser.stop()
+            self.browser = None
+        self.driver = None
+
+    def __enter__(self):
+        """Context manager entry"""
+        self.setup_browser()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit"""
+        self.cleanup()
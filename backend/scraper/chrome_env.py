@@ -0,0 +1,107 @@
+"""
+mieszkanieo scraper - chrome environment (versions and cache paths)
+"""
+
+import os
+import re
+import sys
+import subprocess
+from importlib import metadata
+from typing import Dict, Optional
+
+import undetected_chromedriver as uc
+
+STATUS_CACHE_FILE = "chromedriver_status.json"
+
+
+def get_cache_dir() -> str:
+    """Get per-user cache directory (same layout as undetected_chromedriver)"""
+    if sys.platform.startswith("win"):
+        path = "~/appdata/roaming/mieszkanieo"
+    elif sys.platform.startswith("darwin"):
+        path = "~/Library/Application Support/mieszkanieo"
+    else:
+        path = "~/.local/share/mieszkanieo"
+
+    path = os.path.abspath(os.path.expanduser(path))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def get_status_cache_path() -> str:
+    """Get path of the cached chromedriver status"""
+    return os.path.join(get_cache_dir(), STATUS_CACHE_FILE)
+
+
+def find_chrome_binary() -> Optional[str]:
+    """Find installed chrome executable"""
+    return uc.find_chrome_executable()
+
+
+def _read_windows_chrome_version() -> Optional[str]:
+    """Read chrome version from the registry without starting chrome"""
+    import winreg
+
+    keys = [
+        (winreg.HKEY_CURRENT_USER, r"Software\Google\Chrome\BLBeacon", "version"),
+        (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall\Google Chrome", "DisplayVersion"),
+        (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall\Google Chrome", "DisplayVersion"),
+    ]
+    for root, path, name in keys:
+        try:
+            with winreg.OpenKey(root, path) as key:
+                value, _ = winreg.QueryValueEx(key, name)
+                if value:
+                    return str(value)
+        except OSError:
+            continue
+    return None
+
+
+def get_chrome_version() -> Optional[str]:
+    """Get installed chrome version, e.g. '120.0.6099.110'"""
+    try:
+        if sys.platform.startswith("win"):
+            return _read_windows_chrome_version()
+
+        binary = find_chrome_binary()
+        if not binary:
+            return None
+        result = subprocess.run([binary, "--version"], capture_output=True, text=True, timeout=10)
+        match = re.search(r"(\d+\.\d+\.\d+\.\d+)", result.stdout)
+        return match.group(1) if match else None
+    except Exception as e:
+        print(f"get_chrome_version: error: {e}", file=sys.stderr)
+        return None
+
+
+def get_chrome_major_version() -> Optional[int]:
+    """Get installed chrome major version"""
+    version = get_chrome_version()
+    return int(version.split(".")[0]) if version else None
+
+
+def get_uc_version() -> Optional[str]:
+    """Get installed undetected-chromedriver version from package metadata"""
+    try:
+        return metadata.version("undetected-chromedriver")
+    except metadata.PackageNotFoundError:
+        return getattr(uc, "__version__", None)
+
+
+def get_versions() -> Dict[str, Optional[str]]:
+    """Get chrome and undetected-chromedriver versions"""
+    return {
+        "chrome": get_chrome_version(),
+        "undetected_chromedriver": get_uc_version()
+    }
+
+
+def report_session_failure() -> None:
+    """Drop cached chromedriver status so the next check launches a test browser"""
+    try:
+        os.remove(get_status_cache_path())
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"report_session_failure: error: {e}", file=sys.stderr)
@@ -0,0 +1,507 @@
+"""
+mieszkanieo scraper - page range leases for crawling from several machines
+"""
+
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from .chrome_env import get_cache_dir
+
+CREATE_TABLES = """
+    CREATE TABLE IF NOT EXISTS leases (
+      id INTEGER PRIMARY KEY,
+      site TEXT NOT NULL,
+      city TEXT NOT NULL,
+      first_page INTEGER NOT NULL,
+      last_page INTEGER,
+      filters TEXT,
+      retry_empty INTEGER NOT NULL DEFAULT 0,
+      status TEXT NOT NULL DEFAULT 'pending',
+      worker TEXT,
+      expires_at REAL,
+      attempts INTEGER NOT NULL DEFAULT 0,
+      error TEXT,
+      UNIQUE (site, city, first_page)
+    );
+    CREATE INDEX IF NOT EXISTS leases_status ON leases (status, id);
+    CREATE TABLE IF NOT EXISTS results (
+      seq INTEGER PRIMARY KEY,
+      id TEXT NOT NULL UNIQUE,
+      site TEXT,
+      city TEXT,
+      lease_id INTEGER,
+      data TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS checkpoints (
+      name TEXT PRIMARY KEY,
+      seq INTEGER NOT NULL
+    );
+"""
+
+LEASE_COLUMNS = "id, site, city, first_page, last_page, filters, retry_empty, attempts"
+
+
+def split_pages(pages, pages_per_lease):
+    """Split sorted page numbers into (first, last) ranges of consecutive pages"""
+    ranges = []
+    for page in pages:
+        if ranges and ranges[-1][1] == page - 1 and page - ranges[-1][0] < pages_per_lease:
+            ranges[-1][1] = page
+        else:
+            ranges.append([page, page])
+    return [tuple(page_range) for page_range in ranges]
+
+
+class LeaseQueue:
+    """Crawl work as (site, city, page range) leases in a shared sqlite file
+
+    Every target starts as a planning lease (last_page NULL) that counts the
+    pages, its result queues the remaining pages as ranges. Claimed leases
+    expire unless the worker heartbeats and then go back to the queue, until
+    max_attempts. Results are kept once per listing id and merged into the
+    app database from here. Workers on this machine use the queue directly,
+    others go through LeaseServer.
+    """
+
+    def __init__(self, db_path=None, pages_per_lease=5, lease_seconds=300, max_attempts=3):
+        self.db_path = db_path or os.path.join(get_cache_dir(), "leases.db")
+        self.pages_per_lease = pages_per_lease
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.conn = None
+        self.lock = threading.RLock()
+
+    def connect(self):
+        """Open queue database (shared by server threads)"""
+        if self.conn:
+            return self.conn
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(CREATE_TABLES)
+        return self.conn
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction, locked against other processes using the file"""
+        with self.lock:
+            conn = self.connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def to_lease(self, row):
+        """Lease dict from a LEASE_COLUMNS row"""
+        lease_id, site, city, first_page, last_page, filters, retry_empty, attempts = row
+        return {
+            "id": lease_id,
+            "site": site,
+            "city": city,
+            "first_page": first_page,
+            "last_page": last_page,
+            "filters": json.loads(filters) if filters else None,
+            "retry_empty": bool(retry_empty),
+            "attempts": attempts
+        }
+
+    def add_targets(self, site, cities, filters=None):
+        """Queue a planning lease per city, returns number added (existing targets are kept)"""
+        filters_json = json.dumps(filters, sort_keys=True) if filters else None
+        added = 0
+        with self.transaction() as conn:
+            for city in cities:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO leases (site, city, first_page, last_page, filters) VALUES (?, ?, 1, NULL, ?)",
+                    (site, city, filters_json)
+                )
+                added += cursor.rowcount
+        return added
+
+    def clear(self):
+        """Drop all leases and results for a fresh crawl"""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM leases")
+            conn.execute("DELETE FROM results")
+            conn.execute("DELETE FROM checkpoints")
+
+    def expire(self, conn, now):
+        """Return leases whose worker stopped heartbeating to the queue"""
+        cursor = conn.execute(
+            "UPDATE leases SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "worker = NULL, expires_at = NULL, error = 'lease expired' "
+            "WHERE status = 'leased' AND expires_at < ?",
+            (self.max_attempts, now)
+        )
+        if cursor.rowcount:
+            print(f"LeaseQueue: {cursor.rowcount} expired leases reassigned", flush=True)
+
+    def claim(self, worker, lease_seconds=None):
+        """Lease the next pending range to worker, None when nothing is pending"""
+        now = time.time()
+        with self.transaction() as conn:
+            self.expire(conn, now)
+            # ranges before planning leases, so started targets finish first
+            row = conn.execute(
+                f"SELECT {LEASE_COLUMNS} FROM leases WHERE status = 'pending' ORDER BY last_page IS NULL, id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE leases SET status = 'leased', worker = ?, expires_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (worker, now + (lease_seconds or self.lease_seconds), row[0])
+            )
+        lease = self.to_lease(row)
+        lease["attempts"] += 1
+        return lease
+
+    def heartbeat(self, lease_id, worker, lease_seconds=None):
+        """Extend lease, False when worker no longer holds it"""
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE leases SET expires_at = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (time.time() + (lease_seconds or self.lease_seconds), lease_id, worker)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, lease_id, worker, result):
+        """Store lease result, new listings are kept once per id
+
+        result is what PropertyScraper.scrape_range returns. A planning result
+        queues the pages not loaded yet; a range that ended early (empty page,
+        price ceiling) skips the target's later ranges. Results of a worker
+        that no longer holds the lease are not accepted, the range may have
+        stopped early and is being crawled by the new holder.
+        """
+        with self.transaction() as conn:
+            failed_pages = result.get("failed_pages") or []
+            cursor = conn.execute(
+                "UPDATE leases SET status = 'done', expires_at = NULL, error = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (f"failed pages {failed_pages}" if failed_pages else None, lease_id, worker)
+            )
+            if cursor.rowcount != 1:
+                return {"accepted": False, "new": 0, "duplicates": 0}
+            lease = self.to_lease(conn.execute(f"SELECT {LEASE_COLUMNS} FROM leases WHERE id = ?", (lease_id,)).fetchone())
+
+            new = 0
+            properties = result.get("properties") or []
+            for prop in properties:
+                if not prop.get("id"):
+                    continue
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO results (id, site, city, lease_id, data) VALUES (?, ?, ?, ?, ?)",
+                    (prop["id"], lease["site"], lease["city"], lease_id, json.dumps(prop, ensure_ascii=False))
+                )
+                new += cursor.rowcount
+
+            total_pages = result.get("total_pages")
+            if lease["last_page"] is None and total_pages:
+                done = set(result.get("pages_done") or [])
+                pages = [page for page in range(1, total_pages + 1) if page not in done]
+                filters_json = json.dumps(lease["filters"], sort_keys=True) if lease["filters"] else None
+                conn.executemany(
+                    "INSERT OR IGNORE INTO leases (site, city, first_page, last_page, filters, retry_empty) VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (lease["site"], lease["city"], first, last, filters_json, int(bool(result.get("retry_empty"))))
+                        for first, last in split_pages(pages, self.pages_per_lease)
+                    ]
+                )
+                print(f"LeaseQueue: {lease['site']}/{lease['city']}: {total_pages} pages planned", flush=True)
+
+            if result.get("end_page"):
+                conn.execute(
+                    "UPDATE leases SET status = 'skipped' WHERE site = ? AND city = ? AND first_page > ? AND status = 'pending'",
+                    (lease["site"], lease["city"], result["end_page"])
+                )
+
+        return {"accepted": True, "new": new, "duplicates": len(properties) - new}
+
+    def fail(self, lease_id, worker, error):
+        """Give lease back after an error (failed for good after max_attempts)"""
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE leases SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "worker = NULL, expires_at = NULL, error = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (self.max_attempts, str(error)[:500], lease_id, worker)
+            )
+        return cursor.rowcount == 1
+
+    def status(self):
+        """Lease counts by status and number of merged and unmerged listings"""
+        with self.lock:
+            conn = self.connect()
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM leases GROUP BY status").fetchall())
+            listings = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            merged = self.get_checkpoint(conn)
+            unmerged = conn.execute("SELECT COUNT(*) FROM results WHERE seq > ?", (merged,)).fetchone()[0]
+        for status in ("pending", "leased", "done", "failed", "skipped"):
+            counts.setdefault(status, 0)
+        return {"leases": counts, "listings": listings, "unmerged": unmerged}
+
+    def get_checkpoint(self, conn):
+        """Last merged result seq"""
+        row = conn.execute("SELECT seq FROM checkpoints WHERE name = 'merged'").fetchone()
+        return row[0] if row else 0
+
+    def merge_results(self, send, batch_size=500):
+        """Send listings not merged yet; send returns saved count or None on failure"""
+        saved_total = 0
+        while True:
+            with self.lock:
+                conn = self.connect()
+                checkpoint = self.get_checkpoint(conn)
+                rows = conn.execute(
+                    "SELECT seq, data FROM results WHERE seq > ? ORDER BY seq LIMIT ?",
+                    (checkpoint, batch_size)
+                ).fetchall()
+            if not rows:
+                break
+
+            saved = send([json.loads(data) for _, data in rows])
+            if saved is None:
+                print(f"LeaseQueue: merge stopped, sink did not accept {len(rows)} listings", flush=True)
+                break
+            saved_total += saved
+            with self.transaction() as conn:
+                conn.execute("INSERT OR REPLACE INTO checkpoints (name, seq) VALUES ('merged', ?)", (rows[-1][0],))
+        return saved_total
+
+    def close(self):
+        """Close queue database"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+
+class LeaseServer:
+    """Serves a LeaseQueue over http (json POST /claim, /heartbeat, /complete, /fail, GET /status)"""
+
+    def __init__(self, queue, token=None):
+        self.queue = queue
+        # shared secret workers send as X-Lease-Token
+        self.token = token
+        self._server = None
+
+    def handle(self, path, body):
+        """Run queue call for path, returns json-able response"""
+        if path == "/claim":
+            return {"lease": self.queue.claim(body["worker"], body.get("lease_seconds"))}
+        if path == "/heartbeat":
+            return {"held": self.queue.heartbeat(body["lease_id"], body["worker"], body.get("lease_seconds"))}
+        if path == "/complete":
+            return self.queue.complete(body["lease_id"], body["worker"], body["result"])
+        if path == "/fail":
+            return {"returned": self.queue.fail(body["lease_id"], body["worker"], body.get("error", ""))}
+        return None
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve in a background thread, False when the port is taken"""
+        if self._server:
+            return True
+
+        lease_server = self
+
+        class LeaseHandler(BaseHTTPRequestHandler):
+            def send_json(self, status, data):
+                body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def authorized(self):
+                if lease_server.token and self.headers.get("X-Lease-Token") != lease_server.token:
+                    self.send_json(403, {"error": "bad token"})
+                    return False
+                return True
+
+            def do_GET(self):
+                if not self.authorized():
+                    return
+                if self.path.split("?")[0] != "/status":
+                    self.send_error(404)
+                    return
+                self.send_json(200, lease_server.queue.status())
+
+            def do_POST(self):
+                if not self.authorized():
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                    body = json.loads(self.rfile.read(length).decode("utf-8") or "{}")
+                    response = lease_server.handle(self.path.split("?")[0], body)
+                except (KeyError, ValueError) as e:
+                    self.send_json(400, {"error": f"bad request: {e}"})
+                    return
+                except sqlite3.Error as e:
+                    self.send_json(500, {"error": str(e)})
+                    return
+                if response is None:
+                    self.send_error(404)
+                    return
+                self.send_json(200, response)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((host, port), LeaseHandler)
+        except OSError as e:
+            print(f"LeaseServer: cannot listen on {host}:{port}: {e}", flush=True)
+            return False
+
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        print(f"LeaseServer: serving leases on http://{host}:{port}", flush=True)
+        return True
+
+    def stop(self):
+        """Stop http server"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class LeaseClient:
+    """LeaseQueue calls against a remote LeaseServer"""
+
+    def __init__(self, url, token=None, timeout=30, attempts=3):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.attempts = attempts
+        self.session = requests.Session()
+        if token:
+            self.session.headers["X-Lease-Token"] = token
+
+    def request(self, method, path, body=None):
+        """Call server, retrying connection errors with backoff"""
+        for attempt in range(1, self.attempts + 1):
+            try:
+                response = self.session.request(method, self.url + path, json=body, timeout=self.timeout)
+                response.raise_for_status()
+                return response.json()
+            except requests.RequestException as e:
+                if attempt == self.attempts:
+                    raise
+                print(f"LeaseClient: {path} failed ({e}), retrying", flush=True)
+                time.sleep(2 ** attempt)
+
+    def claim(self, worker, lease_seconds=None):
+        """Lease the next pending range"""
+        return self.request("POST", "/claim", {"worker": worker, "lease_seconds": lease_seconds})["lease"]
+
+    def heartbeat(self, lease_id, worker, lease_seconds=None):
+        """Extend lease"""
+        return self.request("POST", "/heartbeat", {"lease_id": lease_id, "worker": worker, "lease_seconds": lease_seconds})["held"]
+
+    def complete(self, lease_id, worker, result):
+        """Send lease result"""
+        return self.request("POST", "/complete", {"lease_id": lease_id, "worker": worker, "result": result})
+
+    def fail(self, lease_id, worker, error):
+        """Give lease back"""
+        return self.request("POST", "/fail", {"lease_id": lease_id, "worker": worker, "error": str(error)})["returned"]
+
+    def status(self):
+        """Queue status"""
+        return self.request("GET", "/status")
+
+
+class CrawlWorker:
+    """Claims leases from a LeaseQueue or LeaseClient and scrapes them with one PropertyScraper
+
+    The browser is kept between leases. A heartbeat thread extends the
+    current lease; when the lease is lost the range stops at the next page.
+    """
+
+    def __init__(self, queue, configs, scraper, worker_id=None, lease_seconds=300, idle_wait=15):
+        self.queue = queue
+        # site name -> site config
+        self.configs = configs
+        self.scraper = scraper
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.idle_wait = idle_wait
+        self.leases_done = 0
+
+    def heartbeat(self, lease, lost, stop):
+        """Extend lease every third of its duration until stopped"""
+        while not stop.wait(self.lease_seconds / 3):
+            try:
+                if not self.queue.heartbeat(lease["id"], self.worker_id, self.lease_seconds):
+                    print(f"CrawlWorker: lost lease {lease['id']}", flush=True)
+                    lost.set()
+                    return
+            except Exception as e:
+                print(f"CrawlWorker: heartbeat failed: {e}", flush=True)
+
+    def run_lease(self, lease):
+        """Scrape one lease and report its result"""
+        print(f"CrawlWorker: lease {lease['id']}: {lease['site']}/{lease['city']} pages {lease['first_page']}-{lease['last_page'] or '?'}", flush=True)
+        lost = threading.Event()
+        stop = threading.Event()
+        beat = threading.Thread(target=self.heartbeat, args=(lease, lost, stop), daemon=True)
+        beat.start()
+        try:
+            result = self.scraper.scrape_range(
+                lease["city"], self.configs[lease["site"]], lease["first_page"], lease["last_page"],
+                lease["filters"], lease["retry_empty"], keep_going=lambda: not lost.is_set()
+            )
+        except Exception as e:
+            print(f"CrawlWorker: lease {lease['id']} failed: {e}", flush=True)
+            # the browser may be what broke
+            self.scraper.cleanup()
+            try:
+                self.queue.fail(lease["id"], self.worker_id, e)
+            except Exception as e:
+                print(f"CrawlWorker: cannot return lease {lease['id']}: {e}", flush=True)
+            return
+        finally:
+            stop.set()
+            beat.join()
+
+        if lost.is_set():
+            # the new holder crawls the whole range, a partial result would end it early
+            print(f"CrawlWorker: dropping result of lost lease {lease['id']}", flush=True)
+            return
+        try:
+            response = self.queue.complete(lease["id"], self.worker_id, result)
+        except Exception as e:
+            # the lease expires and is scraped again
+            print(f"CrawlWorker: cannot report lease {lease['id']}: {e}", flush=True)
+            return
+        if not response["accepted"]:
+            print(f"CrawlWorker: lease {lease['id']} was reassigned, result dropped", flush=True)
+            return
+        self.leases_done += 1
+        print(f"CrawlWorker: lease {lease['id']} done: {response['new']} new listings, {response['duplicates']} duplicates", flush=True)
+
+    def run(self, max_leases=None):
+        """Work until the queue is drained (nothing pending or leased) or after max_leases"""
+        try:
+            while max_leases is None or self.leases_done < max_leases:
+                lease = self.queue.claim(self.worker_id, self.lease_seconds)
+                if lease is None:
+                    # leased targets may still plan ranges or expire
+                    if not self.queue.status()["leases"]["leased"]:
+                        break
+                    time.sleep(self.idle_wait)
+                    continue
+                self.run_lease(lease)
+        finally:
+            self.scraper.cleanup()
+        print(f"CrawlWorker: {self.worker_id} finished {self.leases_done} leases", flush=True)
+        return self.leases_done
@@ -4,10 +4,18 @@ mieszkanieo scraper - data extraction
 
 import hashlib
 
+from .metrics import metrics
+from .listing_index import ListingIndex
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
 
 class DataExtractor:
     """Handles data extraction and parsing from HTML elements"""
     
+    def __init__(self, selector_stats=None):
+        # SelectorStats tries the selectors that hit most first
+        self.selector_stats = selector_stats
+    
     def apply_processing_rules(self, text, rules):
         """Apply processing rules to text"""
         if not rules or not text:
@@ -24,8 +32,44 @@ class DataExtractor:
         
         return result
     
-    def find_in_element(self, element, selectors):
+    def canonicalize_url(self, link, config):
+        """Normalize listing url using site rules (tracking params, fragments, host aliases)"""
+        rules = config.get("url_canonicalization")
+        if not rules:
+            return link
+        
+        parts = urlsplit(link)
+        query = parse_qsl(parts.query, keep_blank_values=True)
+        
+        # promoted listings can be wrapped in a click-tracking redirect
+        unwrap_param = rules.get("unwrap_param")
+        if unwrap_param:
+            for key, value in query:
+                if key == unwrap_param and value.startswith("http"):
+                    return self.canonicalize_url(value, config)
+        
+        if rules.get("strip_query"):
+            keep = set(rules.get("keep_params", []))
+            query = [(key, value) for key, value in query if key in keep]
+        
+        # only known aliases of the site's own host, links to other sites stay as they are
+        netloc = parts.netloc.lower()
+        netloc = rules.get("host_aliases", {}).get(netloc, netloc)
+        path = parts.path.rstrip("/") if rules.get("strip_trailing_slash") else parts.path
+        fragment = "" if rules.get("strip_fragment", True) else parts.fragment
+        return urlunsplit(("https" if rules.get("force_https") else parts.scheme, netloc, path, urlencode(query), fragment))
+    
+    def make_listing_id(self, link):
+        """Stable 12 character listing id from canonical url"""
+        return hashlib.blake2b(link.encode(), digest_size=6).hexdigest()
+    
+    def find_in_element(self, element, selectors, site=None, field=None):
         """Find text in element using multiple selectors"""
+        element = ListingIndex.of(element)
+        track = self.selector_stats is not None and field
+        if track:
+            selectors = self.selector_stats.order(site, field, selectors)
+        
         for selector in selectors:
             tag, css_class = selector[0], selector[1] if len(selector) > 1 else ""
             
@@ -34,14 +78,24 @@ class DataExtractor:
             else:
                 found = element.find(tag)
             
+            text = element.text(found) if found else ""
+            if track:
+                self.selector_stats.record(site, field, selector, self.is_field_value(field, text))
             if found:
-                return found.get_text(strip=True)
+                return text
         return ""
     
-    def find_with_fallback(self, listing, primary_selectors, fallback_config):
+    def is_field_value(self, field, text):
+        """Check that selector text gives a value for the field (a badge is no price)"""
+        if field in ("price", "area"):
+            return self.extract_number(text) > 0
+        return bool(text.strip())
+    
+    def find_with_fallback(self, listing, primary_selectors, fallback_config, site=None, field=None):
         """Find element with fallback options"""
+        listing = ListingIndex.of(listing)
         # try primary selectors first
-        text = self.find_in_element(listing, primary_selectors)
+        text = self.find_in_element(listing, primary_selectors, site, field)
         
         if text or not fallback_config:
             return text
@@ -50,13 +104,16 @@ class DataExtractor:
         if "selector" in fallback_config:
             tag, css_class = fallback_config["selector"]
             element = listing.find(tag, class_=css_class) if css_class else listing.find(tag)
-            
+            text = ""
             if element and "nested" in fallback_config:
-                nested_elements = element.find_all(fallback_config["nested"][0])
+                nested_elements = listing.find_all(fallback_config["nested"][0], within=element)
                 if nested_elements:
-                    return nested_elements[0].get_text(strip=True)
+                    text = listing.text(nested_elements[0])
             elif element:
-                return element.get_text(strip=True)
+                text = listing.text(element)
+            if self.selector_stats is not None and field:
+                self.selector_stats.record(site, f"{field}_fallback", fallback_config["selector"], self.is_field_value(field, text))
+            return text
         
         return ""
     
@@ -65,6 +122,7 @@ class DataExtractor:
         rules = config.get("processing_rules", {})
         
         if extraction_type == "details" and "details_extraction" in rules:
+            listing = ListingIndex.of(listing)
             details_rules = rules["details_extraction"]
             results = {}
             
@@ -76,14 +134,14 @@ class DataExtractor:
                     # look for p tags that contain the search text
                     p_elements = listing.find_all("p")
                     for p_element in p_elements:
-                        p_text = p_element.get_text()
+                        p_text = listing.text(p_element, strip=False)
                         if search_text in p_text:
                             # extract from specified nested element within this specific p tag
                             if "extract_from" in field_config:
-                                nested = p_element.find_all(field_config["extract_from"])
+                                nested = listing.find_all(field_config["extract_from"], within=p_element)
                                 if nested:
                                     # get all strong tags and combine their text for this specific field
-                                    value_parts = [strong.get_text().strip() for strong in nested]
+                                    value_parts = [listing.text(strong, strip=False).strip() for strong in nested]
                                     value_text = "".join(value_parts)
                                     
                                     # use proper floor extraction for level field
@@ -123,6 +181,7 @@ class DataExtractor:
     
     def find_attribute(self, element, tag, css_class, attr):
         """Find attribute value in element"""
+        element = ListingIndex.of(element)
         if css_class:
             found = element.find(tag, class_=css_class)
         else:
@@ -212,6 +271,8 @@ class DataExtractor:
     def extract_property(self, listing, city, config):
         """Extract property data from listing element"""
         try:
+            # one traversal, every field lookup below is an index hit
+            listing = ListingIndex.of(listing)
             selectors = config["selectors"]
             
             # get link
@@ -219,14 +280,18 @@ class DataExtractor:
             
             if isinstance(link_config, dict) and link_config.get("nested"):
                 parent = listing.find(link_config["tag"], class_=link_config["class"])
-                link_elem = parent.find(link_config["nested"]["tag"]) if parent else None
+                link_elem = listing.find(link_config["nested"]["tag"], within=parent) if parent else None
             elif isinstance(link_config, list):
                 # handle list format like [["a", "_1e32a_zIS-q"]]
                 link_elem = None
+                if self.selector_stats is not None:
+                    link_config = self.selector_stats.order(config["site_name"], "link", link_config)
                 for selector in link_config:
                     if len(selector) >= 2:
                         tag, css_class = selector[0], selector[1]
                         link_elem = listing.find(tag, class_=css_class)
+                        if self.selector_stats is not None:
+                            self.selector_stats.record(config["site_name"], "link", selector, link_elem is not None)
                         if link_elem:
                             break
             else:
@@ -234,13 +299,16 @@ class DataExtractor:
                 link_elem = listing.find("a")
             
             if not link_elem:
+                metrics.extraction_failures.inc(site=config["site_name"], selector="link")
                 return None
         except Exception as e:
             print(f"ERROR: Error in extract_property: {e}")
+            metrics.extraction_failures.inc(site=config["site_name"], selector="link")
             return None
         
         link = link_elem.get("href", "")
         if not link:
+            metrics.extraction_failures.inc(site=config["site_name"], selector="link")
             return None
         
         # make full url
@@ -249,16 +317,19 @@ class DataExtractor:
         elif not link.startswith("http"):
             link = config["base_domain"] + "/" + link
         
+        link = self.canonicalize_url(link, config)
+        
         # get title - handle data attributes
         title = ""
         title_config = selectors["title"]
         if isinstance(title_config, dict) and title_config.get("data_cy"):
             title_elem = listing.find(title_config["tag"], attrs={"data-cy": title_config["data_cy"]})
-            title = title_elem.get_text(strip=True) if title_elem else ""
+            title = listing.text(title_elem) if title_elem else ""
         else:
-            title = self.find_in_element(listing, selectors["title"])
+            title = self.find_in_element(listing, selectors["title"], config["site_name"], "title")
         
         if not title:
+            metrics.extraction_failures.inc(site=config["site_name"], selector="title")
             return None
         
         # get address - handle data attributes or extract from title
@@ -267,10 +338,10 @@ class DataExtractor:
         
         if isinstance(address_config, dict) and address_config.get("data_sentry_component"):
             address_elem = listing.find(address_config["tag"], attrs={"data-sentry-component": address_config["data_sentry_component"]})
-            address = address_elem.get_text(strip=True) if address_elem else ""
+            address = listing.text(address_elem) if address_elem else ""
         else:
             try:
-                address = self.find_in_element(listing, selectors["address"])
+                address = self.find_in_element(listing, selectors["address"], config["site_name"], "address")
             except Exception as e:
                 address = ""
         
@@ -291,7 +362,7 @@ class DataExtractor:
         price_config = selectors["price"]
         if isinstance(price_config, dict) and price_config.get("data_sentry_element"):
             price_elem = listing.find(price_config["tag"], attrs={"data-sentry-element": price_config["data_sentry_element"]})
-            price_text = price_elem.get_text(strip=True) if price_elem else ""
+            price_text = listing.text(price_elem) if price_elem else ""
         elif isinstance(price_config, dict) and price_config.get("attribute") and price_config.get("data_pattern"):
             # handle attribute-based extraction
             pattern = price_config["data_pattern"]
@@ -306,7 +377,9 @@ class DataExtractor:
             price_text = self.find_with_fallback(
                 listing, 
                 selectors["price"], 
-                rules.get("price_fallback")
+                rules.get("price_fallback"),
+                config["site_name"],
+                "price"
             )
         
         price = self.extract_number(price_text)
@@ -321,7 +394,7 @@ class DataExtractor:
             elif img_config.get("nested"):
                 picture = listing.find(img_config["tag"], class_=img_config["class"])
                 if picture:
-                    source = picture.find(img_config["nested"]["tag"])
+                    source = listing.find(img_config["nested"]["tag"], within=picture)
                     if source:
                         image = source.get(img_config["attribute"], "")
             else:
@@ -382,15 +455,15 @@ class DataExtractor:
                 dd_elements = listing.find_all("dd", class_="css-17je0kd")
                 if len(dd_elements) >= 3:
                     # rooms is first dd
-                    rooms_text = dd_elements[0].get_text(strip=True)
+                    rooms_text = listing.text(dd_elements[0])
                     rooms = self.extract_number(rooms_text)
                     
                     # area is second dd
-                    area_text = dd_elements[1].get_text(strip=True)
+                    area_text = listing.text(dd_elements[1])
                     area = self.extract_number(area_text)
                     
                     # level is third dd
-                    level_text = dd_elements[2].get_text(strip=True)
+                    level_text = listing.text(dd_elements[2])
                     level = self.extract_floor_number(level_text)
             
             # handle allegro-style label-value pairs
@@ -401,9 +474,9 @@ class DataExtractor:
                 
                 # Create label-value mapping
                 for i, label_span in enumerate(label_spans):
-                    label_text = label_span.get_text(strip=True).lower()
+                    label_text = listing.text(label_span).lower()
                     if i < len(value_spans):
-                        value_text = value_spans[i].get_text(strip=True)
+                        value_text = listing.text(value_spans[i])
                         
                         if "powierzchnia" in label_text:
                             area = self.extract_number(value_text)
@@ -417,7 +490,9 @@ class DataExtractor:
                 area_text = self.find_with_fallback(
                     listing, 
                     details_config["area"], 
-                    rules.get("area_fallback")
+                    rules.get("area_fallback"),
+                    config["site_name"],
+                    "area"
                 )
                 area = self.extract_number(area_text)
                 
@@ -432,13 +507,13 @@ class DataExtractor:
                     # get room count from specific data-testid
                     room_span = listing.find("span", {"data-testid": "number-of-rooms-offerbox"})
                     if room_span:
-                        rooms = self.extract_number(room_span.get_text())
+                        rooms = self.extract_number(listing.text(room_span, strip=False))
                     
                     # get area from ngl9ymk spans that don't have data-testid
                     area_spans = listing.find_all("span", class_="ngl9ymk")
                     for span in area_spans:
                         if not span.get("data-testid"):  # no data-testid means its area
-                            span_text = span.get_text()
+                            span_text = listing.text(span, strip=False)
                             if any(char.isdigit() for char in span_text):
                                 area = self.extract_number(span_text)
                                 break
@@ -446,11 +521,16 @@ class DataExtractor:
                     # other simple detail sites
                     detail_spans = listing.find_all(details_config["tag"], class_=details_config["class"])
                     if len(detail_spans) >= 2:
-                        rooms = self.extract_number(detail_spans[0].get_text())
-                        area = self.extract_number(detail_spans[1].get_text())
+                        rooms = self.extract_number(listing.text(detail_spans[0], strip=False))
+                        area = self.extract_number(listing.text(detail_spans[1], strip=False))
+        
+        # fields the listing is still saved without
+        for field, found in (("price", price), ("image", image), ("area", area)):
+            if not found:
+                metrics.extraction_failures.inc(site=config["site_name"], selector=field)
         
         return {
-            "id": hashlib.md5(link.encode()).hexdigest()[:12],
+            "id": self.make_listing_id(link),
             "title": title,
             "price": price,
             "area": area,
@@ -462,3 +542,113 @@ class DataExtractor:
             "link": link,
             "image": image
         }
+    
+    def get_json_value(self, data, path):
+        """Get value from nested json by dotted path (e.g. 'photos.0.link')"""
+        value = data
+        for key in path.split(".") if path else []:
+            if isinstance(value, list):
+                try:
+                    value = value[int(key)]
+                except (ValueError, IndexError):
+                    return None
+            elif isinstance(value, dict):
+                value = value.get(key)
+            else:
+                return None
+            if value is None:
+                return None
+        return value
+    
+    def get_json_field(self, item, field_config):
+        """Get raw field value from json listing using xhr_capture field config"""
+        # list of configs: join found parts (e.g. city, district)
+        if isinstance(field_config, list):
+            parts = [self.get_json_field(item, part) for part in field_config]
+            return ", ".join(str(part) for part in parts if part not in (None, ""))
+        
+        if isinstance(field_config, str):
+            return self.get_json_value(item, field_config)
+        
+        source = item
+        # params lists like [{"key": "m", "value": {...}}]
+        if field_config.get("param"):
+            params = self.get_json_value(item, field_config.get("params_path", "params")) or []
+            source = next((param for param in params if isinstance(param, dict) and param.get("key") == field_config["param"]), None)
+            if source is None:
+                return None
+        
+        value = self.get_json_value(source, field_config.get("path", ""))
+        if value is not None and "map" in field_config:
+            value = field_config["map"].get(str(value))
+        if isinstance(value, str):
+            for old, new in field_config.get("replace", {}).items():
+                value = value.replace(old, new)
+        return value
+    
+    def extract_json_property(self, item, city, config):
+        """Extract property data from one listing of a captured json response"""
+        fields = config["xhr_capture"]["fields"]
+        
+        link = self.get_json_field(item, fields["link"])
+        title = self.get_json_field(item, fields["title"])
+        if not link or not title or not isinstance(link, str):
+            return None
+        
+        if link.startswith("/"):
+            link = config["base_domain"] + link
+        link = self.canonicalize_url(link, config)
+        
+        def number(field):
+            value = self.get_json_field(item, fields[field]) if field in fields else None
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                return int(value)
+            return self.extract_number(str(value)) if value is not None else 0
+        
+        rooms = number("rooms") or None
+        level = None
+        if "level" in fields:
+            level_value = self.get_json_field(item, fields["level"])
+            if isinstance(level_value, int) and not isinstance(level_value, bool):
+                level = level_value
+            elif level_value is not None:
+                level = self.extract_floor_number(str(level_value))
+        
+        address = self.get_json_field(item, fields["address"]) if "address" in fields else ""
+        if not address:
+            address = self.extract_address_from_title(str(title), city, config)
+        
+        image = self.get_json_field(item, fields["image"]) if "image" in fields else ""
+        
+        return {
+            "id": self.make_listing_id(link),
+            "title": str(title).strip(),
+            "price": number("price"),
+            "area": number("area"),
+            "rooms": rooms,
+            "level": level,
+            "address": str(address),
+            "city": city.title(),
+            "site": config["site_name"],
+            "link": link,
+            "image": image if isinstance(image, str) else ""
+        }
+    
+    def extract_from_json(self, payload, city, config):
+        """Extract properties from a captured json response"""
+        items = self.get_json_value(payload, config["xhr_capture"].get("items_path", ""))
+        if not isinstance(items, list):
+            return []
+        
+        properties = []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            try:
+                prop = self.extract_json_property(item, city, config)
+            except Exception as e:
+                print(f"ERROR: Error in extract_json_property: {e}")
+                continue
+            if prop:
+                properties.append(prop)
+        return properties
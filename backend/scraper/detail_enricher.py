@@ -0,0 +1,106 @@
+"""
+mieszkanieo scraper - detail page enrichment
+"""
+
+import requests
+from concurrent.futures import ThreadPoolExecutor, wait
+from bs4 import BeautifulSoup
+
+from .data_extractor import DataExtractor
+
+
+class DetailEnricher:
+    """Fetches detail pages for listings with missing fields while pagination continues"""
+
+    def __init__(self, max_workers=4, timeout=15, known_ids=None):
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.data_extractor = DataExtractor()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.known_ids = set(known_ids or ())
+        self.pending = {}
+        self.enriched_count = 0
+
+    def missing_fields(self, prop, config):
+        """Get fields that are missing and have a detail selector"""
+        missing = []
+        for field in config.get("detail_selectors", {}):
+            value = prop.get(field)
+            # area 0 means not found, rooms/level use None
+            if value is None or (field == "area" and not value):
+                missing.append(field)
+        return missing
+
+    def submit(self, properties, config):
+        """Schedule fetches for incomplete listings, returns properties ready to save now"""
+        ready = []
+        for prop in properties:
+            missing = self.missing_fields(prop, config)
+            if not missing or prop["id"] in self.known_ids:
+                ready.append(prop)
+                continue
+            self.known_ids.add(prop["id"])
+            future = self.executor.submit(self.enrich_property, prop, missing, config)
+            self.pending[future] = prop
+        return ready
+
+    def collect(self, wait_all=False):
+        """Get enriched properties whose detail pages are done"""
+        if wait_all and self.pending:
+            wait(list(self.pending))
+
+        done = []
+        for future in [future for future in self.pending if future.done()]:
+            prop = self.pending.pop(future)
+            try:
+                if future.result():
+                    self.enriched_count += 1
+            except Exception as e:
+                print(f"DetailEnricher: failed {prop['link']}: {e}")
+            done.append(prop)
+        return done
+
+    def enrich_property(self, prop, fields, config):
+        """Fetch detail page and patch missing fields in place, returns True if anything was found"""
+        response = requests.get(prop["link"], timeout=self.timeout, headers={
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+        })
+        if response.status_code != 200:
+            return False
+
+        soup = BeautifulSoup(response.text, "html.parser")
+        found = False
+        for field in fields:
+            text = self.find_detail_text(soup, config["detail_selectors"][field])
+            if not text:
+                continue
+            if field == "level":
+                value = self.data_extractor.extract_floor_number(text)
+            else:
+                value = self.data_extractor.extract_number(text) or None
+            if value is not None:
+                prop[field] = value
+                found = True
+        return found
+
+    def find_detail_text(self, soup, selector):
+        """Find field text on detail page, e.g. 'Poziom: 3' -> '3'"""
+        if "search_text" in selector:
+            search_text = selector["search_text"]
+            for element in soup.find_all(selector.get("tag", "p")):
+                text = element.get_text(" ", strip=True)
+                if search_text in text:
+                    return text.split(search_text, 1)[1].strip()
+            return ""
+
+        if selector.get("class"):
+            element = soup.find(selector["tag"], class_=selector["class"])
+        else:
+            element = soup.find(selector["tag"])
+        return element.get_text(strip=True) if element else ""
+
+    def shutdown(self):
+        """Stop worker threads, a later submit starts new ones"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self.pending = {}
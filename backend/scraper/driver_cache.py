@@ -0,0 +1,119 @@
+"""
+mieszkanieo scraper - shared patched chromedriver cache
+"""
+
+import os
+import sys
+import time
+import glob
+import shutil
+from contextlib import contextmanager
+from typing import Optional
+
+import undetected_chromedriver as uc
+
+from .chrome_env import get_cache_dir, get_chrome_major_version, get_uc_version
+
+
+class DriverCache:
+    """Prepares the patched chromedriver once and shares it between browser launches"""
+
+    def __init__(self, cache_dir: Optional[str] = None, lock_timeout: float = 180.0):
+        self._cache_dir = cache_dir
+        self.lock_timeout = lock_timeout
+        self.exe_suffix = ".exe" if sys.platform.startswith("win") else ""
+
+    @property
+    def cache_dir(self) -> str:
+        """Cache directory, resolved on first use"""
+        if not self._cache_dir:
+            self._cache_dir = os.path.join(get_cache_dir(), "drivers")
+        return self._cache_dir
+
+    def get_driver_path(self, version_main: Optional[int] = None) -> Optional[str]:
+        """Get path of a patched driver for installed chrome, preparing it if needed"""
+        version_main = version_main or get_chrome_major_version()
+        if not version_main:
+            return None
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        uc_version = get_uc_version() or "unknown"
+        driver_path = os.path.join(
+            self.cache_dir, f"chromedriver_{version_main}_uc{uc_version}{self.exe_suffix}"
+        )
+
+        if self._is_ready(driver_path):
+            return driver_path
+
+        # only one process downloads and patches, others wait and reuse it
+        with self._lock(driver_path + ".lock"):
+            if not self._is_ready(driver_path):
+                self._prepare(version_main, driver_path)
+                self._remove_stale(driver_path)
+
+        return driver_path
+
+    def _is_ready(self, driver_path: str) -> bool:
+        """Check if cached driver exists and is patched"""
+        if not os.path.exists(driver_path):
+            return False
+        return uc.Patcher(executable_path=driver_path).is_binary_patched()
+
+    def _prepare(self, version_main: int, driver_path: str) -> None:
+        """Download and patch driver, then move it into the cache atomically"""
+        print(f"DriverCache: preparing chromedriver {version_main}", flush=True)
+        patcher = uc.Patcher(version_main=version_main)
+        patcher.auto()
+
+        tmp_path = f"{driver_path}.{os.getpid()}.tmp"
+        shutil.copy2(patcher.executable_path, tmp_path)
+        os.replace(tmp_path, driver_path)
+
+        try:
+            os.remove(patcher.executable_path)
+        except OSError:
+            pass
+        print(f"DriverCache: cached {driver_path}", flush=True)
+
+    def _remove_stale(self, driver_path: str) -> None:
+        """Remove drivers for older chrome or uc versions"""
+        for path in glob.glob(os.path.join(self.cache_dir, "chromedriver_*")):
+            if path == driver_path or path.endswith(".lock"):
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                # still in use by a running browser
+                pass
+
+    @contextmanager
+    def _lock(self, lock_path: str):
+        """Cross-process lock based on exclusive file creation"""
+        start = time.monotonic()
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode())
+                os.close(fd)
+                break
+            except FileExistsError:
+                # lock left behind by a crashed process
+                try:
+                    if time.time() - os.path.getmtime(lock_path) > self.lock_timeout:
+                        os.remove(lock_path)
+                        continue
+                except OSError:
+                    continue
+                if time.monotonic() - start > self.lock_timeout:
+                    raise TimeoutError(f"timeout waiting for {lock_path}")
+                time.sleep(0.2)
+        try:
+            yield
+        finally:
+            try:
+                os.remove(lock_path)
+            except OSError:
+                pass
+
+
+driver_cache = DriverCache()
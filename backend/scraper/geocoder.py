@@ -0,0 +1,296 @@
+"""
+mieszkanieo scraper - offline geocoding from a local gazetteer
+"""
+
+import os
+import re
+import csv
+import math
+from unidecode import unidecode
+
+EARTH_RADIUS_KM = 6371.0
+
+# address words that are not part of a place name
+NAME_PREFIXES = {"ul", "al", "pl", "os", "gm", "pow", "woj", "dzielnica"}
+
+
+def normalize_name(text):
+    """Normalize place name for lookups, e.g. 'ul. Praga-Północ' -> 'praga polnoc'"""
+    tokens = re.sub(r"[^a-z0-9]+", " ", unidecode(text or "").lower()).split()
+    while tokens and tokens[0] in NAME_PREFIXES:
+        tokens = tokens[1:]
+    return " ".join(tokens)
+
+
+def to_unit_vector(lat, lon):
+    """Point on the unit sphere for lat/lon in degrees"""
+    lat_rad, lon_rad = math.radians(lat), math.radians(lon)
+    return (
+        math.cos(lat_rad) * math.cos(lon_rad),
+        math.cos(lat_rad) * math.sin(lon_rad),
+        math.sin(lat_rad)
+    )
+
+
+def chord_to_km(chord):
+    """Great-circle distance for a chord length on the unit sphere"""
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def km_to_chord(distance_km):
+    """Chord length on the unit sphere for a great-circle distance"""
+    return 2 * math.sin(min(math.pi, distance_km / EARTH_RADIUS_KM) / 2)
+
+
+class KDTree:
+    """Static 3d tree over points on the sphere for nearest and radius queries"""
+
+    def __init__(self, points):
+        """Build from (lat, lon, item) tuples"""
+        self.points = [(to_unit_vector(lat, lon), item) for lat, lon, item in points]
+        self.root = self._build(list(range(len(self.points))), 0)
+
+    def __len__(self):
+        return len(self.points)
+
+    def _build(self, indexes, depth):
+        """Build subtree as (point index, axis, left, right)"""
+        if not indexes:
+            return None
+        axis = depth % 3
+        indexes.sort(key=lambda i: self.points[i][0][axis])
+        middle = len(indexes) // 2
+        return (
+            indexes[middle],
+            axis,
+            self._build(indexes[:middle], depth + 1),
+            self._build(indexes[middle + 1:], depth + 1)
+        )
+
+    def nearest(self, lat, lon):
+        """Get (distance km, item) of the closest point or None"""
+        if self.root is None:
+            return None
+        target = to_unit_vector(lat, lon)
+        best = [float("inf"), None]
+
+        def search(node):
+            if node is None:
+                return
+            index, axis, left, right = node
+            point = self.points[index][0]
+            dist_sq = sum((a - b) ** 2 for a, b in zip(point, target))
+            if dist_sq < best[0]:
+                best[0], best[1] = dist_sq, index
+            diff = target[axis] - point[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            search(near)
+            if diff * diff < best[0]:
+                search(far)
+
+        search(self.root)
+        return chord_to_km(math.sqrt(best[0])), self.points[best[1]][1]
+
+    def within(self, lat, lon, radius_km):
+        """Get (distance km, item) of all points within radius, closest first"""
+        target = to_unit_vector(lat, lon)
+        limit_sq = km_to_chord(radius_km) ** 2
+        found = []
+
+        # iterative, radius queries can visit most of the tree
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            index, axis, left, right = node
+            point = self.points[index][0]
+            dist_sq = sum((a - b) ** 2 for a, b in zip(point, target))
+            if dist_sq <= limit_sq:
+                found.append((chord_to_km(math.sqrt(dist_sq)), index))
+            diff = target[axis] - point[axis]
+            if diff <= 0 or diff * diff <= limit_sq:
+                stack.append(left)
+            if diff >= 0 or diff * diff <= limit_sq:
+                stack.append(right)
+
+        found.sort()
+        return [(distance, self.points[index][1]) for distance, index in found]
+
+
+class Geocoder:
+    """Resolves listing addresses to coordinates with a local gazetteer, no network calls
+
+    Gazetteer is either the bundled csv (name, city, kind, lat, lon, population,
+    aliases) or a GeoNames dump (e.g. PL.txt), where city sections (PPLX) are
+    attached to the nearest city.
+    """
+
+    def __init__(self, gazetteer_path=None):
+        self.gazetteer_path = gazetteer_path or os.path.join(os.path.dirname(__file__), "cfg", "gazetteer.csv")
+        self.places = []
+        # normalized city name -> city place
+        self.cities = {}
+        # (normalized city name, normalized place name) -> place
+        self.city_places = {}
+        self.tree = None
+        self.cache = {}
+
+    def load(self):
+        """Load gazetteer and build indexes (only once)"""
+        if self.tree is not None:
+            return
+
+        if self.gazetteer_path.endswith(".txt"):
+            places = self.read_geonames(self.gazetteer_path)
+        else:
+            places = self.read_csv(self.gazetteer_path)
+
+        for place in places:
+            if place["kind"] == "city":
+                self.add_city(place)
+        for place in places:
+            if place["kind"] != "city":
+                self.add_place(place)
+
+        self.tree = KDTree([(place["lat"], place["lon"], place) for place in self.places])
+        print(f"Geocoder: loaded {len(self.cities)} cities, {len(self.city_places)} places", flush=True)
+
+    def read_csv(self, path):
+        """Read bundled gazetteer csv"""
+        places = []
+        with open(path, "r", encoding="utf-8") as csvfile:
+            for row in csv.DictReader(csvfile):
+                places.append({
+                    "name": row["name"],
+                    "city": row.get("city") or row["name"],
+                    "kind": row.get("kind") or "city",
+                    "lat": float(row["lat"]),
+                    "lon": float(row["lon"]),
+                    "population": int(row.get("population") or 0),
+                    "aliases": [alias for alias in (row.get("aliases") or "").split(";") if alias]
+                })
+        return places
+
+    def read_geonames(self, path):
+        """Read GeoNames tab separated dump, cities and their sections"""
+        cities = []
+        sections = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                columns = line.rstrip("\n").split("\t")
+                if len(columns) < 15 or columns[6] != "P":
+                    continue
+                place = {
+                    "name": columns[1],
+                    "city": columns[1],
+                    "kind": "city",
+                    "lat": float(columns[4]),
+                    "lon": float(columns[5]),
+                    "population": int(columns[14] or 0),
+                    "aliases": [columns[2]] if columns[2] != columns[1] else []
+                }
+                if columns[7] == "PPLX":
+                    place["kind"] = "district"
+                    sections.append(place)
+                elif place["population"] > 0:
+                    cities.append(place)
+
+        # sections do not name their city, take the nearest one
+        city_tree = KDTree([(city["lat"], city["lon"], city) for city in cities])
+        for section in sections:
+            nearest = city_tree.nearest(section["lat"], section["lon"])
+            if nearest and nearest[0] <= 20:
+                section["city"] = nearest[1]["name"]
+            else:
+                section["kind"] = "city"
+                cities.append(section)
+        return cities + [section for section in sections if section["kind"] != "city"]
+
+    def add_city(self, place):
+        """Index city by its names, bigger city wins on name clashes"""
+        self.places.append(place)
+        for name in [place["name"]] + place["aliases"]:
+            key = normalize_name(name)
+            current = self.cities.get(key)
+            if key and (current is None or place["population"] > current["population"]):
+                self.cities[key] = place
+
+    def add_place(self, place):
+        """Index district or street under its city"""
+        city = self.cities.get(normalize_name(place["city"]))
+        if not city:
+            return
+        self.places.append(place)
+        city_key = normalize_name(city["name"])
+        for name in [place["name"]] + place["aliases"]:
+            key = normalize_name(name)
+            if key:
+                self.city_places.setdefault((city_key, key), place)
+
+    def find_place(self, city_key, part):
+        """Find place named by address part or by a phrase inside it"""
+        place = self.city_places.get((city_key, part))
+        if place:
+            return place
+        # e.g. 'stary mokotow' or 'bogucice ul katowicka'
+        tokens = part.split()
+        for size in range(min(len(tokens) - 1, 4), 0, -1):
+            for start in range(len(tokens) - size + 1):
+                place = self.city_places.get((city_key, " ".join(tokens[start:start + size])))
+                if place:
+                    return place
+        return None
+
+    def geocode(self, address, city=None):
+        """Get most specific place for address, e.g. 'Katowice, Bogucice', or None"""
+        self.load()
+        cache_key = (address, city)
+        if cache_key in self.cache:
+            return self.cache[cache_key]
+
+        parts = [normalize_name(part) for part in re.split(r"[,;/()]", address or "")]
+        parts = [part for part in parts if part]
+
+        city_place = self.cities.get(normalize_name(city)) if city else None
+        if city_place is None:
+            city_place = next((self.cities[part] for part in parts if part in self.cities), None)
+
+        place = None
+        if city_place:
+            city_key = normalize_name(city_place["name"])
+            # address parts go from general to specific, keep the last match
+            for part in parts:
+                if part == city_key:
+                    continue
+                place = self.find_place(city_key, part) or place
+            place = place or city_place
+
+        self.cache[cache_key] = place
+        return place
+
+    def geocode_properties(self, properties):
+        """Set lat/lon on properties from address and city, returns number geocoded"""
+        geocoded = 0
+        for prop in properties:
+            place = self.geocode(prop.get("address", ""), prop.get("city"))
+            if place:
+                prop["lat"] = place["lat"]
+                prop["lon"] = place["lon"]
+                geocoded += 1
+        return geocoded
+
+    def reverse(self, lat, lon):
+        """Get (distance km, place) of the closest gazetteer place"""
+        self.load()
+        return self.tree.nearest(lat, lon)
+
+    def places_within(self, lat, lon, radius_km):
+        """Get (distance km, place) of gazetteer places within radius"""
+        self.load()
+        return self.tree.within(lat, lon, radius_km)
+
+    def properties_within(self, properties, lat, lon, radius_km):
+        """Get (distance km, property) of geocoded properties within radius"""
+        tree = KDTree([(prop["lat"], prop["lon"], prop) for prop in properties if prop.get("lat") is not None])
+        return tree.within(lat, lon, radius_km)
@@ -0,0 +1,94 @@
+"""
+mieszkanieo scraper - plain http browser stand-in
+"""
+
+from typing import List, Optional, Tuple
+import requests
+from bs4 import BeautifulSoup
+
+
+class HttpBrowserManager:
+    """BrowserManager stand-in that fetches pages with plain http (no javascript)"""
+
+    def __init__(self, headless: bool = True, timeout: int = 15):
+        self.headless = headless
+        self.capture_network = False
+        self.timeout = timeout
+        self.driver = None
+        self.session: Optional[requests.Session] = None
+        self.current_url = ""
+        self.page_source = ""
+
+    def setup_browser(self, fresh_instance: bool = False) -> None:
+        """Open http session"""
+        if self.session and not fresh_instance:
+            return
+        self.cleanup()
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+    def navigate_to_url(self, url: str, auto_scroll: bool = True, site_name: str = "") -> None:
+        """Fetch url and keep the response as current page"""
+        if not self.session:
+            return
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            self.current_url = response.url
+            self.page_source = response.text if response.status_code == 200 else ""
+        except requests.RequestException as e:
+            print(f"navigate_to_url: request error: {e}")
+            self.current_url = url
+            self.page_source = ""
+
+    def wait_for_page(self, selector: str, selector_type: str = "css", timeout: int = 10) -> bool:
+        """Check that the fetched page contains the element"""
+        if not self.page_source:
+            return False
+
+        soup = BeautifulSoup(self.page_source, "html.parser")
+        if selector_type == "css" or selector.startswith('['):
+            found = soup.select_one(selector)
+        else:
+            found = soup.find(class_=selector)
+        if not found:
+            print("wait_for_page: element not found in page")
+        return found is not None
+
+    def wait_for_content_loaded(self, timeout: int = 10) -> bool:
+        """Fetched pages are complete"""
+        return bool(self.page_source)
+
+    def scroll_to_bottom(self, wait_time: float = 1.0) -> None:
+        """Nothing to lazy load without javascript"""
+
+    def start_response_capture(self, url_patterns: List[str]) -> None:
+        """No devtools network events over plain http"""
+
+    def wait_for_responses(self, timeout: float = 10.0) -> List[Tuple[str, object]]:
+        """No devtools network events over plain http"""
+        return []
+
+    def get_current_url(self) -> str:
+        """Get current URL"""
+        return self.current_url
+
+    def get_page_source(self) -> str:
+        """Get page source"""
+        return self.page_source
+
+    def cleanup(self) -> None:
+        """Close http session"""
+        if self.session:
+            self.session.close()
+            self.session = None
+        self.current_url = ""
+        self.page_source = ""
+
+    def __enter__(self):
+        """Context manager entry"""
+        self.setup_browser()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit"""
+        self.cleanup()
@@ -0,0 +1,120 @@
+"""
+mieszkanieo scraper - per-listing element index
+"""
+
+from bisect import bisect_right
+
+from bs4 import Tag
+
+
+class ListingIndex:
+    """Elements of one listing indexed by tag, class and data attributes in a single traversal
+
+    Supports the find/find_all calls extract_property makes (tag, class_ and
+    data-* attrs) and returns the original elements. Lookups are dictionary
+    hits instead of subtree searches, and element text is computed once.
+    Anything the index does not cover is passed to bs4.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        # pre-order position -> element, and position of its last descendant
+        self.elements = []
+        self.ends = []
+        self.positions = {}
+        # key -> positions in document order
+        self.by_tag = {}
+        self.by_class = {}
+        self.by_attr = {}
+        self.texts = {}
+
+        for child in root.children:
+            if isinstance(child, Tag):
+                self._add(child)
+
+    @classmethod
+    def of(cls, element):
+        """Index element unless it already is an index"""
+        return element if isinstance(element, cls) else cls(element)
+
+    def _add(self, element):
+        position = len(self.elements)
+        self.elements.append(element)
+        self.ends.append(position)
+        self.positions[id(element)] = position
+
+        self.by_tag.setdefault(element.name, []).append(position)
+        classes = element.get("class") or []
+        # bs4 matches single classes and the whole class attribute
+        for css_class in set(classes) | ({" ".join(classes)} if len(classes) > 1 else set()):
+            self.by_class.setdefault((element.name, css_class), []).append(position)
+        for name, value in element.attrs.items():
+            if name.startswith("data-") and isinstance(value, str):
+                self.by_attr.setdefault((element.name, name, value), []).append(position)
+
+        for child in element.children:
+            if isinstance(child, Tag):
+                self._add(child)
+        self.ends[position] = len(self.elements) - 1
+
+    def _positions(self, name, attrs, class_):
+        """Get matching positions, or None when the index cannot answer the query"""
+        if isinstance(attrs, str):
+            attrs, class_ = None, attrs
+        if not isinstance(name, str) or (class_ is not None and not isinstance(class_, str)):
+            return None
+
+        candidates = []
+        if class_:
+            candidates.append(self.by_class.get((name, class_), []))
+        for attr_name, value in (attrs or {}).items():
+            if attr_name == "class" and isinstance(value, str):
+                candidates.append(self.by_class.get((name, value), []))
+            elif attr_name.startswith("data-") and isinstance(value, str):
+                candidates.append(self.by_attr.get((name, attr_name, value), []))
+            else:
+                return None
+        if not candidates:
+            return self.by_tag.get(name, [])
+
+        positions = min(candidates, key=len)
+        for other in candidates:
+            if other is not positions:
+                other = set(other)
+                positions = [position for position in positions if position in other]
+        return positions
+
+    def _within(self, positions, within):
+        """Limit positions to the subtree of element"""
+        if within is None:
+            return positions
+        start = self.positions[id(within)]
+        return positions[bisect_right(positions, start):bisect_right(positions, self.ends[start])]
+
+    def find_all(self, name, attrs=None, class_=None, within=None):
+        """Find all matching elements (inside within when given)"""
+        positions = self._positions(name, attrs, class_)
+        if positions is None:
+            element = self.root if within is None else within
+            return element.find_all(name, attrs or {}, class_=class_) if class_ is not None else element.find_all(name, attrs or {})
+        return [self.elements[position] for position in self._within(positions, within)]
+
+    def find(self, name, attrs=None, class_=None, within=None):
+        """Find first matching element or None"""
+        positions = self._positions(name, attrs, class_)
+        if positions is None:
+            element = self.root if within is None else within
+            return element.find(name, attrs or {}, class_=class_) if class_ is not None else element.find(name, attrs or {})
+        positions = self._within(positions, within)
+        return self.elements[positions[0]] if positions else None
+
+    def text(self, element, strip=True):
+        """Get element text, computed once per element"""
+        key = (id(element), strip)
+        text = self.texts.get(key)
+        if text is None:
+            text = self.texts[key] = element.get_text(strip=True) if strip else element.get_text()
+        return text
+
+    def __len__(self):
+        return len(self.elements)
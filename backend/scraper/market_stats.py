@@ -0,0 +1,212 @@
+"""
+mieszkanieo scraper - precomputed market statistics
+"""
+
+import os
+import re
+import json
+import glob
+from datetime import datetime, timezone
+
+from .geocoder import normalize_name
+
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+QUANTILE_NAMES = ("p10", "p25", "median", "p75", "p90")
+
+# area histogram bin edges in m²
+AREA_BINS = (0, 25, 35, 45, 55, 70, 90, 120)
+
+
+def get_district(address, city):
+    """Get district from address like 'Katowice, Bogucice' (first part that is not the city)"""
+    city_key = normalize_name(city)
+    for part in re.split(r"[,;/]", address or ""):
+        key = normalize_name(part)
+        if key and key != city_key:
+            return part.strip()
+    return ""
+
+
+def grouped_quantiles(codes, values, group_count):
+    """Count and quantiles of values per group code, NaN values are skipped"""
+    import numpy as np
+
+    valid = np.isfinite(values)
+    codes = codes[valid]
+    values = values[valid]
+
+    # sort by group then value, each group becomes one contiguous run
+    order = np.lexsort((values, codes))
+    codes = codes[order]
+    values = values[order]
+    counts = np.bincount(codes, minlength=group_count)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    # linear interpolation between closest ranks for all groups at once
+    positions = starts[:, None] + np.asarray(QUANTILES)[None, :] * np.maximum(counts - 1, 0)[:, None]
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.ceil(positions).astype(np.int64)
+    if len(values):
+        lower = np.minimum(lower, len(values) - 1)
+        upper = np.minimum(upper, len(values) - 1)
+        quantiles = values[lower] + (values[upper] - values[lower]) * (positions - lower)
+        sums = np.bincount(codes, weights=values, minlength=group_count)
+    else:
+        quantiles = np.zeros(positions.shape)
+        sums = np.zeros(group_count)
+
+    quantiles[counts == 0] = np.nan
+    means = np.divide(sums, counts, out=np.full(group_count, np.nan), where=counts > 0)
+    return counts, quantiles, means
+
+
+class MarketStats:
+    """Per city, district, site and room count aggregates kept in a small json artifact
+
+    Each finished scrape_site run stores a snapshot of its listings (one npz per
+    site and city). The city's summary is then recomputed from the snapshots of
+    the same job in one vectorized pass, so all sites of a job add up.
+    """
+
+    def __init__(self, output_path=None, snapshot_dir=None):
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.output_path = output_path or os.path.join(backend_dir, "market_stats.json")
+        self.snapshot_dir = snapshot_dir or os.path.join(os.path.dirname(self.output_path), "market_stats")
+
+    def get_snapshot_path(self, site, city):
+        """Get snapshot path for site and city"""
+        return os.path.join(self.snapshot_dir, f"{site}_{normalize_name(city).replace(' ', '-')}.npz")
+
+    def save_snapshot(self, site, city, properties, job_id=None):
+        """Store listing columns of one run"""
+        import numpy as np
+
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        path = self.get_snapshot_path(site, city)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            price=np.array([prop.get("price") or np.nan for prop in properties], dtype=np.float64),
+            area=np.array([prop.get("area") or np.nan for prop in properties], dtype=np.float64),
+            rooms=np.array([prop["rooms"] if prop.get("rooms") is not None else -1 for prop in properties], dtype=np.int16),
+            district=np.array([get_district(prop.get("address", ""), city) for prop in properties], dtype=np.str_),
+            site=np.array([site], dtype=np.str_),
+            job_id=np.array([job_id or ""], dtype=np.str_)
+        )
+        os.replace(tmp_path, path)
+
+    def load_snapshots(self, city, job_id=None):
+        """Load and concatenate snapshots for city (only from job_id when given)"""
+        import numpy as np
+
+        columns = {"price": [], "area": [], "rooms": [], "district": [], "site": []}
+        pattern = os.path.join(self.snapshot_dir, f"*_{normalize_name(city).replace(' ', '-')}.npz")
+        for path in sorted(glob.glob(pattern)):
+            with np.load(path, allow_pickle=False) as snapshot:
+                if job_id and str(snapshot["job_id"][0]) != job_id:
+                    continue
+                count = len(snapshot["price"])
+                for name in ("price", "area", "rooms", "district"):
+                    columns[name].append(snapshot[name])
+                columns["site"].append(np.full(count, str(snapshot["site"][0])))
+
+        if not columns["price"]:
+            return None
+        return {name: np.concatenate(parts) for name, parts in columns.items()}
+
+    def compute(self, columns):
+        """Compute summary for all listings and per district, site and room count"""
+        import numpy as np
+
+        price = columns["price"]
+        area = columns["area"]
+        price_per_m2 = np.divide(price, area, out=np.full(len(price), np.nan), where=np.isfinite(area) & (area > 0))
+        rooms = columns["rooms"].astype(np.int64)
+
+        groupings = {
+            "summary": np.zeros(len(price), dtype=np.int64),
+            "by_district": columns["district"],
+            "by_site": columns["site"],
+            "by_rooms": np.where(rooms >= 0, rooms, -1)
+        }
+
+        result = {}
+        for grouping, keys in groupings.items():
+            labels, codes = np.unique(keys, return_inverse=True)
+            group_count = len(labels)
+            counts = np.bincount(codes, minlength=group_count)
+            price_stats = grouped_quantiles(codes, price, group_count)
+            per_m2_stats = grouped_quantiles(codes, price_per_m2, group_count)
+            area_stats = grouped_quantiles(codes, area, group_count)
+
+            # area histogram counts per group in one bincount
+            valid_area = np.isfinite(area)
+            bins = np.digitize(area[valid_area], AREA_BINS[1:])
+            histogram = np.bincount(codes[valid_area] * len(AREA_BINS) + bins, minlength=group_count * len(AREA_BINS))
+            histogram = histogram.reshape(group_count, len(AREA_BINS))
+
+            groups = {}
+            for index, label in enumerate(labels):
+                label = str(label)
+                if grouping == "by_rooms" and label == "-1":
+                    label = "unknown"
+                elif grouping == "by_district" and not label:
+                    label = "unknown"
+                groups[label] = {
+                    "count": int(counts[index]),
+                    "price": self.format_stats(price_stats, index, 0),
+                    "price_per_m2": self.format_stats(per_m2_stats, index, 0),
+                    "area": self.format_stats(area_stats, index, 1)
+                }
+                if groups[label]["area"]:
+                    groups[label]["area"]["histogram"] = self.format_histogram(histogram[index])
+            result[grouping] = groups["0"] if grouping == "summary" else groups
+        return result
+
+    def format_stats(self, stats, index, digits):
+        """Format one group's quantiles and mean"""
+        counts, quantiles, means = stats
+        if not counts[index]:
+            return None
+        def rounded(value):
+            return round(float(value), digits) if digits else int(round(float(value)))
+
+        values = {name: rounded(value) for name, value in zip(QUANTILE_NAMES, quantiles[index])}
+        values["mean"] = rounded(means[index])
+        values["count"] = int(counts[index])
+        return values
+
+    def format_histogram(self, counts):
+        """Label area bins like '25-35'"""
+        labels = [f"{low}-{high}" for low, high in zip(AREA_BINS, AREA_BINS[1:])] + [f"{AREA_BINS[-1]}+"]
+        return {label: int(count) for label, count in zip(labels, counts)}
+
+    def update(self, site, city, properties, job_id=None):
+        """Store run snapshot and rewrite the city's summary, returns city summary"""
+        self.save_snapshot(site, city, properties, job_id)
+        columns = self.load_snapshots(city, job_id)
+        if columns is None:
+            return None
+
+        city_stats = self.compute(columns)
+        city_stats["sites"] = sorted(set(columns["site"].tolist()))
+        city_stats["job_id"] = job_id
+        city_stats["updated_at"] = datetime.now(timezone.utc).isoformat()
+
+        artifact = {"cities": {}}
+        if os.path.exists(self.output_path):
+            try:
+                with open(self.output_path, "r", encoding="utf-8") as f:
+                    artifact = json.load(f)
+            except (OSError, ValueError):
+                pass
+        artifact.setdefault("cities", {})[city.title()] = city_stats
+        artifact["generated_at"] = city_stats["updated_at"]
+
+        tmp_path = f"{self.output_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(artifact, f, ensure_ascii=False)
+        os.replace(tmp_path, self.output_path)
+
+        print(f"MarketStats: {city_stats['summary']['count']} listings in {city.title()} summarized", flush=True)
+        return city_stats
@@ -0,0 +1,219 @@
+"""
+mieszkanieo scraper - live metrics in openmetrics text format
+"""
+
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def format_labels(labels: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    """Format label pairs like {site="olx",le="0.5"}"""
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (
+        f'{name}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def format_value(value: float) -> str:
+    """Format sample value, integers without a fraction"""
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    def __init__(self, name: str, help_text: str, lock: threading.Lock):
+        self.name = name
+        self.help_text = help_text
+        self._lock = lock
+        self.values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """Increase counter for labels"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        """Get current value for labels"""
+        return self.values.get(tuple(sorted(labels.items())), 0)
+
+    def render(self) -> List[str]:
+        """Render counter family"""
+        lines = [f"# TYPE {self.name} counter", f"# HELP {self.name} {self.help_text}"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}_total{format_labels(key)} {format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Latency histogram with labels and fixed buckets (seconds)"""
+
+    DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, name: str, help_text: str, lock: threading.Lock, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self._lock = lock
+        self.buckets = tuple(sorted(buckets))
+        # per labels: bucket counts (+Inf last), count, sum
+        self.values: Dict[LabelKey, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        """Record one observation"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+            entry[0][bisect.bisect_left(self.buckets, value)] += 1
+            entry[1] += 1
+            entry[2] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe duration of the with block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        """Render histogram family with cumulative buckets"""
+        lines = [f"# TYPE {self.name} histogram", f"# HELP {self.name} {self.help_text}"]
+        for key, (bucket_counts, count, total) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else format_value(bound)
+                lines.append(f"{self.name}_bucket{format_labels(key, ('le', le))} {cumulative}")
+            lines.append(f"{self.name}_count{format_labels(key)} {count}")
+            lines.append(f"{self.name}_sum{format_labels(key)} {format_value(total)}")
+        return lines
+
+
+class ScraperMetrics:
+    """Scraper counters and histograms, exported over http or to a file"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.families: List = []
+        self.pages_fetched = self.counter("mieszkanieo_pages_fetched", "Listing pages loaded.")
+        self.listings_extracted = self.counter("mieszkanieo_listings_extracted", "Listings extracted from pages.")
+        self.extraction_failures = self.counter("mieszkanieo_extraction_failures", "Listing fields a selector did not find.")
+        self.browser_restarts = self.counter("mieszkanieo_browser_restarts", "Fresh browser instances started.")
+        self.wait_timeouts = self.counter("mieszkanieo_wait_timeouts", "Page waits that timed out.")
+        self.save_latency = self.histogram("mieszkanieo_save_latency_seconds", "Time to save one batch of properties.")
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._writer_stop: Optional[threading.Event] = None
+        self._writer_thread: Optional[threading.Thread] = None
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        """Register counter"""
+        counter = Counter(name, help_text, self._lock)
+        self.families.append(counter)
+        return counter
+
+    def histogram(self, name: str, help_text: str, buckets=Histogram.DEFAULT_BUCKETS) -> Histogram:
+        """Register histogram"""
+        histogram = Histogram(name, help_text, self._lock, buckets)
+        self.families.append(histogram)
+        return histogram
+
+    def render(self) -> str:
+        """Render all metrics as openmetrics text"""
+        with self._lock:
+            lines = [line for family in self.families for line in family.render()]
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> bool:
+        """Serve metrics on http://host:port/metrics in a background thread"""
+        if self._server:
+            return True
+
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        except OSError as e:
+            print(f"metrics: cannot listen on {host}:{port}: {e}", flush=True)
+            return False
+
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        print(f"metrics: serving on http://{host}:{port}/metrics", flush=True)
+        return True
+
+    def write_file(self, path: str) -> None:
+        """Write metrics to file atomically"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def write_periodically(self, path: str, interval: float = 15.0) -> None:
+        """Rewrite metrics file every interval seconds in a background thread"""
+        if self._writer_thread:
+            return
+
+        self._writer_stop = threading.Event()
+
+        def run():
+            stopped = False
+            while not stopped:
+                # also writes the final state once stopped
+                stopped = self._writer_stop.wait(interval)
+                try:
+                    self.write_file(path)
+                except OSError as e:
+                    print(f"metrics: cannot write {path}: {e}", flush=True)
+
+        self._writer_thread = threading.Thread(target=run, daemon=True)
+        self._writer_thread.start()
+
+    def stop(self) -> None:
+        """Stop http server and file writer (writing the file one last time)"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._writer_thread:
+            self._writer_stop.set()
+            self._writer_thread.join(timeout=5)
+            self._writer_thread = None
+
+
+# shared by all scrapers in the process
+metrics = ScraperMetrics()
@@ -0,0 +1,208 @@
+"""
+mieszkanieo scraper - partitioned parquet output for analysis
+"""
+
+import os
+import uuid
+import sqlite3
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+
+def get_schema():
+    """Listing columns stored in each file (site, city and date are partition keys)"""
+    import pyarrow as pa
+
+    return pa.schema([
+        ("id", pa.string()),
+        ("title", pa.string()),
+        ("price", pa.int64()),
+        ("area", pa.float64()),
+        ("rooms", pa.int16()),
+        ("level", pa.int16()),
+        ("address", pa.string()),
+        ("image", pa.string()),
+        ("link", pa.string()),
+        ("lat", pa.float64()),
+        ("lon", pa.float64()),
+        ("scraped_at", pa.timestamp("ms", tz="UTC")),
+        ("job_id", pa.string())
+    ])
+
+
+def get_partitioning():
+    """Hive partitioning site=<site>/city=<city>/date=<yyyy-mm-dd>"""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(pa.schema([("site", pa.string()), ("city", pa.string()), ("date", pa.date32())]), flavor="hive")
+
+
+def to_int(value):
+    """Whole number or None for missing values"""
+    if value is None or value == "":
+        return None
+    try:
+        return int(round(float(value)))
+    except (TypeError, ValueError):
+        return None
+
+
+def to_float(value):
+    """Float or None for missing values"""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ParquetSink:
+    """Writes listings as parquet files partitioned by site, city and scrape date
+
+    As an output of scrape_site every batch is appended to an in-memory list of
+    arrow record batches per partition; full row groups are written by
+    combining them without copying. Files are written under a temporary name
+    and renamed on close, so scans never see a file without its footer.
+    """
+
+    def __init__(self, root_dir=None, job_id=None, row_group_size=50000):
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        self.root_dir = root_dir or os.path.join(backend_dir, "listings_parquet")
+        self.job_id = job_id
+        self.row_group_size = row_group_size
+        # one file per partition and run
+        self.run_id = uuid.uuid4().hex[:8]
+        # (site, city, date) -> {"writer", "tmp_path", "path", "batches", "rows"}
+        self.partitions = {}
+        self.rows_written = 0
+
+    def get_partition_dir(self, site, city, date):
+        """Directory of one partition, values escaped like pyarrow expects"""
+        return os.path.join(
+            self.root_dir,
+            f"site={quote(site, safe='')}",
+            f"city={quote(city, safe='')}",
+            f"date={date}"
+        )
+
+    def to_record_batch(self, properties, scraped_at):
+        """Build typed arrow batch from property dicts"""
+        import pyarrow as pa
+
+        schema = get_schema()
+        columns = {
+            "id": [prop.get("id") for prop in properties],
+            "title": [prop.get("title") for prop in properties],
+            "price": [to_int(prop.get("price")) for prop in properties],
+            "area": [to_float(prop.get("area")) for prop in properties],
+            "rooms": [to_int(prop.get("rooms")) for prop in properties],
+            "level": [to_int(prop.get("level")) for prop in properties],
+            "address": [prop.get("address") for prop in properties],
+            "image": [prop.get("image") or None for prop in properties],
+            "link": [prop.get("link") for prop in properties],
+            "lat": [to_float(prop.get("lat")) for prop in properties],
+            "lon": [to_float(prop.get("lon")) for prop in properties],
+            "scraped_at": scraped_at,
+            "job_id": [prop.get("job_id") or self.job_id for prop in properties]
+        }
+        arrays = [pa.array(columns[field.name], type=field.type) for field in schema]
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    def write_batch(self, properties):
+        """Append properties to their partitions (scraped_at defaults to now)"""
+        if not properties:
+            return 0
+
+        now = datetime.now(timezone.utc)
+        groups = {}
+        for prop in properties:
+            scraped_at = prop.get("scraped_at") or now
+            key = (prop.get("site") or "unknown", prop.get("city") or "unknown", scraped_at.strftime("%Y-%m-%d"))
+            group = groups.setdefault(key, ([], []))
+            group[0].append(prop)
+            group[1].append(scraped_at)
+
+        for key, (group, timestamps) in groups.items():
+            partition = self.partitions.get(key)
+            if partition is None:
+                partition_dir = self.get_partition_dir(*key)
+                file_name = f"part-{self.run_id}.parquet"
+                partition = self.partitions[key] = {
+                    "writer": None,
+                    # dataset discovery skips dot files
+                    "tmp_path": os.path.join(partition_dir, f".{file_name}.{os.getpid()}.tmp"),
+                    "path": os.path.join(partition_dir, file_name),
+                    "batches": [],
+                    "rows": 0
+                }
+            partition["batches"].append(self.to_record_batch(group, timestamps))
+            partition["rows"] += len(group)
+            if partition["rows"] >= self.row_group_size:
+                self.flush(partition)
+
+        return len(properties)
+
+    def flush(self, partition):
+        """Write buffered batches of partition as row groups"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not partition["batches"]:
+            return
+        # batches become table chunks, no buffers are copied
+        table = pa.Table.from_batches(partition["batches"], schema=get_schema())
+        if partition["writer"] is None:
+            os.makedirs(os.path.dirname(partition["path"]), exist_ok=True)
+            partition["writer"] = pq.ParquetWriter(partition["tmp_path"], table.schema, compression="zstd")
+        partition["writer"].write_table(table, row_group_size=self.row_group_size)
+        self.rows_written += table.num_rows
+        partition["batches"] = []
+        partition["rows"] = 0
+
+    def close(self):
+        """Write remaining rows and publish files"""
+        for partition in self.partitions.values():
+            self.flush(partition)
+            if partition["writer"] is not None:
+                partition["writer"].close()
+                os.replace(partition["tmp_path"], partition["path"])
+        if self.partitions:
+            print(f"ParquetSink: {self.rows_written} listings in {len(self.partitions)} partitions under {self.root_dir}", flush=True)
+        self.partitions = {}
+        self.rows_written = 0
+        # a reused sink starts new files instead of overwriting
+        self.run_id = uuid.uuid4().hex[:8]
+
+    def export_sqlite(self, db_path, chunk_size=50000):
+        """Bulk export of the app database, partitioned by the listings' created_at date"""
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        exported = 0
+        try:
+            cursor = conn.execute(
+                "SELECT id, title, price, area, rooms, level, address, image, link, site, city, lat, lon, created_at "
+                "FROM properties ORDER BY site, city, created_at"
+            )
+            names = [column[0] for column in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                properties = [dict(zip(names, row)) for row in rows]
+                for prop in properties:
+                    # sqlite CURRENT_TIMESTAMP is utc
+                    created_at = prop.pop("created_at", None)
+                    prop["scraped_at"] = datetime.strptime(created_at, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc) if created_at else None
+                    prop["city"] = (prop.get("city") or "unknown").title()
+                exported += self.write_batch(properties)
+        finally:
+            conn.close()
+            self.close()
+        return exported
+
+    def dataset(self):
+        """Open all runs as one pyarrow dataset, e.g. dataset().to_table(filter=ds.field("city") == "Katowice")"""
+        import pyarrow.dataset as ds
+
+        return ds.dataset(self.root_dir, format="parquet", partitioning=get_partitioning())
@@ -0,0 +1,74 @@
+"""
+mieszkanieo scraper - plain http pre-flight check before starting chrome
+"""
+
+import re
+
+import requests
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+
+def read_number(pattern, text):
+    """First group of pattern as int, digits may be split by (nb)spaces ('1 234')"""
+    match = re.search(pattern, text)
+    if not match:
+        return None
+    digits = re.sub(r"\D", "", match.group(1))
+    return int(digits) if digits else None
+
+
+class PreflightProbe:
+    """Fetches a site's first result page over plain http and reads whether it has listings
+
+    Uses the site config's "preflight" section:
+      empty_pattern  regex found only on pages without results
+      count_pattern  regex whose first group is the number of listings
+      pages_pattern  regex whose first group is the number of pages
+    A count of 0 or a 404 means no results. Pages are only planned from a
+    page count, listings per page vary too much to derive them. Anything
+    else (bot wall, changed markup) is inconclusive and the site is scraped
+    as before.
+    """
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+        self.session = None
+
+    def check(self, url, config):
+        """Get {"status": "empty" | "found" | "unknown", "count", "pages"} for a search url"""
+        result = {"status": "unknown", "count": None, "pages": None}
+        preflight = config.get("preflight")
+        if not preflight:
+            return result
+
+        if self.session is None:
+            self.session = requests.Session()
+            self.session.headers["User-Agent"] = USER_AGENT
+            self.session.headers["Accept-Language"] = "pl-PL,pl;q=0.9"
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except requests.RequestException as e:
+            print(f"PreflightProbe: request failed: {e}", flush=True)
+            return result
+
+        if response.status_code in (404, 410):
+            result.update(status="empty", count=0, pages=0)
+            return result
+        if response.status_code != 200:
+            print(f"PreflightProbe: http {response.status_code}, inconclusive", flush=True)
+            return result
+
+        text = response.text
+        if preflight.get("empty_pattern") and re.search(preflight["empty_pattern"], text):
+            result.update(status="empty", count=0, pages=0)
+            return result
+
+        count = read_number(preflight["count_pattern"], text) if preflight.get("count_pattern") else None
+        pages = read_number(preflight["pages_pattern"], text) if preflight.get("pages_pattern") else None
+        result.update(count=count, pages=pages)
+        if count == 0 or pages == 0:
+            result.update(status="empty", count=0, pages=0)
+        elif count or pages:
+            result["status"] = "found"
+        return result
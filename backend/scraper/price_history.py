@@ -0,0 +1,240 @@
+"""
+mieszkanieo scraper - compact listing price history
+"""
+
+import os
+import time
+from datetime import datetime, timezone
+
+from .chrome_env import get_cache_dir
+from .geocoder import normalize_name
+
+
+def to_minutes(moment):
+    """Minutes since epoch for datetime or unix timestamp"""
+    if isinstance(moment, datetime):
+        moment = moment.timestamp()
+    return int(moment // 60)
+
+
+def from_minutes(minutes):
+    """Utc datetime for minutes since epoch"""
+    return datetime.fromtimestamp(int(minutes) * 60, tz=timezone.utc)
+
+
+def encode_deltas(values, offsets):
+    """Delta-encode values per listing, the first value of each listing stays absolute"""
+    import numpy as np
+
+    deltas = np.diff(values, prepend=0)
+    deltas[offsets[:-1]] = values[offsets[:-1]]
+    return deltas
+
+
+def decode_deltas(deltas, offsets):
+    """Undo encode_deltas with one cumulative sum restarted at every listing"""
+    import numpy as np
+
+    values = np.cumsum(deltas, dtype=np.int64)
+    if not len(values):
+        return values
+    base = np.zeros(len(offsets) - 1, dtype=np.int64)
+    base[1:] = values[offsets[1:-1] - 1]
+    return values - np.repeat(base, np.diff(offsets))
+
+
+class PriceHistory:
+    """Price observations per listing id, one file per city, a row only when the price changes
+
+    A city is held as sorted listing ids, observation counts and the
+    observations' minutes and prices, delta-encoded per listing and
+    compressed on disk (a few bytes per change). last_seen is kept per
+    listing so queries can skip listings that are gone.
+    """
+
+    def __init__(self, history_dir=None):
+        self.history_dir = history_dir or os.path.join(get_cache_dir(), "price_history")
+        # city key -> arrays plus this run's changes
+        self.cities = {}
+
+    def get_path(self, city_key):
+        """Get history file of city"""
+        return os.path.join(self.history_dir, f"{city_key.replace(' ', '-')}.npz")
+
+    def load(self, city):
+        """Load city history (only once)"""
+        import numpy as np
+
+        city_key = normalize_name(city)
+        state = self.cities.get(city_key)
+        if state is not None:
+            return state
+
+        state = {
+            "ids": np.zeros(0, dtype=np.uint64),
+            "offsets": np.zeros(1, dtype=np.int64),
+            "times": np.zeros(0, dtype=np.int64),
+            "prices": np.zeros(0, dtype=np.int64),
+            "last_seen": np.zeros(0, dtype=np.int64),
+            # id -> [(minute, price)] and id -> minute for this run
+            "changes": {},
+            "seen": {},
+            "last_prices": None,
+            # merged (e.g. by a query) but not saved yet, and the changes in it
+            "dirty": False,
+            "merged_changes": 0
+        }
+        path = self.get_path(city_key)
+        if os.path.exists(path):
+            with np.load(path, allow_pickle=False) as data:
+                offsets = np.concatenate(([0], np.cumsum(data["counts"], dtype=np.int64)))
+                state["ids"] = data["ids"]
+                state["offsets"] = offsets
+                state["times"] = decode_deltas(data["time_deltas"].astype(np.int64), offsets)
+                state["prices"] = decode_deltas(data["price_deltas"].astype(np.int64), offsets)
+                state["last_seen"] = data["last_seen"].astype(np.int64)
+        self.cities[city_key] = state
+        return state
+
+    def get_last_prices(self, state):
+        """Latest price per listing id, built once per load"""
+        if state["last_prices"] is None:
+            last = state["prices"][state["offsets"][1:] - 1]
+            state["last_prices"] = dict(zip(state["ids"].tolist(), last.tolist()))
+        return state["last_prices"]
+
+    def write_batch(self, properties, observed_at=None):
+        """Record prices of properties, returns number of price changes"""
+        minute = to_minutes(observed_at if observed_at is not None else time.time())
+        changed = 0
+        for prop in properties:
+            price = prop.get("price")
+            try:
+                listing_id = int(prop.get("id") or "", 16)
+            except ValueError:
+                continue
+            if not price:
+                continue
+
+            state = self.load(prop.get("city") or "")
+            state["seen"][listing_id] = minute
+            last_prices = self.get_last_prices(state)
+            if last_prices.get(listing_id) != price:
+                state["changes"].setdefault(listing_id, []).append((minute, int(price)))
+                last_prices[listing_id] = int(price)
+                changed += 1
+        return changed
+
+    def merge(self, state):
+        """Fold this run's changes and sightings into the arrays"""
+        import numpy as np
+
+        if not state["changes"] and not state["seen"]:
+            return
+
+        counts = np.diff(state["offsets"])
+        change_ids = [listing_id for listing_id, changes in state["changes"].items() for _ in changes]
+        all_ids = np.concatenate((np.repeat(state["ids"], counts), np.array(change_ids, dtype=np.uint64)))
+        all_times = np.concatenate((state["times"], np.array([c[0] for changes in state["changes"].values() for c in changes], dtype=np.int64)))
+        all_prices = np.concatenate((state["prices"], np.array([c[1] for changes in state["changes"].values() for c in changes], dtype=np.int64)))
+
+        order = np.lexsort((all_times, all_ids))
+        all_ids = all_ids[order]
+        ids, starts = np.unique(all_ids, return_index=True)
+
+        last_seen = np.zeros(len(ids), dtype=np.int64)
+        last_seen[np.searchsorted(ids, state["ids"])] = state["last_seen"]
+        if state["seen"]:
+            seen_ids = np.array(list(state["seen"].keys()), dtype=np.uint64)
+            seen_at = np.array(list(state["seen"].values()), dtype=np.int64)
+            positions = np.searchsorted(ids, seen_ids)
+            last_seen[positions] = np.maximum(last_seen[positions], seen_at)
+
+        state["ids"] = ids
+        state["offsets"] = np.concatenate((starts, [len(all_ids)])).astype(np.int64)
+        state["times"] = all_times[order]
+        state["prices"] = all_prices[order]
+        state["last_seen"] = last_seen
+        state["merged_changes"] += len(change_ids)
+        state["dirty"] = True
+        state["changes"] = {}
+        state["seen"] = {}
+
+    def save(self, city_key, state):
+        """Store city history atomically"""
+        import numpy as np
+
+        os.makedirs(self.history_dir, exist_ok=True)
+        path = self.get_path(city_key)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        offsets = state["offsets"]
+        np.savez_compressed(
+            tmp_path,
+            ids=state["ids"],
+            counts=np.diff(offsets).astype(np.uint32),
+            time_deltas=encode_deltas(state["times"], offsets).astype(np.int32),
+            price_deltas=encode_deltas(state["prices"], offsets).astype(np.int32),
+            last_seen=state["last_seen"].astype(np.int32)
+        )
+        os.replace(tmp_path, path)
+
+    def close(self):
+        """Merge and store cities changed in this run"""
+        for city_key, state in self.cities.items():
+            self.merge(state)
+            if state["dirty"]:
+                self.save(city_key, state)
+                print(f"PriceHistory: {city_key}: {state['merged_changes']} price changes, {len(state['ids'])} listings tracked", flush=True)
+        self.cities = {}
+
+    def get_history(self, city, listing_id):
+        """Get [(datetime, price)] of listing"""
+        import numpy as np
+
+        state = self.load(city)
+        self.merge(state)
+        listing_id = int(listing_id, 16)
+        index = np.searchsorted(state["ids"], np.uint64(listing_id))
+        if index >= len(state["ids"]) or state["ids"][index] != listing_id:
+            return []
+        start, end = state["offsets"][index], state["offsets"][index + 1]
+        return [(from_minutes(minute), int(price)) for minute, price in zip(state["times"][start:end], state["prices"][start:end])]
+
+    def price_drops(self, city, since, min_drop=0.0):
+        """Listings still seen after since whose price is lower than it was at since
+
+        since is a datetime or unix timestamp; min_drop is the minimal relative
+        drop (0.05 = 5%). Returns dicts sorted by relative drop, biggest first.
+        """
+        import numpy as np
+
+        state = self.load(city)
+        self.merge(state)
+        count = len(state["ids"])
+        if not count:
+            return []
+
+        since_minute = to_minutes(since)
+        offsets = state["offsets"]
+        # (listing, minute) keys are sorted, one search finds each listing's price at since
+        listing_index = np.repeat(np.arange(count, dtype=np.int64), np.diff(offsets))
+        keys = (listing_index << 32) + state["times"]
+        at_since = np.searchsorted(keys, (np.arange(count, dtype=np.int64) << 32) + since_minute, side="right") - 1
+        known = at_since >= offsets[:-1]
+        at_since = np.where(known, at_since, 0)
+
+        old_prices = state["prices"][at_since]
+        prices = state["prices"][offsets[1:] - 1]
+        drops = np.where(old_prices > 0, (old_prices - prices) / np.maximum(old_prices, 1), 0.0)
+        mask = known & (state["last_seen"] >= since_minute) & (prices < old_prices) & (drops >= min_drop)
+
+        found = []
+        for index in np.nonzero(mask)[0][np.argsort(-drops[mask], kind="stable")]:
+            found.append({
+                "id": f"{int(state['ids'][index]):012x}",
+                "old_price": int(old_prices[index]),
+                "price": int(prices[index]),
+                "drop": round(float(drops[index]), 4),
+                "changed_at": from_minutes(state["times"][offsets[index + 1] - 1]).isoformat()
+            })
+        return found
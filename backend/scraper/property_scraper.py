@@ -5,36 +5,122 @@ mieszkanieo scraper - modular version
 import time
 import json
 import uuid
+import heapq
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from bs4 import BeautifulSoup
 from unidecode import unidecode
-from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import WebDriverException
 
 from .browser_manager import BrowserManager
 from .location_mapper import LocationMapper
 from .data_extractor import DataExtractor
 from .api_client import APIClient
+from .search_filters import SearchFilters
+from .sqlite_sink import SQLiteSink, NOT_NULL_FIELDS
+from .metrics import metrics
+
+
+class PageLoadError(Exception):
+    """Page did not load (timeout, blank page), unlike an empty end-of-results page it may work on retry"""
+
+
+def extract_page_properties(soup, city, config, data_extractor):
+    """Find listings on a parsed page and extract their properties"""
+    # find listings container
+    container_config = config["selectors"]["listings_container"]
+    if container_config.get("data_testid"):
+        container = soup.find(container_config["tag"], attrs={"data-testid": container_config["data_testid"]})
+    else:
+        container = soup.find(container_config["tag"], class_=container_config["class"])
+    
+    if not container:
+        # try to find any div that might contain listings
+        potential_containers = soup.find_all("div", class_=lambda x: x and ("column" in " ".join(x) or "container" in " ".join(x) or "content" in " ".join(x)))
+        if potential_containers:
+            container = potential_containers[0]
+    
+    if not container:
+        return []
+    
+    # find individual listings
+    listings = data_extractor.find_listings_with_strategy(container, config)
+    
+    print(f"scrape_page: found {len(listings)} listings", flush=True)
+    
+    properties = []
+    for listing in listings:
+        prop = data_extractor.extract_property(listing, city, config)
+        if prop:
+            properties.append(prop)
+    
+    print(f"scrape_page: extracted {len(properties)} properties from page", flush=True)
+    return properties
+
+
+def parse_page_source(page_source, city, config):
+    """Parse raw page source and extract properties (runs in parse worker processes)"""
+    soup = BeautifulSoup(page_source, "html.parser")
+    return extract_page_properties(soup, city, config, DataExtractor())
 
 
 class PropertyScraper:
     """Scrapes properties"""
     
-    def __init__(self, headless=True, api_url="http://localhost:8000", job_id=None):
+    def __init__(self, headless=True, api_url="http://localhost:8000", job_id=None, db_path=None, thumbnail_cache=None, detail_enricher=None, parse_workers=0, spool=None, geocoder=None, market_stats=None, selector_stats=None, outputs=None, browser_manager=None, preflight=None, update_prices=False):
         self.headless = headless
         self.api_url = api_url
         self.job_id = job_id
         
         # init
-        self.browser_manager = BrowserManager(headless)
+        # any object with the BrowserManager surface, e.g. CdpBrowserManager
+        self.browser_manager = browser_manager or BrowserManager(headless)
         self.location_mapper = LocationMapper()
-        self.data_extractor = DataExtractor()
-        self.api_client = APIClient(api_url)
+        # SelectorStats learns which fallback selectors hit (parse workers keep the configured order)
+        self.data_extractor = DataExtractor(selector_stats)
+        self.api_client = APIClient(api_url, update_prices)
+        # properties go to the api unless a database is given
+        self.sink = SQLiteSink(db_path, update_prices) if db_path else self.api_client
+        self.thumbnail_cache = thumbnail_cache
+        self.detail_enricher = detail_enricher
+        # > 0 parses pages in worker processes while the browser loads the next ones
+        self.parse_workers = parse_workers
+        # PropertySpool journals batches before sending so failed saves are replayed later
+        self.spool = spool
+        # Geocoder sets lat/lon from the local gazetteer before saving
+        self.geocoder = geocoder
+        # MarketStats rewrites the dashboard summary after each site
+        self.market_stats = market_stats
+        # extra destinations for saved batches (write_batch(properties), close()), e.g. ParquetSink
+        self.outputs = outputs or []
+        # PreflightProbe skips sites without results before chrome is started
+        self.preflight = preflight
         self.driver = None
+        self.site_name = ""
         self.location_mapping = {}
+        self.search_filters = SearchFilters()
+        # listing ids already sent in this run
+        self.seen_ids = set()
+        self.duplicates_dropped = 0
+        # pages still failing after all attempts
+        self.failed_pages = []
+        # pages in a row without a captured json response (server-rendered pages)
+        self.xhr_misses = 0
     def setup_browser(self, fresh_instance=False):
         """Start chrome browser"""
+        if fresh_instance:
+            metrics.browser_restarts.inc(site=self.site_name)
         self.browser_manager.setup_browser(fresh_instance)
         self.driver = self.browser_manager.driver
     
+    def setup_browser_for_site(self, config):
+        """Start chrome for a site, restarting a running one launched with other network capture"""
+        capture_network = bool(config.get("xhr_capture"))
+        # set first: managers that switch capture at runtime report the requested setting
+        self.browser_manager.capture_network = capture_network
+        restart = self.browser_manager.driver is not None and self.browser_manager.driver_capture_network != capture_network
+        self.setup_browser(fresh_instance=restart)
+    
     def send_status(self, message):
         """Send status update to API"""
         if self.job_id:
@@ -47,37 +133,33 @@ class PropertyScraper:
     
     def wait_for_content_loaded(self, timeout=10):
         """Wait for page content to be fully loaded"""
-        if not self.driver:
-            return False
-        try:
-            # wait for document ready state
-            WebDriverWait(self.driver, timeout).until(
-                lambda driver: driver.execute_script("return document.readyState") == "complete"
-            )
-            # additional wait for AJAX
-            WebDriverWait(self.driver, timeout).until(
-                lambda driver: driver.execute_script("return jQuery.active == 0") if 
-                driver.execute_script("return typeof jQuery !== 'undefined'") else True
-            )
-            return True
-        except:
-            # )fallback) just wait for document ready
-            try:
-                WebDriverWait(self.driver, timeout).until(
-                    lambda driver: driver.execute_script("return document.readyState") == "complete"
-                )
-                return True
-            except:
-                return False
+        loaded = self.browser_manager.wait_for_content_loaded(timeout)
+        if not loaded:
+            metrics.wait_timeouts.inc(site=self.site_name, wait="content")
+        return loaded
     
     def cleanup(self):
         """Close browser"""
         self.browser_manager.cleanup()
         self.driver = None
+        if isinstance(self.sink, SQLiteSink):
+            self.sink.close()
+        if self.detail_enricher:
+            self.detail_enricher.shutdown()
+        if self.spool:
+            self.spool.close()
+        for output in self.outputs:
+            try:
+                output.close()
+            except Exception as e:
+                print(f"cleanup: closing {type(output).__name__} failed: {e}", flush=True)
     
     def wait_for_page(self, selector, selector_type="css", timeout=10):
         """Wait for page to load"""
-        return self.browser_manager.wait_for_page(selector, selector_type, timeout)
+        found = self.browser_manager.wait_for_page(selector, selector_type, timeout)
+        if not found:
+            metrics.wait_timeouts.inc(site=self.site_name, wait="element")
+        return found
     
     def load_location_mapping(self, csv_file_path):
         """Load location mapping from CSV file"""
@@ -129,8 +211,43 @@ class PropertyScraper:
         return self.api_client.delete_all_properties()
     
     def save_properties_batch(self, properties):
-        """Save multiple properties to api in a single request"""
-        return self.api_client.save_properties_batch(properties)
+        """Save multiple properties to api (or database sink) in a single request"""
+        # a null optional field would get the whole batch rejected, leave it out instead
+        for prop in properties:
+            for field in NOT_NULL_FIELDS:
+                if field in prop and prop[field] is None:
+                    del prop[field]
+        
+        sink = "sqlite" if isinstance(self.sink, SQLiteSink) else "api"
+        with metrics.save_latency.time(site=self.site_name, sink=sink):
+            if self.spool:
+                saved = self.spool.save(properties, self.send_properties_batch)
+            else:
+                saved = self.send_properties_batch(properties) or 0
+        return saved
+    
+    def send_properties_batch(self, properties):
+        """Send batch to the sink and, once accepted, to the outputs; returns saved count or None on failure"""
+        saved = self.sink.send_properties_batch(properties)
+        if saved is None:
+            # spooled for replay, outputs get it once it is saved
+            return None
+        if self.sink.batch_rejected:
+            return saved
+        
+        # outputs are for analysis, a failing one must not stop the scrape
+        for output in self.outputs:
+            try:
+                output.write_batch(properties)
+            except Exception as e:
+                print(f"send_properties_batch: {type(output).__name__} failed: {e}", flush=True)
+        return saved
+    
+    def replay_spool(self):
+        """Save batches an earlier run could not save, through the outputs like new ones"""
+        if not self.spool:
+            return 0
+        return self.spool.replay(self.send_properties_batch)
     
     def save_property(self, property_data):
         """Save property to api (fallback for single property)"""
@@ -144,21 +261,36 @@ class PropertyScraper:
         """Update scraping job"""
         return self.api_client.update_job(job_id, updates)
     
-    def get_total_pages(self, city, config):
-        """Get number of pages to scrape and return page content if available"""
-        if not config.get("has_pagination", True):
-            return config.get("default_pages", 999), None
-            
+    def get_search_url(self, city, config):
+        """Get first result page url for city, None when the site has no such location"""
         # handle CSV-based location mapping
         if config.get("use_csv_location"):
             city_path = self.get_city_url_path(city, config)
             if city_path is None:
-                return config.get("default_pages", 999), None
+                return None
             
             url = config["base_url"].format(city_path=city_path)
         else:
             url = config["base_url"].format(city=unidecode(city).lower())
         
+        return self.search_filters.apply_to_url(url, config)
+    
+    def run_preflight(self, city, config):
+        """Check over plain http whether city has listings on the site (see PreflightProbe)"""
+        url = self.get_search_url(city, config)
+        check = self.preflight.check(url, config) if url else {"status": "empty", "count": 0, "pages": 0}
+        print(f"run_preflight: {config.get('site_name', '')} {check['status']} (count {check['count']}, pages {check['pages']})", flush=True)
+        return check
+    
+    def get_total_pages(self, city, config):
+        """Get number of pages to scrape and return page content if available"""
+        if not config.get("has_pagination", True):
+            return config.get("default_pages", 999), None
+            
+        url = self.get_search_url(city, config)
+        if url is None:
+            return config.get("default_pages", 999), None
+        
         self.browser_manager.navigate_to_url(url, site_name=config.get("site_name", ""))
         wait_config = config["selectors"]["wait_element"]
         
@@ -173,7 +305,8 @@ class PropertyScraper:
             olx_delay = config.get("thumbnail_delay", 2)
             print(f"get_total_pages: thumbnail delay {olx_delay}s", flush=True)
             time.sleep(olx_delay)
-            
+        
+        metrics.pages_fetched.inc(site=self.site_name)
         soup = BeautifulSoup(self.browser_manager.get_page_source(), "html.parser")
         
         # find pagination
@@ -261,114 +394,556 @@ class PropertyScraper:
         # return both page count and the soup of page 1 so we dont need to reload it
         return page_count, soup
     
+    def get_page_url(self, city, page_num, config):
+        """Build listing page url with filters, returns None if city is not mapped"""
+        # handle CSV-based location mapping
+        if config.get("use_csv_location"):
+            city_path = self.get_city_url_path(city, config)
+            if city_path is None:
+                return None
+            
+            url = config["page_url"].format(city_path=city_path, page=page_num)
+        else:
+            url = config["page_url"].format(city=unidecode(city).lower(), page=page_num)
+        
+        return self.search_filters.apply_to_url(url, config)
+    
+    def load_page_responses(self, city, page_num, config):
+        """Load page and extract listings from the portal's own json responses
+        
+        Returns None when capture is not used (page not loaded), otherwise the
+        extracted properties, empty when nothing matching came in.
+        """
+        capture = config.get("xhr_capture")
+        # devtools events need a real browser
+        if not capture or not self.browser_manager.capture_network or not self.browser_manager.driver:
+            return None
+        # the site keeps serving pages without the api call, stop waiting for it this run
+        max_misses = capture.get("max_misses", 3)
+        if self.xhr_misses >= max_misses:
+            return None
+        
+        url = self.get_page_url(city, page_num, config)
+        if url is None:
+            return None
+        print(f"load_page: scraping page {page_num}: {url} (xhr capture)", flush=True)
+        
+        self.browser_manager.start_response_capture(capture["url_patterns"])
+        self.browser_manager.navigate_to_url(url, auto_scroll=False, site_name=config.get("site_name", ""))
+        
+        responses = self.browser_manager.wait_for_responses(capture.get("timeout", 1))
+        if not responses:
+            metrics.wait_timeouts.inc(site=self.site_name, wait="xhr")
+            self.xhr_misses += 1
+            if self.xhr_misses == max_misses:
+                print(f"load_page: no json responses on {max_misses} pages in a row, xhr capture off for this run", flush=True)
+        else:
+            self.xhr_misses = 0
+        
+        properties = []
+        for response_url, payload in responses:
+            found = self.data_extractor.extract_from_json(payload, city, config)
+            print(f"load_page: {len(found)} properties from {response_url}", flush=True)
+            properties.extend(found)
+        if properties:
+            metrics.pages_fetched.inc(site=self.site_name)
+        return properties
+    
+    def load_page(self, city, page_num, config, navigate=True):
+        """Load one page of listings in the browser, returns page source or None"""
+        # use fresh browser instance for each page to avoid bot detection
+        is_allegro = config.get("site_name") == "allegro"
+        if navigate and is_allegro and page_num > 1:
+            print(f"load_page: creating fresh browser instance for Allegro page {page_num}")
+            self.setup_browser(fresh_instance=True)
+        
+        if navigate:
+            url = self.get_page_url(city, page_num, config)
+            if url is None:
+                return None
+            print(f"load_page: scraping page {page_num}: {url}", flush=True)
+            
+            try:
+                self.browser_manager.navigate_to_url(url, site_name=config.get("site_name", ""))
+            except WebDriverException as e:
+                raise PageLoadError(f"page {page_num} navigation failed: {e.msg}")
+        else:
+            url = self.browser_manager.get_current_url()
+            # json capture skipped the lazy loading scroll
+            if config.get("site_name") == "olx":
+                self.browser_manager.scroll_to_bottom()
+        
+        # check if we got redirected before waiting for elements
+        if (config.get("site_name") in ["otodom", "gethome"]) and page_num > 1:
+            actual_url = self.browser_manager.get_current_url()
+            print(f"load_page: {config.get('site_name')} page {page_num} - requested: {url}")
+            print(f"load_page: {config.get('site_name')} page {page_num} - actual: {actual_url}")
+            
+            # check if we were redirected to a different page
+            if (f"page={page_num}" not in actual_url and 
+                ("page=1" in actual_url or not "page=" in actual_url)):
+                print(f"load_page: {config.get('site_name')} redirect detected on page {page_num}, returning empty")
+                return None
+        
+        wait_config = config["selectors"]["wait_element"]
+        
+        if not self.wait_for_page(wait_config["value"], wait_config["type"]):
+            # a fully loaded page without listings is the end of results, anything else may work on retry
+            if not self.wait_for_content_loaded():
+                raise PageLoadError(f"page {page_num} did not finish loading")
+            if len(self.browser_manager.get_page_source()) < config.get("min_page_size", 2000):
+                raise PageLoadError(f"page {page_num} is blank")
+            return None
+        
+        if not self.wait_for_content_loaded():
+            raise PageLoadError(f"page {page_num} did not finish loading")
+        
+        # OLX-specific delay for thumbnail loading
+        if config.get("site_name") == "olx":
+            olx_delay = config.get("thumbnail_delay", 2)
+            print(f"load_page: OLX thumbnail delay {olx_delay}s", flush=True)
+            time.sleep(olx_delay)
+        
+        metrics.pages_fetched.inc(site=self.site_name)
+        return self.browser_manager.get_page_source()
+    
     def scrape_page(self, city, page_num, config, preloaded_soup=None):
         """Scrape one page of listings"""
         if preloaded_soup is None:
-            # use fresh browser instance for each page to avoid bot detection
-            is_allegro = config.get("site_name") == "allegro"
-            if is_allegro and page_num > 1:
-                print(f"scrape_page: creating fresh browser instance for Allegro page {page_num}")
-                self.setup_browser(fresh_instance=True)
-            
-            # handle CSV-based location mapping
-            if config.get("use_csv_location"):
-                city_path = self.get_city_url_path(city, config)
-                if city_path is None:
-                    return []
-                
-                url = config["page_url"].format(city_path=city_path, page=page_num)
+            # prefer the portal's json, fall back to the rendered page already loaded
+            properties = self.load_page_responses(city, page_num, config)
+            if properties:
+                return properties
+            page_source = self.load_page(city, page_num, config, navigate=properties is None)
+            if page_source is None:
+                return []
+            soup = BeautifulSoup(page_source, "html.parser")
+        else:
+            print(f"scrape_page: using preloaded page {page_num}", flush=True)
+            soup = preloaded_soup
+        
+        return extract_page_properties(soup, city, config, self.data_extractor)
+    
+    def probe_page(self, city, page_num, config, page_cache):
+        """Scrape page once and keep its properties for the main loop"""
+        if page_num not in page_cache:
+            try:
+                page_cache[page_num] = self.scrape_page(city, page_num, config)
+            except PageLoadError as e:
+                print(f"probe_page: {e}", flush=True)
+                page_cache[page_num] = self.retry_page_now(city, page_num, config)
+        return bool(page_cache[page_num])
+    
+    def find_last_page(self, city, config, upper_bound, page_cache):
+        """Find last non-empty page with exponential probing and binary search"""
+        if upper_bound < 1 or not self.probe_page(city, 1, config, page_cache):
+            return 0
+        
+        # exponential probing: 2, 4, 8, ... until an empty page or the bound
+        low, high = 1, None
+        probe = 2
+        while probe <= upper_bound:
+            if self.probe_page(city, probe, config, page_cache):
+                low = probe
+                probe *= 2
             else:
-                url = config["page_url"].format(city=unidecode(city).lower(), page=page_num)
+                high = probe
+                break
+        
+        if high is None:
+            if low == upper_bound or self.probe_page(city, upper_bound, config, page_cache):
+                low = high = upper_bound
+            else:
+                high = upper_bound
+        
+        # binary search between last non-empty and first empty page
+        while high - low > 1:
+            mid = (low + high) // 2
+            if self.probe_page(city, mid, config, page_cache):
+                low = mid
+            else:
+                high = mid
+        
+        print(f"find_last_page: last page is {low} ({len(page_cache)} pages probed)", flush=True)
+        return low
+    
+    def drop_duplicates(self, properties):
+        """Drop listings already seen in this run (promoted listings repeat across pages)"""
+        unique = []
+        for prop in properties:
+            if prop["id"] in self.seen_ids:
+                self.duplicates_dropped += 1
+                continue
+            self.seen_ids.add(prop["id"])
+            unique.append(prop)
+        return unique
+    
+    def report_page(self, page, total_pages, page_count_known, site_name):
+        """Send status and progress for the page being loaded"""
+        progress = int((page - 1) / total_pages * 100)
+        
+        # update detailed status with current page
+        if not page_count_known:
+            # dont show for sites without pagination 
+            self.send_status(f"Zbieranie ogłoszeń z {site_name}, strona {page}")
+        else:
+            self.send_status(f"Zbieranie ogłoszeń z {site_name}, strona {page}/{total_pages}")
+        
+        if self.job_id:
+            self.update_job(self.job_id, {"progress": progress})
+    
+    def retry_delay(self, config, attempt):
+        """Backoff in seconds after failed attempt number attempt"""
+        return config.get("retry_backoff", 2.0) * 2 ** (attempt - 1)
+    
+    def retry_page_now(self, city, page_num, config):
+        """Retry failed page in place with backoff and a fresh browser, returns [] once attempts are used up"""
+        for attempt in range(1, config.get("page_attempts", 3)):
+            delay = self.retry_delay(config, attempt)
+            print(f"retry_page_now: retrying page {page_num} in {delay:.0f}s (attempt {attempt + 1})", flush=True)
+            time.sleep(delay)
+            self.setup_browser(fresh_instance=True)
+            try:
+                return self.scrape_page(city, page_num, config)
+            except PageLoadError as e:
+                print(f"retry_page_now: {e}", flush=True)
+        
+        self.failed_pages.append(page_num)
+        print(f"retry_page_now: giving up on page {page_num}", flush=True)
+        return []
+    
+    def queue_retry(self, retry_queue, page_num, config, attempt, reason):
+        """Put failed page on the retry queue, returns False once attempts are used up"""
+        if attempt >= config.get("page_attempts", 3):
+            self.failed_pages.append(page_num)
+            print(f"scrape_site: giving up on page {page_num} after {attempt} attempts ({reason})", flush=True)
+            return False
+        
+        delay = self.retry_delay(config, attempt)
+        heapq.heappush(retry_queue, (time.monotonic() + delay, page_num, attempt))
+        print(f"scrape_site: page {page_num} failed ({reason}), retrying in {delay:.0f}s", flush=True)
+        return True
+    
+    def iter_retries(self, city, config, retry_queue, retry_empty, wait=False):
+        """Yield (page, properties) for queued pages that are due (all of them when wait)"""
+        while retry_queue and (wait or retry_queue[0][0] <= time.monotonic()):
+            ready_at, page, attempt = heapq.heappop(retry_queue)
+            time.sleep(max(0, ready_at - time.monotonic()))
             
-            print(f"scrape_page: scraping page {page_num}: {url}", flush=True)
+            # the old browser may be stuck or flagged
+            self.setup_browser(fresh_instance=True)
+            try:
+                properties = self.scrape_page(city, page, config)
+                if not properties and retry_empty:
+                    raise PageLoadError(f"page {page} is empty")
+            except PageLoadError as e:
+                self.queue_retry(retry_queue, page, config, attempt + 1, e)
+                continue
             
-            self.browser_manager.navigate_to_url(url, site_name=config.get("site_name", ""))
+            print(f"scrape_site: page {page} recovered on attempt {attempt + 1}", flush=True)
+            yield page, properties
+    
+    def iter_pages(self, city, config, total_pages, page_count_known, retry_empty, page_cache, first_page_soup, report):
+        """Yield (page, properties), failed pages come later from the retry queue
+        
+        With a known page count the crawl moves on and failed pages are retried
+        in between. Without one a failed page is retried in place, since giving
+        up there ends the site. retry_empty treats empty pages as failures.
+        """
+        if self.parse_workers > 0:
+            yield from self.iter_pages_pipelined(city, config, total_pages, page_count_known, retry_empty, page_cache, first_page_soup, report)
+            return
+        
+        retry_queue = []
+        for page in range(1, total_pages + 1):
+            yield from self.iter_retries(city, config, retry_queue, retry_empty)
+            report(page)
             
-            # check if we got redirected before waiting for elements
-            if (config.get("site_name") in ["otodom", "gethome"]) and page_num > 1:
-                actual_url = self.browser_manager.get_current_url()
-                print(f"scrape_page: {config.get('site_name')} page {page_num} - requested: {url}")
-                print(f"scrape_page: {config.get('site_name')} page {page_num} - actual: {actual_url}")
+            try:
+                # use pages already loaded while probing or preloaded page 1
+                if page in page_cache:
+                    properties = page_cache.pop(page)
+                elif page == 1 and first_page_soup is not None:
+                    print(f"scrape_page: processing preloaded page 1", flush=True)
+                    properties = self.scrape_page(city, page, config, first_page_soup)
+                else:
+                    properties = self.scrape_page(city, page, config)
                 
-                # check if we were redirected to a different page
-                if (f"page={page_num}" not in actual_url and 
-                    ("page=1" in actual_url or not "page=" in actual_url)):
-                    print(f"scrape_page: {config.get('site_name')} redirect detected on page {page_num}, returning empty")
-                    return []
-            
-            wait_config = config["selectors"]["wait_element"]
-            
-            if not self.wait_for_page(wait_config["value"], wait_config["type"]):
-                return []
+                if not properties and retry_empty:
+                    raise PageLoadError(f"page {page} is empty")
+            except PageLoadError as e:
+                if page_count_known:
+                    self.queue_retry(retry_queue, page, config, 1, e)
+                    properties = None
+                else:
+                    print(f"scrape_site: {e}", flush=True)
+                    properties = self.retry_page_now(city, page, config)
             
-            if not self.wait_for_content_loaded():
-                return []
+            if properties is not None:
+                yield page, properties
             
-            # OLX-specific delay for thumbnail loading
-            if config.get("site_name") == "olx":
-                olx_delay = config.get("thumbnail_delay", 2)
-                print(f"scrape_page: OLX thumbnail delay {olx_delay}s", flush=True)
-                time.sleep(olx_delay)
-                
-            soup = BeautifulSoup(self.browser_manager.get_page_source(), "html.parser")
-        else:
-            print(f"scrape_page: using preloaded page {page_num}", flush=True)
-            soup = preloaded_soup
+            if page < total_pages and page + 1 not in page_cache:
+                time.sleep(config.get("page_delay", 0.5))
         
-        # find listings container
-        container_config = config["selectors"]["listings_container"]
-        if container_config.get("data_testid"):
-            container = soup.find(container_config["tag"], attrs={"data-testid": container_config["data_testid"]})
-        else:
-            container = soup.find(container_config["tag"], class_=container_config["class"])
+        yield from self.iter_retries(city, config, retry_queue, retry_empty, wait=True)
+    
+    def iter_pages_pipelined(self, city, config, total_pages, page_count_known, retry_empty, page_cache, first_page_soup, report):
+        """Yield (page, properties), parsing in worker processes while the browser moves on"""
+        window = deque()
+        lookahead = self.parse_workers + 1
+        next_page = 1
+        retry_queue = []
+        
+        with ProcessPoolExecutor(max_workers=self.parse_workers) as executor:
+            try:
+                while window or next_page <= total_pages:
+                    # keep the browser loading ahead of the parsers
+                    while next_page <= total_pages and len(window) < lookahead:
+                        page = next_page
+                        next_page += 1
+                        report(page)
+                        
+                        if page in page_cache:
+                            window.append((page, page_cache.pop(page)))
+                        elif page == 1 and first_page_soup is not None:
+                            print(f"scrape_page: processing preloaded page 1", flush=True)
+                            window.append((page, self.scrape_page(city, page, config, first_page_soup)))
+                        else:
+                            if page > 1:
+                                time.sleep(config.get("page_delay", 0.5))
+                            try:
+                                page_source = self.load_page(city, page, config)
+                            except PageLoadError as e:
+                                if page_count_known:
+                                    self.queue_retry(retry_queue, page, config, 1, e)
+                                else:
+                                    print(f"scrape_site: {e}", flush=True)
+                                    window.append((page, self.retry_page_now(city, page, config)))
+                                continue
+                            if page_source is None:
+                                window.append((page, []))
+                            else:
+                                window.append((page, executor.submit(parse_page_source, page_source, city, config)))
+                    
+                    if window:
+                        page, result = window.popleft()
+                        if isinstance(result, Future):
+                            result = result.result()
+                        if not result and retry_empty:
+                            self.queue_retry(retry_queue, page, config, 1, f"page {page} is empty")
+                        else:
+                            yield page, result
+                    
+                    yield from self.iter_retries(city, config, retry_queue, retry_empty)
+            finally:
+                # consumer stopped early, drop pages loaded ahead
+                for _, result in window:
+                    if isinstance(result, Future):
+                        result.cancel()
+        
+        yield from self.iter_retries(city, config, retry_queue, retry_empty, wait=True)
+    
+    def scrape_range(self, city, config, first_page, last_page=None, filters=None, retry_empty=False, keep_going=None):
+        """Scrape pages first_page..last_page of a lease without saving them
         
-        if not container:
-            # try to find any div that might contain listings
-            potential_containers = soup.find_all("div", class_=lambda x: x and ("column" in " ".join(x) or "container" in " ".join(x) or "content" in " ".join(x)))
-            if potential_containers:
-                container = potential_containers[0]
+        Without last_page the pages are counted first (the planning lease of a
+        target) and page 1 plus any pages loaded while probing are returned with
+        the count. keep_going is checked before every page, so a lost lease stops
+        early. The browser stays open for the next lease.
+        """
+        self.site_name = config.get("site_name", "")
+        self.search_filters = SearchFilters(filters)
+        self.seen_ids = set()
+        self.duplicates_dropped = 0
+        self.failed_pages = []
+        self.xhr_misses = 0
         
-        if not container:
-            return []
+        page_cache = {}
+        total_pages = None
+        # targets without listings are planned without starting chrome
+        if last_page is None and self.preflight and config.get("preflight"):
+            check = self.run_preflight(city, config)
+            if check["status"] == "empty":
+                total_pages = last_page = 0
+            elif check["pages"]:
+                total_pages = check["pages"]
+                last_page = min(first_page, total_pages)
+                retry_empty = False
+        if last_page != 0:
+            self.setup_browser_for_site(config)
+        if last_page is None:
+            default_pages = config.get("default_pages", 999)
+            first_page_soup = None
+            if config.get("has_pagination", True):
+                total_pages, first_page_soup = self.get_total_pages(city, config)
+            if total_pages is None or total_pages == default_pages:
+                if first_page_soup is not None:
+                    page_cache[1] = self.scrape_page(city, 1, config, first_page_soup)
+                total_pages = self.find_last_page(city, config, default_pages, page_cache)
+                retry_empty = False
+            else:
+                page_cache[1] = self.scrape_page(city, 1, config, first_page_soup)
+                retry_empty = True
+            last_page = min(first_page, total_pages)
+        # a planning lease reports every page it loaded, the rest is queued
+        pages_done = sorted(set(page_cache) | set(range(first_page, last_page + 1)))
         
-        # find individual listings
-        listings = self.find_listings_with_strategy(container, config)
+        all_properties = []
+        end_page = None
         
-        print(f"scrape_page: found {len(listings)} listings", flush=True)
+        def keep(page, properties):
+            metrics.listings_extracted.inc(len(properties), site=self.site_name)
+            properties = self.drop_duplicates(properties)
+            if self.search_filters:
+                properties = [prop for prop in properties if self.search_filters.matches(prop)]
+            if self.geocoder:
+                self.geocoder.geocode_properties(properties)
+            if self.detail_enricher and config.get("detail_selectors"):
+                properties = self.detail_enricher.submit(properties, config)
+                properties += self.detail_enricher.collect()
+                if self.search_filters:
+                    properties = [prop for prop in properties if self.search_filters.matches(prop)]
+            all_properties.extend(properties)
+            print(f"scrape_range: page {page} done: {len(properties)} properties", flush=True)
         
-        properties = []
-        for listing in listings:
-            prop = self.extract_property(listing, city, config)
-            if prop:
-                properties.append(prop)
+        retry_queue = []
+        for page in range(first_page, last_page + 1):
+            if keep_going and not keep_going():
+                print(f"scrape_range: stopping before page {page}, lease lost", flush=True)
+                break
         
-        print(f"scrape_page: extracted {len(properties)} properties from page", flush=True)
-        return properties
+            if page in page_cache:
+                properties = page_cache.pop(page)
+            else:
+                if page > first_page:
+                    time.sleep(config.get("page_delay", 0.5))
+                try:
+                    properties = self.scrape_page(city, page, config)
+                    if not properties and retry_empty:
+                        raise PageLoadError(f"page {page} is empty")
+                except PageLoadError as e:
+                    self.queue_retry(retry_queue, page, config, 1, e)
+                    continue
+        
+            # later pages of the target are empty as well when the site gave the page
+            # count; in a probed or preflight-planned range an empty page is a gap
+            if not properties:
+                if retry_empty or (total_pages and page >= total_pages):
+                    end_page = page
+                    break
+                print(f"scrape_range: page {page} is empty, continuing", flush=True)
+                continue
+            # later pages of the target are too expensive as well
+            ceiling_reached = self.search_filters.price_ceiling_reached(properties, config)
+            keep(page, properties)
+            if ceiling_reached:
+                end_page = page
+                break
+        
+        for page, properties in self.iter_retries(city, config, retry_queue, retry_empty, wait=True):
+            keep(page, properties)
+        # pages loaded while probing for the count
+        for page, properties in sorted(page_cache.items()):
+            if properties:
+                keep(page, properties)
+        # listings still waiting for detail pages
+        if self.detail_enricher and self.detail_enricher.pending:
+            properties = self.detail_enricher.collect(wait_all=True)
+            if self.search_filters:
+                properties = [prop for prop in properties if self.search_filters.matches(prop)]
+            all_properties.extend(properties)
+        
+        return {
+            "properties": all_properties,
+            "total_pages": total_pages,
+            "pages_done": pages_done,
+            "end_page": end_page,
+            "retry_empty": retry_empty,
+            "failed_pages": sorted(self.failed_pages)
+        }
     
-    def scrape_site(self, city, config, max_pages=None):
+    def scrape_site(self, city, config, max_pages=None, filters=None):
         """Scrape entire site"""
         print(f"scrape_site: starting {config['name']} scraping for {city}", flush=True)
         
+        self.site_name = config.get("site_name", "")
+        self.search_filters = SearchFilters(filters)
+        self.seen_ids = set()
+        self.duplicates_dropped = 0
+        self.failed_pages = []
+        self.xhr_misses = 0
+        if self.search_filters:
+            print(f"scrape_site: filters {self.search_filters.filters}", flush=True)
+        
         try:
+            # batches an earlier run could not save
+            self.replay_spool()
+            
+            # listings saved by earlier runs need no detail pages
+            if self.detail_enricher and config.get("detail_selectors"):
+                self.detail_enricher.known_ids.update(self.sink.get_known_ids(self.site_name))
+            
+            # cheap http check first, small towns often have no listings at all
+            site_name = config.get('name', 'portal')
+            planned_pages = None
+            if self.preflight and config.get("preflight"):
+                self.send_status(f"Sprawdzanie {site_name}")
+                check = self.run_preflight(city, config)
+                if check["status"] == "empty":
+                    if self.job_id:
+                        self.update_job(self.job_id, {"total_found": 0})
+                    return {
+                        "success": True,
+                        "properties": [],
+                        "saved": 0,
+                        "total_found": 0,
+                        "duplicates_dropped": 0,
+                        "failed_pages": [],
+                        "skipped": True
+                    }
+                planned_pages = check["pages"]
+            
             # update status: initializing browser
             self.send_status("Inicjalizacja Chrome")
-            self.setup_browser()
+            self.setup_browser_for_site(config)
             
             # update status: starting to scrape
-            site_name = config.get('name', 'portal')
             self.send_status(f"Zbieranie ogłoszeń z {site_name}")
             
             # get page count and potentially preloaded first page
-            if config.get("has_pagination", True):
+            default_pages = config.get("default_pages", 999)
+            if planned_pages:
+                # counted by the preflight, an estimate that may end early
+                total_pages = min(planned_pages, max_pages) if max_pages else planned_pages
+                first_page_soup = None
+                page_count_known = True
+            elif config.get("has_pagination", True):
                 total_pages, first_page_soup = self.get_total_pages(city, config)
+                page_count_known = total_pages != default_pages
                 if max_pages:
                     total_pages = min(total_pages, max_pages)
-                print(f"scrape_site: will scrape {total_pages} pages", flush=True)
-                self.send_status(f"Zbieranie ogłoszeń z {site_name} (znaleziono {total_pages} stron)")
             else:
                 # for sites without pagination, use default or max_pages
-                total_pages = max_pages if max_pages else config.get("default_pages", 999)
+                total_pages = max_pages if max_pages else default_pages
                 first_page_soup = None
+                page_count_known = False
+            
+            # probe for the last page when the count is unknown
+            page_cache = {}
+            probed = False
+            if not page_count_known and config.get("probe_last_page", True):
+                if first_page_soup is not None:
+                    page_cache[1] = self.scrape_page(city, 1, config, first_page_soup)
+                    first_page_soup = None
+                self.send_status(f"Zbieranie ogłoszeń z {site_name} (szukanie ostatniej strony)")
+                total_pages = self.find_last_page(city, config, total_pages, page_cache)
+                probed = True
+                page_count_known = True
+            
+            if page_count_known:
+                print(f"scrape_site: will scrape {total_pages} pages", flush=True)
+                self.send_status(f"Zbieranie ogłoszeń z {site_name} (znaleziono {total_pages} stron)")
+            else:
                 print(f"scrape_site: will scrape until empty pages (max {total_pages} pages)", flush=True)
                 self.send_status(f"Zbieranie ogłoszeń z {site_name}")
             
@@ -376,27 +951,17 @@ class PropertyScraper:
             saved_count = 0
             empty_pages_count = 0
             
-            for page in range(1, total_pages + 1):
-                progress = int((page - 1) / total_pages * 100)
-                
-                # update detailed status with current page
-                if total_pages == 999:
-                    # dont show for sites without pagination 
-                    self.send_status(f"Zbieranie ogłoszeń z {site_name}, strona {page}")
-                else:
-                    self.send_status(f"Zbieranie ogłoszeń z {site_name}, strona {page}/{total_pages}")
-                
-                if self.job_id:
-                    self.update_job(self.job_id, {"progress": progress})
-                
-                # use preloaded soup for page 1 if available
-                if page == 1 and first_page_soup is not None:
-                    print(f"scrape_page: processing preloaded page 1", flush=True)
-                    properties = self.scrape_page(city, page, config, first_page_soup)
-                else:
-                    properties = self.scrape_page(city, page, config)
+            def report(page):
+                self.report_page(page, total_pages, page_count_known, site_name)
+            
+            # inside a counted range an empty page is a hiccup, a probed range may have gaps
+            retry_empty = page_count_known and not probed and not planned_pages
+            pages = self.iter_pages(city, config, total_pages, page_count_known, retry_empty, page_cache, first_page_soup, report)
+            for page, properties in pages:
+                metrics.listings_extracted.inc(len(properties), site=self.site_name)
                 
-                if not properties:
+                # empty pages inside a probed range are not the end of results
+                if not properties and not probed:
                     empty_pages_count += 1
                     print(f"scrape_site: page {page} is empty ({empty_pages_count} empty pages in a row)", flush=True)
                     
@@ -412,6 +977,23 @@ class PropertyScraper:
                 else:
                     empty_pages_count = 0  # reset counter when we find properties
                 
+                # results are sorted by price, so later pages only get more expensive
+                ceiling_reached = self.search_filters.price_ceiling_reached(properties, config)
+                properties = self.drop_duplicates(properties)
+                if self.search_filters:
+                    properties = [prop for prop in properties if self.search_filters.matches(prop)]
+                
+                if self.geocoder:
+                    self.geocoder.geocode_properties(properties)
+                
+                # incomplete listings wait for their detail pages, finished ones join this batch
+                if self.detail_enricher and config.get("detail_selectors"):
+                    properties = self.detail_enricher.submit(properties, config)
+                    properties += self.detail_enricher.collect()
+                    # detail pages can fill in area or rooms outside the filters
+                    if self.search_filters:
+                        properties = [prop for prop in properties if self.search_filters.matches(prop)]
+                
                 all_properties.extend(properties)
                 
                 # save properties in batch
@@ -420,8 +1002,50 @@ class PropertyScraper:
                 
                 print(f"scrape_site:page {page} done: {len(properties)} properties", flush=True)
                 
-                if page < total_pages:
-                    time.sleep(0.5)
+                if ceiling_reached:
+                    print("scrape_site: stopping, page prices are above max price", flush=True)
+                    break
+            
+            pages.close()
+            
+            # save listings still waiting for detail pages
+            if self.detail_enricher and self.detail_enricher.pending:
+                self.send_status(f"Uzupełnianie szczegółów z {site_name}")
+                properties = self.detail_enricher.collect(wait_all=True)
+                if self.search_filters:
+                    properties = [prop for prop in properties if self.search_filters.matches(prop)]
+                all_properties.extend(properties)
+                if properties:
+                    saved_count += self.save_properties_batch(properties)
+                print(f"scrape_site: enriched {self.detail_enricher.enriched_count} listings from detail pages", flush=True)
+            
+            # optional post-scrape stage: local thumbnails instead of hotlinking
+            if self.thumbnail_cache and all_properties:
+                self.send_status(f"Pobieranie miniatur z {site_name}")
+                if self.thumbnail_cache.prefetch(all_properties):
+                    updated = self.sink.update_thumbnails(all_properties)
+                    print(f"scrape_site: stored {updated} thumbnail paths", flush=True)
+            
+            # optional post-scrape stage: precomputed price statistics (filtered runs only see part of the market)
+            if self.market_stats and all_properties and not self.search_filters:
+                try:
+                    self.market_stats.update(config["site_name"], city, all_properties, self.job_id)
+                except Exception as e:
+                    print(f"scrape_site: market statistics failed: {e}", flush=True)
+            
+            # selector hit counts seed the next run's order
+            selector_stats = self.data_extractor.selector_stats
+            if selector_stats:
+                selector_stats.report(config["site_name"])
+                try:
+                    selector_stats.save()
+                except OSError as e:
+                    print(f"scrape_site: cannot save selector stats: {e}", flush=True)
+            
+            if self.duplicates_dropped:
+                print(f"scrape_site: dropped {self.duplicates_dropped} duplicate listings", flush=True)
+            if self.failed_pages:
+                print(f"scrape_site: gave up on pages {sorted(self.failed_pages)}", flush=True)
             
             # final completion status
             self.send_status(f"Zapisywanie wyników z {site_name}")
@@ -434,7 +1058,9 @@ class PropertyScraper:
                 "success": True,
                 "properties": all_properties,
                 "saved": saved_count,
-                "total_found": len(all_properties)
+                "total_found": len(all_properties),
+                "duplicates_dropped": self.duplicates_dropped,
+                "failed_pages": sorted(self.failed_pages)
             }
             
         except Exception as e:
@@ -0,0 +1,170 @@
+"""
+mieszkanieo scraper - churn driven recrawl scheduling
+"""
+
+import os
+import json
+import time
+
+from .chrome_env import get_cache_dir
+from .geocoder import normalize_name
+
+
+class RecrawlScheduler:
+    """Orders (site, city) refreshes by expected new listings per second of crawling
+
+    Every crawl is recorded with the number of new or re-priced listings compared
+    to the listings seen before. The change rate is a decayed average of those
+    counts over the hours between crawls (with a weak prior), so busy targets
+    come back often and quiet ones wait.
+    """
+
+    def __init__(self, state_dir=None, max_history=20, decay=0.8, prior_changes=0.1, prior_hours=1.0):
+        self.state_dir = state_dir or os.path.join(get_cache_dir(), "recrawl")
+        self.history_path = os.path.join(self.state_dir, "history.json")
+        self.max_history = max_history
+        # weight of each older crawl relative to the next one
+        self.decay = decay
+        self.prior_changes = prior_changes
+        self.prior_hours = prior_hours
+        self.history = None
+
+    def get_key(self, site, city):
+        """History key for site and city"""
+        return f"{site}:{normalize_name(city)}"
+
+    def load(self):
+        """Load crawl history"""
+        if self.history is not None:
+            return self.history
+        try:
+            with open(self.history_path, "r", encoding="utf-8") as f:
+                self.history = json.load(f)
+        except (OSError, ValueError):
+            self.history = {}
+        return self.history
+
+    def save(self):
+        """Store crawl history atomically"""
+        os.makedirs(self.state_dir, exist_ok=True)
+        tmp_path = f"{self.history_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.history, f)
+        os.replace(tmp_path, self.history_path)
+
+    def get_listings_path(self, site, city):
+        """Path of last seen listing prices for site and city"""
+        return os.path.join(self.state_dir, f"{site}_{normalize_name(city).replace(' ', '-')}.json")
+
+    def record_crawl(self, site, city, properties, duration, finished_at=None):
+        """Record crawl result, returns number of new or re-priced listings (None on first crawl)"""
+        self.load()
+        finished_at = finished_at or time.time()
+
+        listings_path = self.get_listings_path(site, city)
+        try:
+            with open(listings_path, "r", encoding="utf-8") as f:
+                seen = json.load(f)
+        except (OSError, ValueError):
+            seen = None
+
+        current = {prop["id"]: prop.get("price") for prop in properties if prop.get("id")}
+        changes = None
+        if seen is not None:
+            changes = sum(1 for listing_id, price in current.items() if seen.get(listing_id, -1) != price)
+            # partial crawls must not make unseen listings look new next time
+            seen.update(current)
+        else:
+            seen = current
+
+        os.makedirs(self.state_dir, exist_ok=True)
+        tmp_path = f"{listings_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(seen, f)
+        os.replace(tmp_path, listings_path)
+
+        crawls = self.history.setdefault(self.get_key(site, city), [])
+        crawls.append({"at": finished_at, "found": len(current), "changes": changes, "duration": round(duration, 1)})
+        del crawls[:-self.max_history]
+        self.save()
+
+        print(f"RecrawlScheduler: {site}/{city}: {len(current)} listings, {changes if changes is not None else 'first crawl'} changes", flush=True)
+        return changes
+
+    def change_rate(self, site, city):
+        """Estimated new or re-priced listings per hour"""
+        crawls = self.load().get(self.get_key(site, city), [])
+        changes = self.prior_changes
+        hours = self.prior_hours
+        weight = 1.0
+        # newest interval first, older ones fade out
+        for previous, crawl in reversed(list(zip(crawls, crawls[1:]))):
+            if crawl["changes"] is None:
+                continue
+            changes += weight * crawl["changes"]
+            hours += weight * max(crawl["at"] - previous["at"], 60) / 3600
+            weight *= self.decay
+        return changes / hours
+
+    def crawl_cost(self, site, city, default=300.0):
+        """Expected crawl duration in seconds"""
+        crawls = self.load().get(self.get_key(site, city), [])
+        durations = [crawl["duration"] for crawl in crawls[-5:] if crawl.get("duration")]
+        return sum(durations) / len(durations) if durations else default
+
+    def expected_changes(self, site, city, now=None):
+        """Expected new or re-priced listings if crawled now (None if never crawled)"""
+        crawls = self.load().get(self.get_key(site, city), [])
+        if not crawls:
+            return None
+        hours = max((now or time.time()) - crawls[-1]["at"], 0) / 3600
+        # at most the whole market turned over
+        return min(self.change_rate(site, city) * hours, max(crawls[-1]["found"], 1))
+
+    def plan(self, targets, now=None):
+        """Order (site, city) targets by expected changes per crawl second, never crawled first"""
+        scored = []
+        for site, city in targets:
+            expected = self.expected_changes(site, city, now)
+            cost = self.crawl_cost(site, city)
+            score = float("inf") if expected is None else expected / cost
+            scored.append({"site": site, "city": city, "expected": expected, "cost": cost, "score": score})
+        scored.sort(key=lambda target: target["score"], reverse=True)
+        return scored
+
+    def run(self, targets, crawl, budget, min_expected=1.0):
+        """Crawl best targets until budget seconds are used, returns crawled targets
+
+        crawl(site, city) runs a scrape and returns its scrape_site result.
+        Targets are re-planned after every crawl; ones expecting fewer than
+        min_expected changes are left for later.
+        """
+        crawled = []
+        started = time.monotonic()
+        while True:
+            spent = time.monotonic() - started
+            candidates = [
+                target for target in self.plan(targets)
+                if (target["expected"] is None or target["expected"] >= min_expected) and target["cost"] <= budget - spent
+            ]
+            if not candidates:
+                break
+
+            target = candidates[0]
+            expected = "unknown" if target["expected"] is None else f"{target['expected']:.1f}"
+            print(f"RecrawlScheduler: crawling {target['site']}/{target['city']} (expected changes {expected}, cost {target['cost']:.0f}s)", flush=True)
+
+            crawl_started = time.monotonic()
+            try:
+                result = crawl(target["site"], target["city"])
+            except Exception as e:
+                print(f"RecrawlScheduler: {target['site']}/{target['city']} crashed: {e}", flush=True)
+                result = {"success": False}
+            duration = time.monotonic() - crawl_started
+            if result.get("success"):
+                self.record_crawl(target["site"], target["city"], result.get("properties", []), duration)
+            else:
+                # a failed target should not block the rest of the budget
+                targets = [t for t in targets if t != (target["site"], target["city"])]
+            crawled.append(target)
+        return crawled
@@ -0,0 +1,59 @@
+"""
+mieszkanieo scraper - search filters
+"""
+
+
+class SearchFilters:
+    """User search filters pushed down into portal urls and applied to results"""
+
+    FIELDS = ("price_min", "price_max", "area_min", "area_max", "rooms_min", "rooms_max")
+
+    def __init__(self, filters=None):
+        self.filters = {}
+        for key, value in (filters or {}).items():
+            if key not in self.FIELDS or value is None or value == "":
+                continue
+            try:
+                self.filters[key] = int(value)
+            except (TypeError, ValueError):
+                print(f"SearchFilters: ignoring invalid {key}={value!r}")
+
+    def __bool__(self):
+        return bool(self.filters)
+
+    def apply_to_url(self, url, config):
+        """Append portal query parameters for supported filters"""
+        params = config.get("filter_params", {})
+        for key, value in self.filters.items():
+            if key in params:
+                url += params[key].format(value=value)
+        return url
+
+    def matches(self, prop):
+        """Check property against filters (missing area/rooms pass, like the api)"""
+        price = prop.get("price") or 0
+        if price:
+            if "price_min" in self.filters and price < self.filters["price_min"]:
+                return False
+            if "price_max" in self.filters and price > self.filters["price_max"]:
+                return False
+
+        for field in ("area", "rooms"):
+            value = prop.get(field)
+            if not value:
+                continue
+            if f"{field}_min" in self.filters and value < self.filters[f"{field}_min"]:
+                return False
+            if f"{field}_max" in self.filters and value > self.filters[f"{field}_max"]:
+                return False
+
+        return True
+
+    def price_ceiling_reached(self, properties, config):
+        """Check if a price-sorted page is already above the max price"""
+        if not config.get("price_sorted") or "price_max" not in self.filters:
+            return False
+
+        # price 0 means the portal showed no price ("zapytaj o cenę")
+        prices = [prop["price"] for prop in properties if prop.get("price")]
+        return bool(prices) and min(prices) > self.filters["price_max"]
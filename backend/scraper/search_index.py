@@ -0,0 +1,125 @@
+"""
+mieszkanieo scraper - full-text search index for titles and addresses
+"""
+
+import os
+import re
+import sqlite3
+from unidecode import unidecode
+
+# same table is created by server.ts, which searches it for ?q=
+CREATE_FTS_TABLE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS properties_fts USING fts5(
+      id UNINDEXED,
+      title,
+      address,
+      tokenize = 'unicode61'
+    )
+"""
+
+# rowid comes from the listing id, so re-scraped listings replace their row
+UPSERT_FTS_ROW = """
+    INSERT OR REPLACE INTO properties_fts (rowid, id, title, address)
+    VALUES (?, ?, ?, ?)
+"""
+
+
+def fold_text(text):
+    """Lowercase and drop Polish diacritics, e.g. 'Garaż, Śródmieście' -> 'garaz, srodmiescie'"""
+    return unidecode(text or "").lower()
+
+
+def build_match_query(text):
+    """FTS5 query matching all words as prefixes, e.g. 'garaż bogu' -> '"garaz"* "bogu"*'"""
+    words = re.findall(r"[a-z0-9]+", fold_text(text))
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def get_rowid(listing_id):
+    """Stable rowid for 12 hex character listing ids (None lets sqlite pick one)"""
+    try:
+        return int(listing_id, 16)
+    except (TypeError, ValueError):
+        return None
+
+
+class SearchIndex:
+    """FTS5 index of folded listing titles and addresses kept next to the properties table
+
+    Updated per saved batch as an output of scrape_site. Rows of listings that
+    are no longer in the properties table are pruned on close.
+    """
+
+    def __init__(self, db_path=None):
+        if db_path is None:
+            db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'mieszkanieo.db')
+        self.db_path = db_path
+        self.conn = None
+
+    def connect(self):
+        """Open database and create the index table"""
+        if self.conn:
+            return self.conn
+        self.conn = sqlite3.connect(self.db_path, timeout=30)
+        self.conn.execute(CREATE_FTS_TABLE)
+        self.conn.commit()
+        return self.conn
+
+    def write_batch(self, properties):
+        """Index (or re-index) properties, returns number of rows written"""
+        rows = [
+            (get_rowid(prop["id"]), prop["id"], fold_text(prop.get("title")), fold_text(prop.get("address")))
+            for prop in properties if prop.get("id")
+        ]
+        if not rows:
+            return 0
+        conn = self.connect()
+        with conn:
+            conn.executemany(UPSERT_FTS_ROW, rows)
+        return len(rows)
+
+    def rebuild(self):
+        """Index every listing in the properties table from scratch"""
+        conn = self.connect()
+        with conn:
+            conn.execute("DELETE FROM properties_fts")
+            rows = conn.execute("SELECT id, title, address FROM properties").fetchall()
+            conn.executemany(UPSERT_FTS_ROW, [
+                (get_rowid(listing_id), listing_id, fold_text(title), fold_text(address))
+                for listing_id, title, address in rows
+            ])
+        return len(rows)
+
+    def search(self, text, limit=50):
+        """Get ids of listings matching all words of text, best matches first"""
+        query = build_match_query(text)
+        if not query:
+            return []
+        rows = self.connect().execute(
+            "SELECT id FROM properties_fts WHERE properties_fts MATCH ? ORDER BY rank LIMIT ?",
+            (query, limit)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def prune(self):
+        """Drop index rows of deleted listings, returns number removed"""
+        conn = self.connect()
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'properties'").fetchone()
+        if not exists:
+            return 0
+        with conn:
+            cursor = conn.execute("DELETE FROM properties_fts WHERE id NOT IN (SELECT id FROM properties)")
+        return cursor.rowcount
+
+    def close(self):
+        """Prune and close"""
+        if not self.conn:
+            return
+        try:
+            removed = self.prune()
+            if removed:
+                print(f"SearchIndex: pruned {removed} deleted listings", flush=True)
+        except sqlite3.Error as e:
+            print(f"SearchIndex: prune failed: {e}", flush=True)
+        self.conn.close()
+        self.conn = None
@@ -0,0 +1,114 @@
+"""
+mieszkanieo scraper - adaptive selector ordering
+"""
+
+import os
+import json
+
+from .chrome_env import get_cache_dir
+
+
+def selector_key(selector):
+    """Name for selector like ["p", "css-1j3chf6"] -> 'p.css-1j3chf6'"""
+    tag, css_class = selector[0], selector[1] if len(selector) > 1 else ""
+    return f"{tag}.{css_class}" if css_class else tag
+
+
+class SelectorStats:
+    """Per site and field selector hit and miss counts, selectors that never hit are tried last
+
+    A selector is only tried when the ones before it missed, so hit rates of
+    fallbacks are not comparable to the first selector's. The configured
+    priority is kept; only selectors proven to never hit (min_misses lookups
+    without a hit) move behind the others, so the order never changes which
+    selector wins on a listing where an earlier one hits.
+
+    Counts of earlier runs are loaded scaled by carry_over, so they seed the
+    order but a changed site overrides them within a few pages. A field's order
+    is recomputed every reorder_every lookups.
+    """
+
+    def __init__(self, path=None, carry_over=0.5, reorder_every=20, min_misses=20):
+        self.path = path or os.path.join(get_cache_dir(), "selector_stats.json")
+        self.carry_over = carry_over
+        self.reorder_every = reorder_every
+        self.min_misses = min_misses
+        # "site/field" -> selector key -> [hits, misses]
+        self.counts = None
+        # "site/field" -> [ordered selectors, lookups until reorder]
+        self.orders = {}
+
+    def load(self):
+        """Load counts of earlier runs (only once)"""
+        if self.counts is not None:
+            return self.counts
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            saved = {}
+        self.counts = {
+            field: {key: [hits * self.carry_over, misses * self.carry_over] for key, (hits, misses) in selectors.items()}
+            for field, selectors in saved.items()
+        }
+        return self.counts
+
+    def save(self):
+        """Store counts atomically"""
+        if self.counts is None:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        rounded = {
+            field: {key: [round(hits, 2), round(misses, 2)] for key, (hits, misses) in selectors.items()}
+            for field, selectors in self.counts.items()
+        }
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(rounded, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def order(self, site, field, selectors):
+        """Get selectors in configured order, those that never hit moved to the end"""
+        if len(selectors) < 2:
+            return selectors
+        field_key = f"{site}/{field}"
+        cached = self.orders.get(field_key)
+        if cached and cached[1] > 0:
+            cached[1] -= 1
+            return cached[0]
+
+        counts = self.load().get(field_key, {})
+
+        def proven_miss(selector):
+            hits, misses = counts.get(selector_key(selector), (0, 0))
+            return not hits and misses >= self.min_misses
+
+        # sorted is stable, selectors that hit keep their configured priority
+        ordered = sorted(selectors, key=proven_miss)
+        if cached and cached[0] != ordered:
+            print(f"SelectorStats: {field_key} now tries {', '.join(selector_key(selector) for selector in ordered)}", flush=True)
+        self.orders[field_key] = [ordered, self.reorder_every]
+        return ordered
+
+    def record(self, site, field, selector, hit):
+        """Count one selector lookup, a hit is an element whose text gave a value for the field"""
+        counts = self.load().setdefault(f"{site}/{field}", {}).setdefault(selector_key(selector), [0, 0])
+        counts[0 if hit else 1] += 1
+
+    def never_hit(self, site=None, min_misses=3):
+        """Get (field, selector, misses) of selectors that were tried but never found anything"""
+        found = []
+        for field_key, selectors in sorted(self.load().items()):
+            if site and not field_key.startswith(f"{site}/"):
+                continue
+            for key, (hits, misses) in sorted(selectors.items()):
+                if not hits and misses >= min_misses:
+                    found.append((field_key, key, misses))
+        return found
+
+    def report(self, site=None):
+        """Print selectors that never hit, they are candidates for removal from the config"""
+        stale = self.never_hit(site)
+        for field_key, key, misses in stale:
+            print(f"SelectorStats: {field_key} selector {key} never hit ({misses:.0f} misses)", flush=True)
+        return stale
@@ -0,0 +1,284 @@
+"""
+mieszkanieo scraper - crash-safe property spool
+"""
+
+import os
+import json
+import time
+import zlib
+import struct
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+from .chrome_env import get_cache_dir
+
+# record header: payload length, crc32 of payload
+HEADER = struct.Struct("<II")
+
+
+def try_lock(f):
+    """Take an exclusive lock on an open file without waiting, returns False when held elsewhere"""
+    try:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def unlock(f):
+    """Release a lock taken by try_lock"""
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class PropertySpool:
+    """Append-only journal of property batches, acknowledged ones are checkpointed
+
+    Every batch is written (and fsynced) before it is sent. A batch is acked once
+    the sink accepted it, and the checkpoint moves past all leading acked records.
+    Whatever is after the checkpoint on the next start is sent again; the api and
+    the sqlite sink ignore listings they already have.
+
+    Each job gets its own journal, only one process at a time may use it (lock
+    file). Its later sites replay what earlier ones could not send. Batches of
+    another job are not replayed, the server replaces all listings at the start
+    of every job; journals of other runs left unwritten for max_age are removed
+    on open.
+    """
+
+    def __init__(self, path=None, max_age=24 * 3600, job_id=None):
+        self.job_id = job_id
+        name = f"properties-{job_id}.journal" if job_id else "properties.journal"
+        self.path = path or os.path.join(get_cache_dir(), "spool", name)
+        self.ack_path = self.path + ".ack"
+        self.lock_path = self.path + ".lock"
+        # older unsent batches belong to a finished job, they are dropped on replay
+        self.max_age = max_age
+        self.file = None
+        self.lock_file = None
+        # journal held by another process, batches are sent without journaling
+        self.busy = False
+        self.checkpoint = 0
+        # unacked records after the checkpoint: offset -> end offset (file order)
+        self.pending = OrderedDict()
+        self.acked = set()
+
+    def lock(self):
+        """Lock the journal for this process, returns False when another process has it"""
+        while True:
+            lock_file = open(self.lock_path, "ab")
+            if not try_lock(lock_file):
+                lock_file.close()
+                return False
+            # the holder before us may have removed the lock file after we opened it
+            try:
+                if os.stat(self.lock_path).st_ino == os.fstat(lock_file.fileno()).st_ino:
+                    self.lock_file = lock_file
+                    return True
+            except OSError:
+                pass
+            lock_file.close()
+
+    def expire_stale(self):
+        """Remove journals of other runs that no process holds and that were not written for max_age"""
+        spool_dir = os.path.dirname(self.path)
+        journals = {}
+        for name in os.listdir(spool_dir):
+            if not name.startswith("properties"):
+                continue
+            journal = name
+            for suffix in (".ack", ".lock"):
+                if journal.endswith(".journal" + suffix):
+                    journal = journal[:-len(suffix)]
+            if not journal.endswith(".journal"):
+                continue
+            path = os.path.join(spool_dir, journal)
+            if path == self.path:
+                continue
+            try:
+                journals[path] = max(journals.get(path, 0), os.path.getmtime(os.path.join(spool_dir, name)))
+            except OSError:
+                pass
+
+        now = time.time()
+        for path, modified in sorted(journals.items()):
+            if now - modified < self.max_age:
+                continue
+            other = PropertySpool(path, self.max_age)
+            if not other.lock():
+                continue
+            print(f"PropertySpool: removing stale journal {os.path.basename(path)}", flush=True)
+            for stale_path in (other.path, other.ack_path, other.lock_path):
+                try:
+                    os.remove(stale_path)
+                except OSError:
+                    pass
+            unlock(other.lock_file)
+            other.lock_file.close()
+
+    def open(self):
+        """Open and lock journal, cutting off a torn record left by a crash; False when it is in use"""
+        if self.file:
+            return True
+        if self.busy:
+            return False
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if not self.lock():
+            print(f"PropertySpool: {self.path} is used by another process, batches are not journaled", flush=True)
+            self.busy = True
+            return False
+        try:
+            self.expire_stale()
+        except OSError as e:
+            print(f"PropertySpool: cannot clean up old journals: {e}", flush=True)
+
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        self.checkpoint = self.read_checkpoint()
+        if self.checkpoint > size:
+            self.checkpoint = 0
+
+        valid_end = self.checkpoint
+        for _, end, _ in self.read_records(self.checkpoint):
+            valid_end = end
+        if valid_end < size:
+            print(f"PropertySpool: dropping {size - valid_end} bytes of damaged journal tail", flush=True)
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_end)
+
+        self.file = open(self.path, "ab")
+        return True
+
+    def read_checkpoint(self):
+        """Get acknowledged journal offset"""
+        try:
+            with open(self.ack_path, "r", encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def write_checkpoint(self, offset):
+        """Store acknowledged journal offset atomically"""
+        tmp_path = f"{self.ack_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.ack_path)
+        self.checkpoint = offset
+
+    def read_records(self, start):
+        """Yield (offset, end, record) for valid records from offset, stops at the first bad one"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            offset = start
+            while True:
+                header = f.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    return
+                length, crc = HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    return
+                try:
+                    record = json.loads(payload.decode("utf-8"))
+                except ValueError:
+                    return
+                end = offset + HEADER.size + length
+                yield offset, end, record
+                offset = end
+
+    def append(self, properties):
+        """Write batch to the journal, returns its offset"""
+        payload = json.dumps({"ts": time.time(), "job_id": self.job_id, "properties": properties}, ensure_ascii=False).encode("utf-8")
+        offset = os.fstat(self.file.fileno()).st_size
+        self.file.write(HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending[offset] = offset + HEADER.size + len(payload)
+        return offset
+
+    def ack(self, offset):
+        """Mark batch as saved and move the checkpoint past leading acked records"""
+        self.acked.add(offset)
+        checkpoint = self.checkpoint
+        for pending_offset, end in list(self.pending.items()):
+            if pending_offset not in self.acked:
+                break
+            del self.pending[pending_offset]
+            self.acked.discard(pending_offset)
+            checkpoint = end
+        if checkpoint != self.checkpoint:
+            self.write_checkpoint(checkpoint)
+
+    def save(self, properties, send):
+        """Journal batch, then send it; send returns saved count or None on failure"""
+        if not self.open():
+            return send(properties) or 0
+        offset = self.append(properties)
+        saved = send(properties)
+        if saved is None:
+            print(f"PropertySpool: batch of {len(properties)} kept for replay", flush=True)
+            return 0
+        self.ack(offset)
+        return saved
+
+    def replay(self, send):
+        """Send this job's batches left unacknowledged by earlier runs, returns number of properties saved"""
+        if not self.open():
+            return 0
+        saved_total = 0
+        replayed = 0
+        for offset, end, record in self.read_records(self.checkpoint):
+            if offset in self.pending:
+                continue
+            self.pending[offset] = end
+            if record.get("job_id") != self.job_id or time.time() - record.get("ts", 0) > self.max_age:
+                self.ack(offset)
+                continue
+
+            saved = send(record["properties"])
+            if saved is None:
+                # sink still down, keep the rest for the next start
+                break
+            self.ack(offset)
+            saved_total += saved
+            replayed += 1
+
+        if replayed:
+            print(f"PropertySpool: replayed {replayed} batches, saved {saved_total}", flush=True)
+        return saved_total
+
+    def close(self):
+        """Close journal and release the lock, removing the journal when everything was acknowledged"""
+        if not self.file:
+            return
+        size = os.fstat(self.file.fileno()).st_size
+        self.file.close()
+        self.file = None
+        if self.checkpoint >= size:
+            # journal first: a checkpoint without its journal is reset on open
+            for path in (self.path, self.ack_path, self.lock_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        unlock(self.lock_file)
+        self.lock_file.close()
+        self.lock_file = None
+        self.checkpoint = 0
+        self.pending.clear()
+        self.acked.clear()
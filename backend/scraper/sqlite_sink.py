@@ -0,0 +1,201 @@
+"""
+mieszkanieo scraper - direct sqlite sink
+"""
+
+import os
+import sqlite3
+from urllib.parse import urlparse
+
+
+SITES = ('allegro', 'gethome', 'nieruchomosci', 'olx', 'otodom')
+
+# optional fields the api rejects as null (express-validator optional() only skips missing ones)
+NOT_NULL_FIELDS = ('area', 'image', 'city', 'thumbnail')
+
+CREATE_PROPERTIES_TABLE = """
+    CREATE TABLE IF NOT EXISTS properties (
+      id TEXT PRIMARY KEY,
+      title TEXT NOT NULL,
+      price INTEGER NOT NULL,
+      area INTEGER,
+      rooms INTEGER,
+      level INTEGER,
+      address TEXT NOT NULL,
+      image TEXT,
+      link TEXT NOT NULL UNIQUE,
+      site TEXT NOT NULL,
+      city TEXT,
+      lat REAL,
+      lon REAL,
+      thumbnail TEXT,
+      created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+      updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+INSERT_PROPERTY = """
+    INSERT OR IGNORE INTO properties (id, title, price, area, rooms, level, address, site, link, image, city, lat, lon, thumbnail, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+"""
+
+
+# recrawls add listings and refresh the price of ones already stored
+UPSERT_PROPERTY = """
+    INSERT INTO properties (id, title, price, area, rooms, level, address, site, link, image, city, lat, lon, thumbnail, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+    ON CONFLICT(id) DO UPDATE SET price = excluded.price, updated_at = CURRENT_TIMESTAMP WHERE price != excluded.price
+    ON CONFLICT DO NOTHING
+"""
+
+
+class SQLiteSink:
+    """Writes properties straight into the app database (same rules as /api/properties/batch)"""
+
+    def __init__(self, db_path=None, update_prices=False):
+        if db_path is None:
+            db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'mieszkanieo.db')
+        self.db_path = db_path
+        self.update_prices = update_prices
+        # set when the last batch was refused as invalid (not just failed to save)
+        self.batch_rejected = False
+        self.conn = None
+
+    def connect(self):
+        """Open database in WAL mode so the api server can keep reading"""
+        if self.conn:
+            return self.conn
+
+        self.conn = sqlite3.connect(self.db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(CREATE_PROPERTIES_TABLE)
+        # databases created before coordinates and thumbnails were stored
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(properties)")}
+        for column, column_type in (("lat", "REAL"), ("lon", "REAL"), ("thumbnail", "TEXT")):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE properties ADD COLUMN {column} {column_type}")
+        self.conn.commit()
+        return self.conn
+
+    def validate_property(self, prop):
+        """Validate and trim property like express-validator does, returns row or error
+
+        Like the api's optional(), an optional field may be missing but not null
+        (NOT_NULL_FIELDS); only rooms, level and the coordinates accept null.
+        """
+        def trimmed(field, min_len, max_len, optional=False):
+            if optional and field not in prop:
+                return None
+            value = prop.get(field)
+            if not isinstance(value, str):
+                raise ValueError(f"{field} must be a string")
+            value = value.strip()
+            if not min_len <= len(value) <= max_len:
+                raise ValueError(f"{field} length must be between {min_len} and {max_len}")
+            return value
+
+        def integer(field, optional=False, nullable=False, min_value=None):
+            if optional and field not in prop:
+                return None
+            value = prop.get(field)
+            if value is None and nullable:
+                return None
+            if isinstance(value, bool) or not isinstance(value, int):
+                raise ValueError(f"{field} must be an integer")
+            if min_value is not None and value < min_value:
+                raise ValueError(f"{field} must be at least {min_value}")
+            return value
+
+        def coordinate(field, limit):
+            value = prop.get(field)
+            if value is None:
+                return None
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not -limit <= value <= limit:
+                raise ValueError(f"{field} must be a number between -{limit} and {limit}")
+            return float(value)
+
+        link = prop.get("link")
+        parsed = urlparse(link) if isinstance(link, str) else None
+        if not parsed or parsed.scheme not in ("http", "https") or "." not in parsed.netloc or len(link) > 1000:
+            raise ValueError("link must be a valid url")
+
+        site = trimmed("site", 1, 50)
+        if site not in SITES:
+            raise ValueError(f"site must be one of {', '.join(SITES)}")
+
+        return (
+            trimmed("id", 1, 50),
+            trimmed("title", 1, 500),
+            integer("price", min_value=0),
+            integer("area", optional=True, min_value=0),
+            integer("rooms", optional=True, nullable=True),
+            integer("level", optional=True, nullable=True),
+            trimmed("address", 1, 1000),
+            site,
+            link,
+            trimmed("image", 0, 1000, optional=True),
+            trimmed("city", 1, 100, optional=True),
+            coordinate("lat", 90),
+            coordinate("lon", 180),
+            trimmed("thumbnail", 0, 1000, optional=True)
+        )
+
+    def save_properties_batch(self, properties):
+        """Save properties in one transaction, returns number of new rows"""
+        return self.send_properties_batch(properties) or 0
+    
+    def send_properties_batch(self, properties):
+        """Save properties, returns number of new rows or None on database errors"""
+        self.batch_rejected = False
+        if not properties:
+            return 0
+
+        # like the api, one invalid property rejects the whole batch
+        try:
+            rows = [self.validate_property(prop) for prop in properties]
+        except ValueError as e:
+            print(f"save_properties_batch: invalid input data: {e}")
+            self.batch_rejected = True
+            return 0
+
+        try:
+            conn = self.connect()
+            changes_before = conn.total_changes
+            with conn:
+                conn.executemany(UPSERT_PROPERTY if self.update_prices else INSERT_PROPERTY, rows)
+            saved = conn.total_changes - changes_before
+            print(f"save_properties_batch: saved {saved}, skipped {len(rows) - saved}", flush=True)
+            return saved
+        except sqlite3.Error as e:
+            print(f"save_properties_batch: database error: {e}")
+            return None
+
+    def get_known_ids(self, site):
+        """Get ids of listings of a site that are already stored"""
+        try:
+            conn = self.connect()
+            return {row[0] for row in conn.execute("SELECT id FROM properties WHERE site = ?", (site,))}
+        except sqlite3.Error as e:
+            print(f"get_known_ids: database error: {e}")
+            return set()
+
+    def update_thumbnails(self, properties):
+        """Store cached thumbnail paths of saved properties, returns number of rows updated"""
+        rows = [(prop["thumbnail"], prop["id"]) for prop in properties if prop.get("thumbnail")]
+        if not rows:
+            return 0
+        try:
+            conn = self.connect()
+            changes_before = conn.total_changes
+            with conn:
+                conn.executemany("UPDATE properties SET thumbnail = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?", rows)
+            return conn.total_changes - changes_before
+        except sqlite3.Error as e:
+            print(f"update_thumbnails: database error: {e}")
+            return 0
+
+    def close(self):
+        """Close database connection"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,113 @@
+"""
+mieszkanieo scraper - local thumbnail cache
+"""
+
+import io
+import os
+import asyncio
+import requests
+
+from .chrome_env import get_cache_dir
+
+
+class ThumbnailCache:
+    """Downloads listing images concurrently and keeps small thumbnails in a size-capped LRU on disk"""
+
+    def __init__(self, cache_dir=None, max_bytes=200 * 1024 * 1024, size=(320, 240), concurrency=8, timeout=15):
+        self.cache_dir = cache_dir or os.path.join(get_cache_dir(), "thumbnails")
+        self.max_bytes = max_bytes
+        self.size = size
+        self.concurrency = concurrency
+        self.timeout = timeout
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_path(self, listing_id):
+        """Get thumbnail path for listing id"""
+        safe_id = "".join(c for c in str(listing_id) if c.isalnum() or c in "-_")
+        return os.path.join(self.cache_dir, f"{safe_id}.jpg")
+
+    def prefetch(self, properties):
+        """Fetch thumbnails for properties and set their 'thumbnail' path, returns number cached"""
+        if not properties:
+            return 0
+
+        cached = asyncio.run(self._prefetch_all(properties))
+
+        # a tiny cache can evict thumbnails fetched in this run
+        evicted = set(self.evict())
+        for prop in properties:
+            if prop.get("thumbnail") in evicted:
+                del prop["thumbnail"]
+                cached -= 1
+        print(f"ThumbnailCache: {cached}/{len(properties)} thumbnails cached", flush=True)
+        return cached
+
+    async def _prefetch_all(self, properties):
+        """Fetch all thumbnails with bounded parallelism"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._prefetch_one(semaphore, prop) for prop in properties))
+        return sum(1 for result in results if result)
+
+    async def _prefetch_one(self, semaphore, prop):
+        """Fetch one thumbnail unless it is already cached"""
+        image_url = prop.get("image")
+        if not image_url or not prop.get("id"):
+            return False
+
+        path = self.get_path(prop["id"])
+        if os.path.exists(path):
+            # mark as recently used
+            os.utime(path)
+            prop["thumbnail"] = path
+            return True
+
+        async with semaphore:
+            try:
+                await asyncio.to_thread(self._download_thumbnail, image_url, path)
+            except Exception as e:
+                print(f"ThumbnailCache: failed {image_url}: {e}")
+                return False
+
+        prop["thumbnail"] = path
+        return True
+
+    def _download_thumbnail(self, image_url, path):
+        """Download image, resize and store it atomically"""
+        from PIL import Image
+
+        response = requests.get(image_url, timeout=self.timeout, headers={
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+        })
+        response.raise_for_status()
+
+        with Image.open(io.BytesIO(response.content)) as image:
+            image = image.convert("RGB")
+            image.thumbnail(self.size)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            image.save(tmp_path, "JPEG", quality=80, optimize=True)
+        os.replace(tmp_path, path)
+
+    def evict(self):
+        """Remove least recently used thumbnails until the cache fits max_bytes, returns removed paths"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".jpg"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if total <= self.max_bytes:
+            return []
+
+        removed = []
+        for _, file_size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= file_size
+                removed.append(path)
+            except OSError:
+                continue
+        return removed
@@ -4,10 +4,11 @@ Entry point for mieszkanieo scraper
 import sys
 import os
 import json
+import time
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 print("CWD:", os.getcwd())
 print("sys.path:", sys.path)
-from scraper import PropertyScraper
+from scraper import PropertyScraper, PropertySpool, ThumbnailCache, DetailEnricher, Geocoder, MarketStats, RecrawlScheduler, SelectorStats, ParquetSink, SearchIndex, PriceHistory, CdpBrowserManager, PreflightProbe, metrics
 
 
 def main():
@@ -15,7 +16,7 @@ def main():
     print("scraper_entry: starting", flush=True)
     
     if len(sys.argv) < 2:
-        print("usage: python scraper_entry.py <config_file> [city] [job_id] [max_pages]")
+        print("usage: python scraper_entry.py <config_file> [city] [job_id] [max_pages] [filters_json]")
         return
     
     config_file = sys.argv[1]
@@ -30,7 +31,15 @@ def main():
         except ValueError:
             max_pages = None
     
-    print(f"scraper_entry: config={config_file}, city={city}, job_id={job_id}, max_pages={max_pages}", flush=True)
+    # handle filters, e.g. {"price_max": 3000, "area_min": 40}
+    filters = None
+    if len(sys.argv) > 5:
+        try:
+            filters = json.loads(sys.argv[5])
+        except ValueError:
+            print(f"scraper_entry: invalid filters: {sys.argv[5]}", flush=True)
+    
+    print(f"scraper_entry: config={config_file}, city={city}, job_id={job_id}, max_pages={max_pages}, filters={filters}", flush=True)
     
     try:
         with open(config_file, 'r', encoding='utf-8') as f:
@@ -38,8 +47,79 @@ def main():
         
         print(f"scraper_entry: loaded config for {config.get('name', 'unknown')}", flush=True)
         
-        scraper = PropertyScraper(headless=True, job_id=job_id)
-        result = scraper.scrape_site(city, config, max_pages)
+        # write straight into sqlite instead of the api when configured
+        db_path = os.environ.get("MIESZKANIEO_DB_PATH") or None
+        
+        # parse pages in worker processes while chrome loads the next ones
+        parse_workers = int(os.environ.get("MIESZKANIEO_PARSE_WORKERS", "0") or 0)
+        
+        # live metrics: openmetrics endpoint and/or periodically rewritten file
+        metrics_port = os.environ.get("MIESZKANIEO_METRICS_PORT")
+        if metrics_port:
+            metrics.serve(int(metrics_port))
+        metrics_file = os.environ.get("MIESZKANIEO_METRICS_FILE")
+        if metrics_file:
+            metrics.write_periodically(metrics_file, float(os.environ.get("MIESZKANIEO_METRICS_INTERVAL", "15")))
+        
+        # journal batches locally so saves that fail are replayed on the next run
+        spool = None
+        if os.environ.get("MIESZKANIEO_SPOOL", "1") != "0":
+            spool = PropertySpool(os.environ.get("MIESZKANIEO_SPOOL_PATH") or None, job_id=job_id)
+        
+        # small local copies of listing images after the crawl, served by /api/properties/:id/thumbnail
+        thumbnail_cache = None
+        if os.environ.get("MIESZKANIEO_THUMBNAILS", "0") != "0":
+            thumbnail_cache = ThumbnailCache(os.environ.get("MIESZKANIEO_THUMBNAIL_DIR") or None)
+        
+        # detail pages for listings the result page shows without area or rooms
+        detail_enricher = None
+        if os.environ.get("MIESZKANIEO_DETAIL_ENRICH", "1") != "0":
+            detail_enricher = DetailEnricher()
+        
+        # coordinates from the bundled gazetteer (or a GeoNames dump)
+        geocoder = None
+        if os.environ.get("MIESZKANIEO_GEOCODE", "1") != "0":
+            geocoder = Geocoder(os.environ.get("MIESZKANIEO_GAZETTEER") or None)
+        
+        # summary artifact served by /api/market-stats
+        market_stats = None
+        if os.environ.get("MIESZKANIEO_MARKET_STATS", "1") != "0":
+            market_stats = MarketStats()
+        
+        # try fallback selectors by hit rate, seeded from earlier runs
+        selector_stats = None
+        if os.environ.get("MIESZKANIEO_SELECTOR_STATS", "1") != "0":
+            selector_stats = SelectorStats(os.environ.get("MIESZKANIEO_SELECTOR_STATS_PATH") or None)
+        
+        outputs = []
+        # full-text index of titles and addresses next to the properties table
+        if os.environ.get("MIESZKANIEO_SEARCH_INDEX", "1") != "0":
+            outputs.append(SearchIndex(db_path))
+        # price changes per listing id, kept across runs (the database is cleared every job)
+        if os.environ.get("MIESZKANIEO_PRICE_HISTORY", "1") != "0":
+            outputs.append(PriceHistory(os.environ.get("MIESZKANIEO_PRICE_HISTORY_DIR") or None))
+        # partitioned parquet copy of every run for analysis (needs pyarrow)
+        parquet_dir = os.environ.get("MIESZKANIEO_PARQUET_DIR")
+        if parquet_dir:
+            outputs.append(ParquetSink(parquet_dir, job_id))
+        
+        # chrome over the devtools protocol instead of chromedriver
+        browser_manager = None
+        if os.environ.get("MIESZKANIEO_BROWSER") == "cdp":
+            browser_manager = CdpBrowserManager(headless=True)
+        
+        # plain http check for listings before chrome starts, sites without results are skipped
+        preflight = None
+        if os.environ.get("MIESZKANIEO_PREFLIGHT", "1") != "0":
+            preflight = PreflightProbe()
+        
+        scraper = PropertyScraper(headless=True, job_id=job_id, db_path=db_path, thumbnail_cache=thumbnail_cache, detail_enricher=detail_enricher, parse_workers=parse_workers, spool=spool, geocoder=geocoder, market_stats=market_stats, selector_stats=selector_stats, outputs=outputs, browser_manager=browser_manager, preflight=preflight)
+        started = time.monotonic()
+        result = scraper.scrape_site(city, config, max_pages, filters)
+        
+        # churn history for background recrawls (filtered runs only see part of the market)
+        if result["success"] and not filters:
+            RecrawlScheduler().record_crawl(config["site_name"], city, result["properties"], time.monotonic() - started)
         
         if result["success"]:
             print(f"main: scraping completed", flush=True)
@@ -54,6 +134,8 @@ def main():
         print(f"main: error: {e}", flush=True)
         import traceback
         traceback.print_exc()
+    finally:
+        metrics.stop()
 
 
 if __name__ == "__main__":
@@ -51,6 +51,9 @@ function createTables() {
       link TEXT NOT NULL UNIQUE,
       site TEXT NOT NULL,
       city TEXT,
+      lat REAL,
+      lon REAL,
+      thumbnail TEXT,
       created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
       updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
     )
@@ -71,8 +74,37 @@ function createTables() {
   `;
 
   db.run(createPropertiesTable, (err) => {
-    if (err) console.error('Error creating properties table:', err.message);
-    else console.log('Properties table ready');
+    if (err) {
+      console.error('Error creating properties table:', err.message);
+      return;
+    }
+    console.log('Properties table ready');
+    
+    // databases created before coordinates and thumbnails were stored
+    db.all('PRAGMA table_info(properties)', (err, columns: any[]) => {
+      if (err) return;
+      [['lat', 'REAL'], ['lon', 'REAL'], ['thumbnail', 'TEXT']].forEach(([column, type]) => {
+        if (!columns.some((c) => c.name === column)) {
+          db.run(`ALTER TABLE properties ADD COLUMN ${column} ${type}`, (err) => {
+            if (err) console.error(`Error adding ${column} column:`, err.message);
+          });
+        }
+      });
+    });
+  });
+
+  // filled by the scraper with diacritic-folded titles and addresses
+  const createPropertiesFtsTable = `
+    CREATE VIRTUAL TABLE IF NOT EXISTS properties_fts USING fts5(
+      id UNINDEXED,
+      title,
+      address,
+      tokenize = 'unicode61'
+    )
+  `;
+
+  db.run(createPropertiesFtsTable, (err) => {
+    if (err) console.error('Error creating properties_fts table:', err.message);
   });
 
   db.run(createScrapingJobsTable, (err) => {
@@ -81,6 +113,43 @@ function createTables() {
   });
 }
 
+// fold text like the scraper's unidecode (ł has no combining form)
+function foldText(text: string): string {
+  return text.toLowerCase().replace(/ł/g, 'l').normalize('NFD').replace(/[\u0300-\u036f]/g, '');
+}
+
+// fts5 query matching all words as prefixes, e.g. 'garaż bogu' -> '"garaz"* "bogu"*'
+function buildMatchQuery(text: string): string {
+  const words = foldText(text).match(/[a-z0-9]+/g) || [];
+  return words.map((word) => `"${word}"*`).join(' ');
+}
+
+// delete properties and their full-text rows in one transaction (where is e.g. 'city = ?')
+function deleteProperties(where: string, params: any[], callback: (err: Error | null, changes: number) => void) {
+  const ftsQuery = where
+    ? `DELETE FROM properties_fts WHERE id IN (SELECT id FROM properties WHERE ${where})`
+    : 'DELETE FROM properties_fts';
+  const query = where ? `DELETE FROM properties WHERE ${where}` : 'DELETE FROM properties';
+  let ftsError: Error | null = null;
+  
+  db.serialize(() => {
+    db.run('BEGIN TRANSACTION');
+    db.run(ftsQuery, params, (err) => {
+      ftsError = err;
+    });
+    db.run(query, params, function(err) {
+      const error = err || ftsError;
+      if (error) {
+        db.run('ROLLBACK');
+        callback(error, 0);
+        return;
+      }
+      const changes = this.changes;
+      db.run('COMMIT', (err) => callback(err, changes));
+    });
+  });
+}
+
 // routes
 
 // get all properties
@@ -98,6 +167,7 @@ app.get('/api/properties', (req, res) => {
     level_max, 
     address, 
     city,
+    q,
     limit 
   } = req.query;
 
@@ -172,6 +242,15 @@ app.get('/api/properties', (req, res) => {
     params.push(`%${city}%`);
   }
 
+  // full-text search in titles and addresses, e.g. "balkon", "Bogucice", "garaż"
+  if (q) {
+    const matchQuery = buildMatchQuery(q as string);
+    if (matchQuery) {
+      query += ' AND id IN (SELECT id FROM properties_fts WHERE properties_fts MATCH ?)';
+      params.push(matchQuery);
+    }
+  }
+
   // sorting
   if (sort_by === 'price_asc') {
     query += ' ORDER BY price ASC';
@@ -220,6 +299,30 @@ app.get('/api/properties/:id', (req, res) => {
   });
 });
 
+// locally cached thumbnail of a property (stored by the scraper's thumbnail cache)
+app.get('/api/properties/:id/thumbnail', (req, res) => {
+  const { id } = req.params;
+  
+  db.get('SELECT thumbnail FROM properties WHERE id = ?', [id], (err, row: any) => {
+    if (err) {
+      res.status(500).json({ error: err.message });
+      return;
+    }
+    
+    if (!row || !row.thumbnail) {
+      res.status(404).json({ error: 'Thumbnail not found' });
+      return;
+    }
+    
+    // the cache may have evicted the file since
+    res.sendFile(row.thumbnail, (err) => {
+      if (err && !res.headersSent) {
+        res.status(404).json({ error: 'Thumbnail not found' });
+      }
+    });
+  });
+});
+
 // add new property
 // create property (single)
 app.post('/api/properties', [
@@ -277,6 +380,7 @@ app.post('/api/properties', [
 // create properties (batch)
 app.post('/api/properties/batch', [
   body('properties').isArray({ min: 1, max: 100 }), // Limit batch size
+  body('update_prices').optional().isBoolean(),
   body('properties.*.id').isString().trim().isLength({ min: 1, max: 50 }),
   body('properties.*.title').isString().trim().isLength({ min: 1, max: 500 }),
   body('properties.*.price').isInt({ min: 0 }),
@@ -291,7 +395,14 @@ app.post('/api/properties/batch', [
   body('properties.*.site').isString().trim().isIn(['allegro', 'gethome', 'nieruchomosci', 'olx', 'otodom']),
   body('properties.*.link').isURL().isLength({ max: 1000 }),
   body('properties.*.image').optional().isString().trim().isLength({ max: 1000 }),
-  body('properties.*.city').optional().isString().trim().isLength({ min: 1, max: 100 })
+  body('properties.*.city').optional().isString().trim().isLength({ min: 1, max: 100 }),
+  body('properties.*.thumbnail').optional().isString().trim().isLength({ max: 1000 }),
+  body('properties.*.lat').optional().custom((value) => {
+    return value === null || value === undefined || (typeof value === 'number' && value >= -90 && value <= 90);
+  }),
+  body('properties.*.lon').optional().custom((value) => {
+    return value === null || value === undefined || (typeof value === 'number' && value >= -180 && value <= 180);
+  })
 ], (req: Request, res: Response) => {
   // check validation results
   const errors = validationResult(req);
@@ -308,9 +419,15 @@ app.post('/api/properties/batch', [
   let skipped = 0;
   let errors_count = 0;
   
-  const query = `
-    INSERT OR IGNORE INTO properties (id, title, price, area, rooms, level, address, site, link, image, city, created_at, updated_at)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+  // recrawls add listings and refresh the price of ones already stored
+  const query = req.body.update_prices ? `
+    INSERT INTO properties (id, title, price, area, rooms, level, address, site, link, image, city, lat, lon, thumbnail, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+    ON CONFLICT(id) DO UPDATE SET price = excluded.price, updated_at = CURRENT_TIMESTAMP WHERE price != excluded.price
+    ON CONFLICT DO NOTHING
+  ` : `
+    INSERT OR IGNORE INTO properties (id, title, price, area, rooms, level, address, site, link, image, city, lat, lon, thumbnail, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
   `;
   
   // use a transaction (for better performance?)
@@ -320,9 +437,9 @@ app.post('/api/properties/batch', [
     const stmt = db.prepare(query);
     
     properties.forEach((property: any) => {
-      const { id, title, price, area, rooms, level, address, site, link, image, city } = property;
+      const { id, title, price, area, rooms, level, address, site, link, image, city, lat, lon, thumbnail } = property;
       
-      stmt.run([id, title, price, area, rooms, level, address, site, link, image, city], function(err) {
+      stmt.run([id, title, price, area, rooms, level, address, site, link, image, city, lat ?? null, lon ?? null, thumbnail ?? null], function(err) {
         if (err) {
           errors_count++;
           console.error('Error inserting property:', err.message);
@@ -359,17 +476,69 @@ app.post('/api/properties/batch', [
   });
 });
 
+// set cached thumbnail paths (the scraper fetches them after saving the listings)
+app.post('/api/properties/thumbnails', [
+  body('thumbnails').isArray({ min: 1, max: 100 }),
+  body('thumbnails.*.id').isString().trim().isLength({ min: 1, max: 50 }),
+  body('thumbnails.*.thumbnail').isString().trim().isLength({ min: 1, max: 1000 })
+], (req: Request, res: Response) => {
+  const errors = validationResult(req);
+  if (!errors.isEmpty()) {
+    res.status(400).json({ 
+      error: 'Invalid input data', 
+      details: errors.array() 
+    });
+    return;
+  }
+
+  const thumbnails = req.body.thumbnails;
+  let updated = 0;
+  
+  db.serialize(() => {
+    db.run('BEGIN TRANSACTION');
+    
+    const stmt = db.prepare('UPDATE properties SET thumbnail = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?');
+    
+    thumbnails.forEach((entry: any) => {
+      stmt.run([entry.thumbnail, entry.id], function(err) {
+        if (err) {
+          console.error('Error updating thumbnail:', err.message);
+        } else {
+          updated += this.changes;
+        }
+      });
+    });
+    
+    stmt.finalize((err) => {
+      if (err) {
+        db.run('ROLLBACK');
+        res.status(500).json({ error: 'Thumbnail update failed' });
+        return;
+      }
+      
+      db.run('COMMIT', (err) => {
+        if (err) {
+          res.status(500).json({ error: 'Failed to commit transaction' });
+          return;
+        }
+        
+        res.json({ total: thumbnails.length, updated: updated });
+      });
+    });
+  });
+});
+
 // delete property
 app.delete('/api/properties/:id', (req, res) => {
   const { id } = req.params;
   
-  db.run('DELETE FROM properties WHERE id = ?', [id], function(err) {
+  deleteProperties('id = ?', [id], (err, changes) => {
     if (err) {
       res.status(500).json({ error: err.message });
       return;
     }
     
-    if (this.changes === 0) {
+    if (changes === 0) {
       res.status(404).json({ error: 'Property not found' });
       return;
     }
@@ -380,15 +549,15 @@ app.delete('/api/properties/:id', (req, res) => {
 
 // delete all properties
 app.delete('/api/properties', (req, res) => {
-  db.run('DELETE FROM properties', function(err) {
+  deleteProperties('', [], (err, changes) => {
     if (err) {
       res.status(500).json({ error: err.message });
       return;
     }
     
     res.json({ 
-      message: `Deleted all ${this.changes} properties from database`,
-      deletedCount: this.changes
+      message: `Deleted all ${changes} properties from database`,
+      deletedCount: changes
     });
   });
 });
@@ -397,19 +566,56 @@ app.delete('/api/properties', (req, res) => {
 app.delete('/api/properties/city/:city', (req, res) => {
   const { city } = req.params;
   
-  db.run('DELETE FROM properties WHERE city = ?', [city], function(err) {
+  deleteProperties('city = ?', [city], (err, changes) => {
     if (err) {
       res.status(500).json({ error: err.message });
       return;
     }
     
     res.json({ 
-      message: `Deleted ${this.changes} properties from ${city}`,
-      deletedCount: this.changes
+      message: `Deleted ${changes} properties from ${city}`,
+      deletedCount: changes
     });
   });
 });
 
+// market statistics endpoint
+
+// get precomputed price statistics (written by the scraper after each site)
+app.get('/api/market-stats', (req, res) => {
+  const fs = require('fs');
+  const statsPath = path.join(__dirname, 'market_stats.json');
+  
+  fs.readFile(statsPath, 'utf-8', (err: NodeJS.ErrnoException | null, data: string) => {
+    if (err) {
+      if (err.code === 'ENOENT') {
+        res.json({ cities: {} });
+      } else {
+        res.status(500).json({ error: err.message });
+      }
+      return;
+    }
+    
+    const { city } = req.query;
+    if (typeof city !== 'string') {
+      res.type('application/json').send(data);
+      return;
+    }
+    
+    try {
+      const stats = JSON.parse(data);
+      const key = Object.keys(stats.cities || {}).find((name) => name.toLowerCase() === city.toLowerCase());
+      if (!key) {
+        res.status(404).json({ error: 'No statistics for this city' });
+        return;
+      }
+      res.json(stats.cities[key]);
+    } catch (parseError) {
+      res.status(500).json({ error: 'Invalid statistics file' });
+    }
+  });
+});
+
 // scraping jobs endpoints
 
 // get all scraping jobs
@@ -525,6 +731,8 @@ app.post('/api/refresh', [
   body('city').notEmpty().withMessage('City is required'),
   body('sites').isArray().withMessage('Sites must be an array'),
   body('sites.*').isIn(['allegro', 'gethome', 'nieruchomosci', 'olx', 'otodom']).withMessage('Invalid site'),
+  body('filters').optional().isObject().withMessage('Filters must be an object'),
+  body('filters.*').optional().isInt({ min: 0 }).withMessage('Invalid filter value'),
 ], async (req: Request, res: Response) => {
   try {
     // validate request
@@ -536,7 +744,7 @@ app.post('/api/refresh', [
       });
     }
 
-    const { city, sites, sitePages = {} } = req.body;
+    const { city, sites, sitePages = {}, filters } = req.body;
     
     // create a unique job id
     const jobId = randomUUID();
@@ -567,7 +775,7 @@ app.post('/api/refresh', [
     });
 
     // run scraping asynchronously
-    runScrapingJob(jobId, city, sites, sitePages);
+    runScrapingJob(jobId, city, sites, sitePages, filters);
 
   } catch (error) {
     console.error('Error in refresh endpoint:', error);
@@ -617,7 +825,7 @@ app.get('/api/refresh/:jobId', (req: Request, res: Response) => {
 });
 
 // helper function to run scraping job
-async function runScrapingJob(jobId: string, city: string, sites: string[], sitePages: Record<string, string>) {
+async function runScrapingJob(jobId: string, city: string, sites: string[], sitePages: Record<string, string>, filters?: Record<string, number>) {
   console.log(`Starting scraping job ${jobId} for city: ${city}, sites: ${sites.join(', ')}`);
   
   const { spawn } = require('child_process');
@@ -644,7 +852,7 @@ async function runScrapingJob(jobId: string, city: string, sites: string[], site
   console.log(`Clearing existing data before scraping...`);
   try {
     await new Promise((resolve, reject) => {
-      db.run('DELETE FROM properties', (err) => {
+      deleteProperties('', [], (err) => {
         if (err) {
           console.error('Error deleting existing properties:', err.message);
           reject(err);
@@ -678,10 +886,15 @@ async function runScrapingJob(jobId: string, city: string, sites: string[], site
         jobId  // pass job ID for status updates
       ];
       
-      if (maxPages !== 'all') {
+      if (maxPages !== 'all' || filters) {
         pythonArgs.push(maxPages);
       }
       
+      // search filters pushed down into portal urls
+      if (filters) {
+        pythonArgs.push(JSON.stringify(filters));
+      }
+      
       // run python scraper
       // use portable python
       let pythonPath: string;
@@ -770,6 +983,9 @@ app.get('/api/chromedriver-status', async (req, res) => {
     const { spawn } = require('child_process');
     const path = require('path');
     
+    // force a test browser launch instead of the cached status
+    const force = req.query.force === '1' || req.query.force === 'true';
+    
     // Determine Python executable path
     let pythonPath: string;
     if (process.env.NODE_ENV === 'production') {
@@ -786,7 +1002,7 @@ backend_dir = r"${__dirname.replace(/\\/g, '\\\\')}"
 sys.path.insert(0, backend_dir)
 from services.chromedriver_service import chromedriver_service
 import json
-result = chromedriver_service.check_chromedriver_status()
+result = chromedriver_service.check_chromedriver_status(force=${force ? 'True' : 'False'})
 print(json.dumps(result))
 `], {
       cwd: __dirname,
@@ -11,10 +11,12 @@ import zipfile
 import shutil
 import time
 from pathlib import Path
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Optional, Tuple
 import requests
 import undetected_chromedriver as uc
 from selenium.common.exceptions import SessionNotCreatedException
+from scraper.chrome_env import get_versions, get_status_cache_path
+from scraper.driver_cache import driver_cache
 
 
 def log_message(message: str, level: str = "INFO"):
@@ -34,7 +36,57 @@ class ChromeDriverService:
         self.site_packages = os.path.join(self.python_path, 'Lib', 'site-packages')
         self.uc_path = os.path.join(self.site_packages, 'undetected_chromedriver')
     
-    def check_chromedriver_status(self) -> Dict[str, Any]:
+    def check_chromedriver_status(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Check ChromeDriver status, using the cached result while the
+        Chrome and undetected-chromedriver versions stay the same
+        Returns status dictionary with compatibility info
+        """
+        versions = get_versions()
+        log_message(f"Installed versions: {versions}")
+        
+        if not force:
+            cached = self._load_cached_status(versions)
+            if cached:
+                log_message("Using cached ChromeDriver status")
+                return cached
+        
+        result = self._run_status_check()
+        
+        if result.get("compatible"):
+            # versions may have changed if undetected-chromedriver was updated
+            self._save_cached_status(get_versions(), result)
+        return result
+    
+    def _load_cached_status(self, versions: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Load last successful status if it was recorded for the same versions"""
+        if not versions.get("chrome"):
+            return None
+        try:
+            with open(get_status_cache_path(), 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if cached.get("versions") != versions:
+            log_message("Versions changed since last check, cache is stale")
+            return None
+        return cached.get("status")
+    
+    def _save_cached_status(self, versions: Dict[str, Any], status: Dict[str, Any]) -> None:
+        """Save successful status keyed by versions"""
+        if not versions.get("chrome"):
+            return
+        try:
+            cache_path = get_status_cache_path()
+            tmp_path = cache_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"versions": versions, "status": status, "checked_at": time.time()}, f)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            log_message(f"Failed to save status cache: {e}", "WARNING")
+    
+    def _run_status_check(self) -> Dict[str, Any]:
         """
         Check ChromeDriver status and attempt auto-fix if needed
         Returns status dictionary with compatibility info
@@ -109,12 +161,20 @@ class ChromeDriverService:
             options = uc.ChromeOptions()
             options.add_argument('--headless')
             
+            # prepare the shared patched driver so scrapers start without patching
+            try:
+                driver_path = driver_cache.get_driver_path()
+            except Exception as e:
+                log_message(f"Driver cache unavailable: {e}", "WARNING")
+                driver_path = None
+            
             # create a temporary chrome instance
             test_driver = uc.Chrome(
                 options=options,
                 use_subprocess=False,
                 headless=True,
-                version_main=None
+                version_main=None,
+                driver_executable_path=driver_path
             )
             test_driver.quit()
             log_message("ChromeDriver test successful")